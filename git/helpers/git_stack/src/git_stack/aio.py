@@ -0,0 +1,490 @@
+"""
+Asyncio execution core for git-stack.
+
+git and glab processes are spawned with asyncio.create_subprocess_exec and
+limited by one semaphore per resource ('git' processes and 'api' calls), so
+dozens of requests can be in flight without a thread per request, and
+cancelling a command (e.g. with Ctrl-C) kills the processes it started.
+
+The rest of git-stack is synchronous. It reaches the core through:
+- run_sync(), which runs a coroutine to completion from synchronous code
+- AsyncHostingClient, an async variant of any GitHostingClient
+- run_process_blocking(), which synchronous helpers like
+  GitStackPush._run_git_command use to spawn processes. Called from a
+  blocking call that AsyncCore.call() runs in a worker thread, it hands the
+  process to the core's event loop instead of spawning it directly.
+
+Processes are killed when their timeout, capped by the command's deadline
+(see git_stack.timeouts), expires. kill_children() kills the processes still
+running in worker threads, e.g. when the command is interrupted. Long-lived
+processes read incrementally (git log, the cat-file coprocess) are
+registered with track_process() and read under process_watchdog() instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import subprocess
+import threading
+from collections.abc import Awaitable, Callable, Coroutine, Iterable, Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from git_stack.timeouts import DeadlineExceededError, get_deadline
+
+if TYPE_CHECKING:
+    from git_stack.hosting_client import GitHostingClient
+
+_T = TypeVar('_T')
+_R = TypeVar('_R')
+
+# Default number of concurrent operations per resource
+DEFAULT_LIMITS = {'git': 8, 'api': 16}
+
+# Core and loop of the AsyncCore.call() whose worker thread is running
+_current: contextvars.ContextVar[tuple[AsyncCore, asyncio.AbstractEventLoop]
+                                 | None] = contextvars.ContextVar(
+                                     'git_stack_aio_current', default=None)
+
+# Processes started by run_process_blocking() or registered with
+# track_process() that are still running
+_children: set[subprocess.Popen[Any]] = set()
+_children_lock = threading.Lock()
+
+
+class AsyncCore:
+    """
+    Per-resource concurrency limits for async git and hosting operations.
+
+    Semaphores are bound to an event loop, so they are created lazily for
+    each loop the core is used on.
+    """
+
+    def __init__(self, limits: dict[str, int] | None = None):
+        """
+        Initialize the core.
+
+        Args:
+            limits: Maximum concurrent operations per resource name,
+                merged over DEFAULT_LIMITS
+        """
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._semaphores: dict[tuple[asyncio.AbstractEventLoop, str],
+                               asyncio.Semaphore] = {}
+
+    def semaphore(self, resource: str) -> asyncio.Semaphore:
+        """
+        Get the semaphore limiting a resource on the running event loop.
+
+        Args:
+            resource: Resource name (e.g. 'git' or 'api')
+
+        Returns:
+            The resource's semaphore
+        """
+        key = (asyncio.get_running_loop(), resource)
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(
+                self.limits.get(resource, 1))
+        return self._semaphores[key]
+
+    async def run_process(
+        self,
+        argv: list[str],
+        resource: str | None = None,
+        input_text: str | None = None,
+        env: dict[str, str] | None = None,
+        timeout: float | None = None,
+        cwd: str | None = None
+    ) -> subprocess.CompletedProcess[str]:
+        """
+        Run a process with asyncio.create_subprocess_exec.
+
+        If the awaiting task is cancelled or the timeout expires, the process
+        is killed.
+
+        Args:
+            argv: Program and arguments
+            resource: Resource whose semaphore limits the process, if any
+            input_text: Optional text to pass on stdin
+            env: Full environment of the process (defaults to ours)
+            timeout: Seconds the process may run, capped by the deadline
+            cwd: Working directory of the process (defaults to ours)
+
+        Returns:
+            The completed process, with decoded stdout and stderr
+
+        Raises:
+            subprocess.TimeoutExpired: If the timeout expired
+            DeadlineExceededError: If the command's deadline passed
+        """
+        if resource is not None:
+            async with self.semaphore(resource):
+                return await self.run_process(argv, None, input_text, env,
+                                              timeout, cwd)
+
+        deadline = get_deadline()
+        capped = deadline.cap(timeout)
+        proc = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=subprocess.PIPE if input_text is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=cwd)
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(
+                    input_text.encode() if input_text is not None else None),
+                capped)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            if deadline.expired:
+                raise DeadlineExceededError(
+                    f"Deadline of {deadline.seconds:g}s exceeded running "
+                    f"{argv[0]}") from e
+            raise subprocess.TimeoutExpired(argv, capped or 0) from e
+        assert proc.returncode is not None
+        return subprocess.CompletedProcess(argv, proc.returncode,
+                                           stdout.decode(errors='replace'),
+                                           stderr.decode(errors='replace'))
+
+    async def run_git(self,
+                      args: list[str],
+                      check: bool = True,
+                      input_text: str | None = None) -> str:
+        """
+        Run a git command and return its output.
+
+        Args:
+            args: Git command arguments
+            check: Whether to raise an exception on error
+            input_text: Optional text to pass on stdin
+
+        Returns:
+            Command output as string, stripped
+        """
+        result = await self.run_process(['git'] + args, 'git', input_text)
+        if check and result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode,
+                                                ['git'] + args, result.stdout,
+                                                result.stderr)
+        return result.stdout.strip()
+
+    async def call(self, resource: str, func: Callable[..., _R],
+                   *args: Any) -> _R:
+        """
+        Run a blocking call in a worker thread, limited by a resource.
+
+        Processes the call spawns through run_process_blocking() run on this
+        core's event loop, so they are killed if the call is cancelled.
+
+        Args:
+            resource: Resource whose semaphore limits the call
+            func: Blocking function
+            *args: Arguments for func
+
+        Returns:
+            The function's result
+        """
+        async with self.semaphore(resource):
+            token = _current.set((self, asyncio.get_running_loop()))
+            try:
+                # to_thread() runs func in a copy of the current context
+                return await asyncio.to_thread(func, *args)
+            finally:
+                _current.reset(token)
+
+    async def map(self, func: Callable[[_T], Awaitable[_R]],
+                  items: Iterable[_T]) -> dict[_T, _R | Exception]:
+        """
+        Await a coroutine function for each item concurrently.
+
+        Args:
+            func: Coroutine function to call with each item
+            items: Items to process (must be hashable)
+
+        Returns:
+            Mapping of each item to its result, or to the exception it raised
+        """
+        unique_items = list(dict.fromkeys(items))
+        results = await asyncio.gather(*(func(item) for item in unique_items),
+                                       return_exceptions=True)
+        mapped: dict[_T, _R | Exception] = {}
+        for item, result in zip(unique_items, results):
+            if isinstance(result, BaseException) and not isinstance(
+                    result, Exception):
+                raise result
+            mapped[item] = result
+        return mapped
+
+
+def run_sync(coro: Coroutine[Any, Any, _R]) -> _R:
+    """
+    Run a coroutine to completion from synchronous code.
+
+    On Ctrl-C the coroutine is cancelled, which kills the processes it
+    started, and KeyboardInterrupt is raised.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    return asyncio.run(coro)
+
+
+def run_process_blocking(
+        argv: list[str],
+        resource: str | None = None,
+        input_text: str | None = None,
+        env: dict[str, str] | None = None,
+        timeout: float | None = None,
+        cwd: str | None = None) -> subprocess.CompletedProcess[str]:
+    """
+    Run a process from synchronous code.
+
+    Inside a blocking call run by AsyncCore.call(), the process is run on
+    the core's event loop. Elsewhere it is spawned directly and tracked, so
+    kill_children() can kill it.
+
+    Args:
+        argv: Program and arguments
+        resource: Resource whose semaphore limits the process on the core
+        input_text: Optional text to pass on stdin
+        env: Full environment of the process (defaults to ours)
+        timeout: Seconds the process may run, capped by the deadline
+        cwd: Working directory of the process (defaults to ours)
+
+    Returns:
+        The completed process
+
+    Raises:
+        subprocess.TimeoutExpired: If the timeout expired
+        DeadlineExceededError: If the command's deadline passed
+    """
+    current = _current.get()
+    if current is not None:
+        core, loop = current
+        future = asyncio.run_coroutine_threadsafe(
+            core.run_process(argv, resource, input_text, env, timeout, cwd),
+            loop)
+        return future.result()
+
+    deadline = get_deadline()
+    capped = deadline.cap(timeout)
+    # pylint: disable-next=consider-using-with
+    proc = subprocess.Popen(
+        argv,
+        stdin=subprocess.PIPE if input_text is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        cwd=cwd)
+    track_process(proc)
+    try:
+        stdout, stderr = proc.communicate(input_text, timeout=capped)
+    except BaseException as e:
+        proc.kill()
+        proc.communicate()
+        if isinstance(e, subprocess.TimeoutExpired) and deadline.expired:
+            raise DeadlineExceededError(
+                f"Deadline of {deadline.seconds:g}s exceeded running "
+                f"{argv[0]}") from e
+        raise
+    finally:
+        untrack_process(proc)
+    return subprocess.CompletedProcess(argv, proc.returncode, stdout, stderr)
+
+
+def track_process(proc: subprocess.Popen[Any]) -> None:
+    """
+    Let kill_children() kill a process until it is untracked.
+
+    Args:
+        proc: Process started by the caller
+    """
+    with _children_lock:
+        _children.add(proc)
+
+
+def untrack_process(proc: subprocess.Popen[Any]) -> None:
+    """
+    Stop tracking a process registered with track_process().
+
+    Args:
+        proc: Tracked process
+    """
+    with _children_lock:
+        _children.discard(proc)
+
+
+@contextmanager
+def process_watchdog(proc: subprocess.Popen[Any],
+                     timeout: float | None = None) -> Iterator[None]:
+    """
+    Kill a process if talking to it outlasts the timeout or the deadline.
+
+    Reads from the killed process see end of file. The error they lead to
+    is replaced by DeadlineExceededError, or subprocess.TimeoutExpired if
+    only the timeout expired.
+
+    Args:
+        proc: Process the block reads from
+        timeout: Seconds the block may take, capped by the deadline
+
+    Raises:
+        DeadlineExceededError: If the deadline passed before or during the
+            block
+        subprocess.TimeoutExpired: If the timeout expired during the block
+    """
+    deadline = get_deadline()
+    capped = deadline.cap(timeout)
+    if capped is None:
+        yield
+        return
+
+    fired = threading.Event()
+
+    def kill() -> None:
+        fired.set()
+        proc.kill()
+
+    timer = threading.Timer(capped, kill)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    except Exception as e:
+        if not fired.is_set():
+            raise
+        if deadline.expired:
+            raise DeadlineExceededError(
+                f"Deadline of {deadline.seconds:g}s exceeded running "
+                f"{proc.args[0]}") from e
+        raise subprocess.TimeoutExpired(proc.args, capped) from e
+    finally:
+        timer.cancel()
+
+
+def kill_children() -> int:
+    """
+    Kill the processes run_process_blocking() started or track_process()
+    registered that still run.
+
+    Their callers see the process fail and return, which frees the worker
+    threads waiting on them.
+
+    Returns:
+        Number of processes killed
+    """
+    with _children_lock:
+        children = list(_children)
+    killed = 0
+    for proc in children:
+        if proc.poll() is None:
+            proc.kill()
+            killed += 1
+    return killed
+
+
+class AsyncHostingClient:
+    """
+    Async variant of a GitHostingClient.
+
+    Each call runs the wrapped client's blocking method on a worker thread,
+    limited by the core's 'api' semaphore. glab processes spawned by
+    GitLabClient run on the core's event loop. Batch methods await all
+    calls concurrently and report per-item results like their synchronous
+    counterparts.
+    """
+
+    def __init__(self, client: GitHostingClient, core: AsyncCore):
+        """
+        Initialize the async client.
+
+        Args:
+            client: Synchronous client doing the requests
+            core: Core providing the concurrency limits
+        """
+        self.client = client
+        self.core = core
+
+    async def _call(self, func: Callable[..., _R], *args: Any) -> _R:
+        return await self.core.call('api', func, *args)
+
+    async def create_mr(self, source_branch: str, target_branch: str,
+                        title: str, description: str) -> dict[str, Any]:
+        """See GitHostingClient.create_mr()."""
+        return await self._call(self.client.create_mr, source_branch,
+                                target_branch, title, description)
+
+    async def update_mr(self,
+                        mr_iid: int,
+                        title: str,
+                        target_branch: str | None = None) -> None:
+        """See GitHostingClient.update_mr()."""
+        await self._call(self.client.update_mr, mr_iid, title, target_branch)
+
+    async def get_mr_state(self, mr_iid: int) -> str:
+        """See GitHostingClient.get_mr_state()."""
+        return await self._call(self.client.get_mr_state, mr_iid)
+
+    async def close_mr(self, mr_iid: int) -> None:
+        """See GitHostingClient.close_mr()."""
+        await self._call(self.client.close_mr, mr_iid)
+
+    async def add_mr_note(self, mr_iid: int, body: str) -> int | None:
+        """See GitHostingClient.add_mr_note()."""
+        return await self._call(self.client.add_mr_note, mr_iid, body)
+
+    async def update_mr_note(self, mr_iid: int, note_id: int,
+                             body: str) -> None:
+        """See GitHostingClient.update_mr_note()."""
+        await self._call(self.client.update_mr_note, mr_iid, note_id, body)
+
+    async def get_mr_notes(self, mr_iid: int) -> list[dict[str, Any]]:
+        """See GitHostingClient.get_mr_notes()."""
+        return await self._call(self.client.get_mr_notes, mr_iid)
+
+    async def set_mr_dependencies(self, mr_iid: int,
+                                  blocking_mr_iids: list[int]) -> None:
+        """See GitHostingClient.set_mr_dependencies()."""
+        await self._call(self.client.set_mr_dependencies, mr_iid,
+                         blocking_mr_iids)
+
+    async def find_mr_by_source_branch(
+            self, source_branch: str) -> dict[str, Any] | None:
+        """See GitHostingClient.find_mr_by_source_branch()."""
+        return await self._call(self.client.find_mr_by_source_branch,
+                                source_branch)
+
+    async def get_mr_states(self, mr_iids: Iterable[int]) -> dict[int, str]:
+        """See GitHostingClient.get_mr_states(); uses the bulk request."""
+        return await self._call(self.client.get_mr_states, list(mr_iids))
+
+    async def close_mrs(
+            self, mr_iids: Iterable[int]) -> dict[int, Exception | None]:
+        """Close MRs concurrently; see GitHostingClient.close_mrs()."""
+        results = await self.core.map(self.close_mr, mr_iids)
+        return {
+            mr_iid: result if isinstance(result, Exception) else None
+            for mr_iid, result in results.items()
+        }
+
+    async def get_notes_for(
+            self, mr_iids: Iterable[int]) -> dict[int, list[dict[str, Any]]]:
+        """Get notes concurrently; see GitHostingClient.get_notes_for()."""
+        results = await self.core.map(self.get_mr_notes, mr_iids)
+        return {
+            mr_iid: notes
+            for mr_iid, notes in results.items()
+            if not isinstance(notes, Exception)
+        }
@@ -0,0 +1,276 @@
+"""
+Per-command memoization of hosting reads.
+
+CachingHostingClient wraps another GitHostingClient for the lifetime of one
+GitStackPush:
+- identical read calls running at the same time share one request
+  (single-flight): the first caller does the request, the others wait for
+  its result
+- read results are remembered until a write could have changed them
+- writes go straight through and drop the entries they affect, e.g.
+  update_mr() and close_mr() drop the MR's state and every MR listing
+
+Failures are never remembered; callers waiting on a failed request get its
+exception, and the next call tries again. This relies on the wrapped client
+raising on failed reads: an empty result (e.g. no notes) is remembered.
+"""
+
+from __future__ import annotations
+
+import copy
+import threading
+from collections.abc import Callable, Hashable, Iterable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+from git_stack.hosting_client import GitHostingClient
+
+_R = TypeVar('_R')
+
+# Kinds of memo entries that describe MR listings (title, target branch,
+# state) and so change with any MR write
+LISTING_KINDS = ('branch', 'stack')
+
+
+class CachingHostingClient(GitHostingClient):
+    """GitHostingClient wrapper that coalesces and memoizes read calls."""
+
+    def __init__(self, client: GitHostingClient):
+        """
+        Initialize the wrapper.
+
+        Args:
+            client: Client doing the requests
+        """
+        self.client = client
+        self.max_workers = client.max_workers
+        self._memo: dict[tuple[str, Hashable], Any] = {}
+        self._in_flight: dict[tuple[str, Hashable], Future[Any]] = {}
+        # Bumped by every invalidation; results of reads that overlapped one
+        # are returned but not remembered
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the wrapped client if it holds resources."""
+        close = getattr(self.client, 'close', None)
+        if close is not None:
+            close()
+
+    def _read(self, key: tuple[str, Hashable], func: Callable[..., _R],
+              *args: Any) -> _R:
+        """
+        Run a read call once per key, sharing it with concurrent callers.
+
+        Args:
+            key: (kind, argument) identifying the call
+            func: Wrapped client method
+            *args: Arguments of func
+
+        Returns:
+            A copy of the (possibly remembered) result
+        """
+        with self._lock:
+            if key in self._memo:
+                return copy.deepcopy(self._memo[key])
+            future = self._in_flight.get(key)
+            owner = future is None
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+            generation = self._generation
+
+        if not owner:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = func(*args)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+        self._remember(key, result, generation)
+        future.set_result(result)
+        return copy.deepcopy(result)
+
+    def _remember(self, key: tuple[str, Hashable], result: Any,
+                  generation: int) -> None:
+        """Store a read result unless an invalidation happened meanwhile."""
+        with self._lock:
+            if generation == self._generation:
+                self._memo[key] = result
+
+    def _read_many(
+            self, kind: str, items: Iterable[Hashable],
+            fetch: Callable[[list[Any]], dict[Any, Any]]) -> dict[Any, Any]:
+        """
+        Answer a batch read from the memo, fetching only the missing items.
+
+        Args:
+            kind: Memo entry kind of the items
+            items: Items to read
+            fetch: Wrapped batch method, called with the missing items
+
+        Returns:
+            Mapping of item to a copy of its result; items whose read failed
+            are omitted, as in the wrapped method
+        """
+        items = list(dict.fromkeys(items))
+        with self._lock:
+            found = {
+                item: self._memo[(kind, item)]
+                for item in items
+                if (kind, item) in self._memo
+            }
+            generation = self._generation
+        missing = [item for item in items if item not in found]
+        if missing:
+            fetched = fetch(missing)
+            for item, result in fetched.items():
+                self._remember((kind, item), result, generation)
+            found.update(fetched)
+        return copy.deepcopy(found)
+
+    def invalidate(self,
+                   keys: Iterable[tuple[str, Hashable]] = (),
+                   kinds: Iterable[str] = ()) -> None:
+        """
+        Forget remembered results.
+
+        Args:
+            keys: (kind, argument) keys to forget
+            kinds: Kinds whose entries are all forgotten
+        """
+        kinds = set(kinds)
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._memo.pop(key, None)
+            if kinds:
+                self._memo = {
+                    key: value
+                    for key, value in self._memo.items()
+                    if key[0] not in kinds
+                }
+
+    # Reads
+
+    def get_mr_state(self, mr_iid: int) -> str:
+        """Get the state of an MR, at most once per command."""
+        return self._read(('state', mr_iid), self.client.get_mr_state, mr_iid)
+
+    def get_mr_notes(self, mr_iid: int) -> list[dict[str, Any]]:
+        """Get the notes of an MR, at most once per command."""
+        return self._read(('notes', mr_iid), self.client.get_mr_notes, mr_iid)
+
+    def find_mrs_by_stack_name(self, stack_name: str) -> list[dict[str, Any]]:
+        """Find the MRs of a stack, at most once per command."""
+        return self._read(('stack', stack_name),
+                          self.client.find_mrs_by_stack_name, stack_name)
+
+    def find_mr_by_source_branch(self,
+                                 source_branch: str) -> dict[str, Any] | None:
+        """Find the open MR of a branch, at most once per command."""
+        return self._read(('branch', source_branch),
+                          self.client.find_mr_by_source_branch, source_branch)
+
+    def get_mr_states(self, mr_iids: Iterable[int]) -> dict[int, str]:
+        """Get MR states, requesting only those not known yet."""
+        return self._read_many('state', mr_iids, self.client.get_mr_states)
+
+    def find_mrs_by_stack_names(
+            self, stack_names: Iterable[str]) -> dict[str, list[dict[str, Any]]]:
+        """Find the MRs of stacks, listing only those not known yet."""
+        return self._read_many('stack', stack_names,
+                               self.client.find_mrs_by_stack_names)
+
+    def find_open_mrs_by_source_branches(
+        self, source_branches: Iterable[str]
+    ) -> dict[str, dict[str, Any] | None]:
+        """Find the open MRs of branches, looking up only unknown ones."""
+        return self._read_many('branch', source_branches,
+                               self.client.find_open_mrs_by_source_branches)
+
+    def get_notes_for(
+            self, mr_iids: Iterable[int]) -> dict[int, list[dict[str, Any]]]:
+        """Get the notes of MRs, fetching only those not known yet."""
+        return self._read_many('notes', mr_iids, self.client.get_notes_for)
+
+    def list_own_mrs(self,
+                     updated_after: str | None = None) -> list[dict[str, Any]]:
+        """List the user's MRs; not memoized, the MR mirror keeps them."""
+        return self.client.list_own_mrs(updated_after)
+
+    # Writes
+
+    def create_mr(self, source_branch: str, target_branch: str, title: str,
+                  description: str) -> dict[str, Any]:
+        """Create an MR and forget the MR listings."""
+        try:
+            return self.client.create_mr(source_branch, target_branch, title,
+                                         description)
+        finally:
+            self.invalidate(kinds=LISTING_KINDS)
+
+    def update_mr(self,
+                  mr_iid: int,
+                  title: str,
+                  target_branch: str | None = None) -> None:
+        """Update an MR and forget the MR listings."""
+        try:
+            self.client.update_mr(mr_iid, title, target_branch)
+        finally:
+            self.invalidate(kinds=LISTING_KINDS)
+
+    def close_mr(self, mr_iid: int) -> None:
+        """Close an MR and forget its state and the MR listings."""
+        try:
+            self.client.close_mr(mr_iid)
+        finally:
+            self.invalidate([('state', mr_iid)], LISTING_KINDS)
+
+    def add_mr_note(self, mr_iid: int, body: str) -> int | None:
+        """Add a note to an MR and forget its notes."""
+        try:
+            return self.client.add_mr_note(mr_iid, body)
+        finally:
+            self.invalidate([('notes', mr_iid)])
+
+    def update_mr_note(self, mr_iid: int, note_id: int, body: str) -> None:
+        """Update a note of an MR and forget its notes."""
+        try:
+            self.client.update_mr_note(mr_iid, note_id, body)
+        finally:
+            self.invalidate([('notes', mr_iid)])
+
+    def set_mr_dependencies(self, mr_iid: int,
+                            blocking_mr_iids: list[int]) -> None:
+        """Set the dependencies of an MR; nothing memoized depends on them."""
+        self.client.set_mr_dependencies(mr_iid, blocking_mr_iids)
+
+    def close_mrs(self, mr_iids: Iterable[int]) -> dict[int, Exception | None]:
+        """Close MRs with the wrapped batch call and forget their states."""
+        mr_iids = list(mr_iids)
+        try:
+            return self.client.close_mrs(mr_iids)
+        finally:
+            self.invalidate([('state', mr_iid) for mr_iid in mr_iids],
+                            LISTING_KINDS)
+
+    def update_mrs(
+            self,
+            updates: Iterable[dict[str, Any]]) -> dict[int, Exception | None]:
+        """Update MRs with the wrapped batch call and forget the listings."""
+        try:
+            return self.client.update_mrs(updates)
+        finally:
+            self.invalidate(kinds=LISTING_KINDS)
+
+    def set_dependencies_for(
+        self, dependencies: dict[int, list[int]]
+    ) -> dict[int, Exception | None]:
+        """Set MR dependencies with the wrapped batch call."""
+        return self.client.set_dependencies_for(dependencies)
@@ -17,9 +17,10 @@ For backward compatibility, we also parse the old format: uuid-stackname-N
 from __future__ import annotations
 
 import re
-import subprocess
 import uuid
 
+from git_stack.plumbing import RepoContext
+
 # Delimiter for Change-ID components (new format)
 CHANGE_ID_DELIMITER = '@'
 
@@ -135,7 +136,7 @@ def generate_change_id(stack_name: str, position: int) -> str:
     return f"{uuid_part}{CHANGE_ID_DELIMITER}{stack_name}{CHANGE_ID_DELIMITER}{position}"
 
 
-def get_git_username() -> str:
+def get_git_username(repo: RepoContext | None = None) -> str:
     """
     Get the username for branch naming.
 
@@ -145,6 +146,10 @@ def get_git_username() -> str:
     3. USER environment variable
     4. "user" as fallback
 
+    Args:
+        repo: Repository context to read the git config from (defaults to
+            a fresh one for the current directory)
+
     Returns:
         Username suitable for branch naming (lowercase, alphanumeric + hyphen)
     """
@@ -156,17 +161,11 @@ def get_git_username() -> str:
         return _sanitize_username(env_user)
 
     # Try git config
-    try:
-        result = subprocess.run(
-            ['git', 'config', 'user.name'],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            return _sanitize_username(result.stdout.strip())
-    except FileNotFoundError:
-        pass
+    if repo is None:
+        repo = RepoContext()
+    config_user = (repo.get_config('user.name') or '').strip()
+    if config_user:
+        return _sanitize_username(config_user)
 
     # Fall back to USER env var
     user = os.getenv('USER')
@@ -200,17 +199,18 @@ def _sanitize_username(name: str) -> str:
     return name or 'user'
 
 
-def get_branch_name(change_id: str) -> str:
+def get_branch_name(change_id: str, repo: RepoContext | None = None) -> str:
     """
     Format branch name for a given Change-Id.
 
     Args:
         change_id: The Change-Id
+        repo: Repository context to read the username from
 
     Returns:
         Branch name in format: username/stack-<change-id>
     """
-    user_name = get_git_username()
+    user_name = get_git_username(repo)
     return f"{user_name}/stack-{change_id}"
 
 
@@ -5,13 +5,16 @@ Command-line interface for git-stack.
 from __future__ import annotations
 
 import argparse
-import subprocess
 import sys
 from pathlib import Path
 from typing import Any
 
-from git_stack.change_id import extract_stack_name
+from git_stack.aio import kill_children
+from git_stack.http_cache import set_cache_enabled
+from git_stack.mapping import MappingStore, create_mapping_backend
+from git_stack.plumbing import RepoContext
 from git_stack.stack import GitStackPush
+from git_stack.timeouts import DeadlineExceededError, set_deadline
 
 # Try to import argcomplete for shell completion
 try:
@@ -29,80 +32,83 @@ class StackNameCompleter:  # pylint: disable=too-few-public-methods
                  **kwargs: Any) -> list[str]:
         """Return list of stack names for completion."""
         try:
-            import json  # pylint: disable=import-outside-toplevel
-
-            repo_root = subprocess.run(
-                ['git', 'rev-parse', '--show-toplevel'],
-                capture_output=True,
-                text=True,
-                check=True,
-            ).stdout.strip()
-
-            mapping_path = Path(repo_root) / '.git' / 'git-stack-mapping.json'
-
-            if not mapping_path.exists():
+            repo = RepoContext()
+            if repo.git_dir is None:
                 return []
 
-            with open(mapping_path) as f:
-                mapping = json.load(f)
+            mapping_path = Path(repo.git_dir) / 'git-stack-mapping.json'
 
-            stack_names = set()
-            for change_id in mapping:
-                stack_name = extract_stack_name(change_id)
-                if stack_name:
-                    stack_names.add(stack_name)
-
-            return sorted(stack_names)
+            store = MappingStore.load(
+                create_mapping_backend(mapping_path, repo=repo), repo)
+            try:
+                return store.stack_names()
+            finally:
+                store.close()
         except Exception:  # pylint: disable=broad-exception-caught
             return []
 
 
 def cmd_push(args: argparse.Namespace) -> None:
     """Handle push subcommand."""
-    stack = GitStackPush(dry_run=args.dry_run, stack_name=args.stack_name)
-    stack.push(base_branch=args.base)
+    with GitStackPush(dry_run=args.dry_run,
+                      stack_name=args.stack_name,
+                      force_sync=args.force_sync) as stack:
+        stack.push(base_branch=args.base)
 
 
 def cmd_clean(args: argparse.Namespace) -> None:
     """Handle clean subcommand."""
-    stack = GitStackPush(dry_run=args.dry_run)
-    stack.clean()
+    with GitStackPush(dry_run=args.dry_run) as stack:
+        stack.clean()
 
 
 def cmd_reindex(args: argparse.Namespace) -> None:
     """Handle reindex subcommand."""
-    stack = GitStackPush(dry_run=args.dry_run, stack_name=args.stack_name)
-    stack.reindex(base_branch=args.base)
+    with GitStackPush(dry_run=args.dry_run,
+                      stack_name=args.stack_name) as stack:
+        stack.reindex(base_branch=args.base)
 
 
-def cmd_list(args: argparse.Namespace) -> None:  # pylint: disable=unused-argument
+def cmd_list(args: argparse.Namespace) -> None:
     """Handle list subcommand."""
-    stack = GitStackPush()
-    stack.list()
+    with GitStackPush(mirror_max_age=args.max_age) as stack:
+        stack.list()
 
 
 def cmd_checkout(args: argparse.Namespace) -> None:
     """Handle checkout subcommand."""
-    stack = GitStackPush(dry_run=args.dry_run)
-    stack.checkout(stack_name=args.stack_name)
+    with GitStackPush(dry_run=args.dry_run) as stack:
+        stack.checkout(stack_name=args.stack_name)
 
 
 def cmd_remove(args: argparse.Namespace) -> None:
     """Handle remove subcommand."""
-    stack = GitStackPush(dry_run=args.dry_run)
-    stack.remove(stack_name=args.stack_name)
+    with GitStackPush(dry_run=args.dry_run) as stack:
+        stack.remove(stack_name=args.stack_name)
 
 
-def cmd_show(args: argparse.Namespace) -> None:  # pylint: disable=unused-argument
+def cmd_show(args: argparse.Namespace) -> None:
     """Handle show subcommand."""
-    stack = GitStackPush()
-    stack.show()
+    with GitStackPush(mirror_max_age=args.max_age) as stack:
+        stack.show()
 
 
 def cmd_status(args: argparse.Namespace) -> None:
     """Handle status subcommand."""
-    stack = GitStackPush()
-    stack.status(base_branch=args.base)
+    with GitStackPush(mirror_max_age=args.max_age) as stack:
+        stack.status(base_branch=args.base)
+
+
+def cmd_adopt(args: argparse.Namespace) -> None:
+    """Handle adopt subcommand."""
+    with GitStackPush(dry_run=args.dry_run) as stack:
+        stack.adopt()
+
+
+def cmd_sync(args: argparse.Namespace) -> None:
+    """Handle sync subcommand."""
+    with GitStackPush() as stack:
+        stack.sync(full=args.full)
 
 
 def main() -> None:
@@ -112,8 +118,34 @@ def main() -> None:
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
 
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Stop the command after SECONDS, killing running git/glab '
+        'processes; finished work is kept',
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Send every GitLab API request without the on-disk HTTP cache',
+    )
+
     subparsers = parser.add_subparsers(dest='command', help='Subcommands')
 
+    # Freshness bound of the local MR mirror, shared by read-only commands
+    max_age_parser = argparse.ArgumentParser(add_help=False)
+    max_age_parser.add_argument(
+        '--max-age',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Refresh the local MR mirror first if it is older than SECONDS '
+        '(default: git-stack.mirror-max-age or 600)',
+    )
+
     # Push subcommand
     push_parser = subparsers.add_parser(
         'push',
@@ -125,6 +157,7 @@ Examples:
   %(prog)s push --base develop               # Stack on 'develop' branch
   %(prog)s push --stack-name feature         # Use 'feature' as stack name
   %(prog)s push --dry-run                    # Show what would be done
+  %(prog)s push --force-sync                 # Update every MR unconditionally
         """,
     )
     push_parser.add_argument(
@@ -145,6 +178,11 @@ Examples:
         action='store_true',
         help='Show what would be done without executing',
     )
+    push_parser.add_argument(
+        '--force-sync',
+        action='store_true',
+        help='Update title and target of every MR, even if unchanged',
+    )
     push_parser.set_defaults(func=cmd_push)
 
     # Clean subcommand
@@ -201,6 +239,7 @@ Examples:
     # List subcommand
     list_parser = subparsers.add_parser(
         'list',
+        parents=[max_age_parser],
         help='List all stacks with their branches and MRs',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
@@ -259,6 +298,7 @@ Examples:
     # Show subcommand
     show_parser = subparsers.add_parser(
         'show',
+        parents=[max_age_parser],
         help='Show information about the current commit',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
@@ -271,6 +311,7 @@ Examples:
     # Status subcommand
     status_parser = subparsers.add_parser(
         'status',
+        parents=[max_age_parser],
         help='Show status of all commits in the current stack',
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
@@ -286,6 +327,42 @@ Examples:
     )
     status_parser.set_defaults(func=cmd_status)
 
+    # Sync subcommand
+    sync_parser = subparsers.add_parser(
+        'sync',
+        help='Refresh the local mirror of your MRs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s sync           # Fetch MRs updated since the last sync
+  %(prog)s sync --full    # Fetch all of your MRs again
+        """,
+    )
+    sync_parser.add_argument(
+        '--full',
+        action='store_true',
+        help='List every MR instead of only those updated since the last sync',
+    )
+    sync_parser.set_defaults(func=cmd_sync)
+
+    # Adopt subcommand
+    adopt_parser = subparsers.add_parser(
+        'adopt',
+        help='Rebuild the mapping from your open MRs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s adopt           # Recover the mapping, e.g. in a new clone
+  %(prog)s adopt --dry-run # Show which MRs would be adopted
+        """,
+    )
+    adopt_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show what would be done without executing',
+    )
+    adopt_parser.set_defaults(func=cmd_adopt)
+
     # Enable argcomplete if available
     if ARGCOMPLETE_AVAILABLE:
         argcomplete.autocomplete(parser)
@@ -296,7 +373,19 @@ Examples:
         parser.print_help()
         sys.exit(1)
 
-    args.func(args)
+    set_deadline(args.deadline)
+    set_cache_enabled(not args.no_cache)
+    try:
+        args.func(args)
+    except KeyboardInterrupt:
+        killed = kill_children()
+        print(f"\nInterrupted, killed {killed} running process(es)",
+              file=sys.stderr)
+        sys.exit(130)
+    except DeadlineExceededError as e:
+        kill_children()
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == '__main__':
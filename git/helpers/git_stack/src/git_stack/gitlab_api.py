@@ -0,0 +1,651 @@
+"""
+Native GitLab REST client.
+
+This client talks to the GitLab v4 API directly using only the standard
+library. Connections are kept alive in a small pool and reused across calls,
+which avoids the process startup, config parsing and TLS handshake that every
+glab invocation pays.
+"""
+
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import queue
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote, urlencode, urlsplit
+
+from git_stack.hosting_client import (
+    MRS_PER_PAGE,
+    ConcurrentHostingClient,
+    HostingError,
+    NoteNotFoundError,
+    fan_out,
+    iid_chunks,
+    merge_chunk_states,
+)
+from git_stack.http_cache import HttpCache, response_entry
+from git_stack.plumbing import RepoContext, parse_remote_url
+from git_stack.ratelimit import (
+    THROTTLE_STATUSES,
+    backoff_delay,
+    get_rate_limiter,
+    throttle_delay,
+)
+from git_stack.timeouts import get_deadline, read_timeouts
+
+# Status codes worth retrying (rate limiting and transient server errors)
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+# Methods that can be repeated after the request may have reached the server
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE'})
+
+
+class GitLabApiError(HostingError):
+    """Raised when a GitLab API request fails."""
+
+    def __init__(self, method: str, path: str, status: int, body: str):
+        super().__init__(f"{method} {path} failed with HTTP {status}: {body}")
+        self.method = method
+        self.path = path
+        self.status = status
+        self.body = body
+
+
+class ResponseLostError(http.client.HTTPException):
+    """Raised when a request was sent but no complete response came back."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of keep-alive HTTP(S) connections to a single host."""
+
+    def __init__(self,
+                 scheme: str,
+                 netloc: str,
+                 max_idle: int = 8,
+                 timeout: float = 30.0):
+        """
+        Initialize the pool.
+
+        Args:
+            scheme: 'http' or 'https'
+            netloc: Host name with optional port
+            max_idle: Maximum number of idle connections kept open
+            timeout: Socket timeout in seconds
+        """
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = (
+            queue.LifoQueue(maxsize=max_idle))
+        self.connections_opened = 0
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        """Open a new connection to the host."""
+        self.connections_opened += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc,
+                                               timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        """Return a connection to the pool, closing it if the pool is full."""
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        """
+        Send a request over a pooled connection.
+
+        A request on a reused connection that fails before a response is
+        received (e.g. the server closed the idle connection) is retried once
+        on a fresh connection. Requests with non-idempotent methods are only
+        retried if they could not be sent, as the server may have processed
+        them otherwise.
+
+        Args:
+            method: HTTP method
+            path: Request path including query string
+            body: Optional request body
+            headers: Optional request headers
+            timeout: Socket timeout of this request (defaults to the pool's)
+
+        Returns:
+            Tuple of (status, lower-cased response headers, response body)
+
+        Raises:
+            ResponseLostError: If the request was sent but the response could
+                not be read
+        """
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = self._new_connection()
+            reused = False
+
+        while True:
+            conn.timeout = self.timeout if timeout is None else timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                sent = True
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if reused and (not sent or method in IDEMPOTENT_METHODS):
+                    conn = self._new_connection()
+                    reused = False
+                    continue
+                if sent:
+                    raise ResponseLostError(f"{method} {path}: {e}") from e
+                raise
+
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, response_headers, data
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _glab_config_path() -> Path:
+    """Return the location of glab's config file."""
+    config_dir = os.getenv('GLAB_CONFIG_DIR')
+    if config_dir:
+        return Path(config_dir) / 'config.yml'
+    xdg_config = os.getenv('XDG_CONFIG_HOME')
+    base = Path(xdg_config) if xdg_config else Path.home() / '.config'
+    return base / 'glab-cli' / 'config.yml'
+
+
+def read_glab_host_config(host: str,
+                          config_path: Path | None = None) -> dict[str, str]:
+    """
+    Read the settings glab stores for a host.
+
+    Only the flat 'key: value' entries below 'hosts:' -> '<host>:' are
+    parsed, which is all glab writes there, so no YAML library is needed.
+
+    Args:
+        host: GitLab host name
+        config_path: Path to glab's config.yml (defaults to glab's location)
+
+    Returns:
+        Dictionary of host settings (e.g. 'token', 'api_protocol'), empty if
+        the host is not configured
+    """
+    path = config_path or _glab_config_path()
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+
+    settings: dict[str, str] = {}
+    in_hosts = False
+    host_indent: int | None = None
+    in_host = False
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        indent = len(line) - len(line.lstrip())
+        if stripped.endswith(':'):
+            key, value = stripped[:-1], ''
+        else:
+            key, _, value = stripped.partition(': ')
+        key = key.strip().strip('"\'')
+        value = value.strip().strip('"\'')
+
+        if indent == 0:
+            in_hosts = key == 'hosts'
+            in_host = False
+            continue
+        if not in_hosts:
+            continue
+
+        if host_indent is None or indent <= host_indent:
+            host_indent = indent
+            in_host = key == host
+            continue
+
+        if in_host and value and not value.startswith('!!'):
+            settings[key] = value
+
+    return settings
+
+
+def read_glab_token(host: str, config_path: Path | None = None) -> str | None:
+    """
+    Get the API token for a host the same way glab does.
+
+    Checks GITLAB_TOKEN / GITLAB_ACCESS_TOKEN / OAUTH_TOKEN first, then the
+    token stored in glab's config file.
+
+    Args:
+        host: GitLab host name
+        config_path: Path to glab's config.yml (defaults to glab's location)
+
+    Returns:
+        The token, or None if none is configured
+    """
+    for env_var in ('GITLAB_TOKEN', 'GITLAB_ACCESS_TOKEN', 'OAUTH_TOKEN'):
+        token = os.getenv(env_var)
+        if token:
+            return token
+    return read_glab_host_config(host, config_path).get('token')
+
+
+class GitLabApiClient(ConcurrentHostingClient):
+    """GitLab client using the REST API over pooled keep-alive connections."""
+
+    def __init__(
+        self,
+        dry_run: bool = False,
+        base_url: str | None = None,
+        project: str | None = None,
+        token: str | None = None,
+        max_idle_connections: int = 8,
+        repo: RepoContext | None = None,
+        cache: HttpCache | None = None,
+    ):
+        """
+        Initialize the GitLab API client.
+
+        Args:
+            dry_run: If True, print requests instead of sending them
+            base_url: API root, e.g. 'https://gitlab.com/api/v4' (defaults to
+                the host of the 'origin' remote)
+            project: Project path, e.g. 'group/project' (defaults to the
+                project of the 'origin' remote)
+            token: API token (defaults to the token glab uses)
+            max_idle_connections: Maximum number of pooled idle connections
+            repo: Repository context to read the 'origin' remote, the host's
+                rate limits and the request timeout from
+            cache: On-disk cache to revalidate GET responses against, None
+                to send every GET unconditionally
+        """
+        super().__init__()
+        self.dry_run = dry_run
+
+        if repo is None:
+            repo = RepoContext()
+        if base_url is None or project is None:
+            url = repo.remote_url('origin')
+            if url is None:
+                raise HostingError('Could not determine GitLab project: '
+                                   "no 'origin' remote")
+            host, remote_project = parse_remote_url(url)
+            if base_url is None:
+                host_config = read_glab_host_config(host)
+                api_host = host_config.get('api_host', host)
+                protocol = host_config.get('api_protocol', 'https')
+                base_url = f"{protocol}://{api_host}/api/v4"
+            if project is None:
+                project = remote_project
+
+        parts = urlsplit(base_url)
+        self.base_path = parts.path.rstrip('/')
+        self.project = project
+        self.project_path = (f"{self.base_path}/projects/"
+                             f"{quote(project, safe='')}")
+
+        if token is None:
+            token = read_glab_token(parts.hostname or '')
+        self.token = token
+
+        self.pool = ConnectionPool(parts.scheme,
+                                   parts.netloc,
+                                   max_idle=max_idle_connections)
+
+        # Shared by every client of the host in this process
+        self.limiter = get_rate_limiter(parts.hostname or '', repo)
+        self.timeout = read_timeouts(repo)['api']
+        self.max_workers = self.limiter.max_concurrency
+        self.cache = cache
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.pool.close()
+
+    def _headers(self) -> dict[str, str]:
+        """Build the headers sent with every request."""
+        headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'User-Agent': 'git-stack',
+        }
+        if self.token:
+            headers['PRIVATE-TOKEN'] = self.token
+        return headers
+
+    def _request_raw(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict[str, Any] | list[tuple[str, Any]] | None = None,
+        data: dict[str, Any] | None = None,
+        retries: int = 3,
+    ) -> tuple[dict[str, str], Any]:
+        """
+        Send an API request with retry logic.
+
+        Args:
+            method: HTTP method
+            endpoint: Path relative to the project (e.g. 'merge_requests/1'),
+                or absolute below the API root if it starts with '/'
+            params: Query parameters
+            data: JSON body
+            retries: Number of attempts for transient failures
+
+        Returns:
+            Tuple of (response headers, decoded JSON body or None)
+
+        Raises:
+            GitLabApiError: If the request fails
+        """
+        if endpoint.startswith('/'):
+            path = f"{self.base_path}{endpoint}"
+        else:
+            path = f"{self.project_path}/{endpoint}"
+        if params:
+            path = f"{path}?{urlencode(params)}"
+
+        if self.dry_run:
+            print(f"[DRY-RUN] Would request: {method} {path}")
+            return {}, None
+
+        body = json.dumps(data).encode() if data is not None else None
+
+        # Stored GET responses are revalidated instead of fetched again.
+        # The token is part of the key, so users never share entries.
+        cache_key = f"{self.token or ''}\n{path}"
+        cached = (self.cache.get(cache_key)
+                  if self.cache is not None and method == 'GET' else None)
+        request_headers = self._headers()
+        if cached is not None:
+            request_headers.update(cached.conditional_headers())
+
+        for attempt in range(retries):
+            # Raises DeadlineExceededError once the deadline has passed,
+            # also while waiting for the rate limiter
+            deadline = get_deadline()
+            self.limiter.acquire(deadline)
+            try:
+                status, headers, payload = self.pool.request(
+                    method, path, body, request_headers,
+                    deadline.cap(self.timeout))
+            except (http.client.HTTPException, OSError) as e:
+                self.limiter.release()
+                # A timeout cut short by the deadline is reported as such
+                get_deadline().cap(None)
+                # Repeating a POST the server may have processed would e.g.
+                # add a note twice
+                retryable = (method in IDEMPOTENT_METHODS or
+                             not isinstance(e, ResponseLostError))
+                if retryable and attempt < retries - 1:
+                    time.sleep(backoff_delay(attempt))
+                    continue
+                raise GitLabApiError(method, path, 0, str(e)) from e
+            except BaseException:
+                self.limiter.release()
+                raise
+            self.limiter.release(throttled=status in THROTTLE_STATUSES)
+
+            # Retry-After or an exhausted RateLimit-Remaining pause every
+            # call to the host; other failures only back off this one
+            delay = throttle_delay(headers)
+            if delay is not None:
+                self.limiter.pause(delay)
+            if status in RETRYABLE_STATUSES and attempt < retries - 1:
+                if delay is None:
+                    time.sleep(backoff_delay(attempt))
+                continue
+
+            if status == 304 and cached is not None:
+                return cached.headers, (json.loads(cached.body)
+                                        if cached.body.strip() else None)
+
+            text = payload.decode('utf-8', errors='replace')
+            if status >= 400:
+                error = GitLabApiError(method, path, status, text)
+                if status != 404:
+                    print(f"Error: {error}", file=sys.stderr)
+                raise error
+
+            if self.cache is not None and method == 'GET' and status == 200:
+                entry = response_entry(text, headers)
+                if entry is not None:
+                    self.cache.put(cache_key, entry)
+
+            return headers, json.loads(text) if text.strip() else None
+
+        raise AssertionError('unreachable')
+
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict[str, Any] | list[tuple[str, Any]] | None = None,
+        data: dict[str, Any] | None = None,
+    ) -> Any:
+        """Send an API request and return the decoded JSON body."""
+        return self._request_raw(method, endpoint, params, data)[1]
+
+    def _iter_pages(
+        self,
+        endpoint: str,
+        params: dict[str, Any] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield the items of a list endpoint, fetching pages as they are used.
+
+        Args:
+            endpoint: List endpoint relative to the project
+            params: Query parameters
+
+        Yields:
+            Items from all pages, in order
+        """
+        page_params = dict(params or {})
+        page_params.setdefault('per_page', 100)
+        page = '1'
+
+        while page:
+            page_params['page'] = page
+            headers, data = self._request_raw('GET', endpoint, page_params)
+            if not data:
+                break
+            yield from data
+            page = headers.get('x-next-page', '')
+
+    def _paginate(
+        self,
+        endpoint: str,
+        params: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Fetch all pages of a list endpoint.
+
+        Args:
+            endpoint: List endpoint relative to the project
+            params: Query parameters
+
+        Returns:
+            Concatenated items from all pages
+        """
+        return list(self._iter_pages(endpoint, params))
+
+    def create_mr(self, source_branch: str, target_branch: str, title: str,
+                  description: str) -> dict[str, Any]:
+        """Create a GitLab merge request."""
+        mr = self._request(
+            'POST', 'merge_requests', data={
+                'source_branch': source_branch,
+                'target_branch': target_branch,
+                'title': title,
+                'description': description,
+                'remove_source_branch': True,
+            })
+        if not mr:
+            return {'mr_iid': 0, 'mr_url': ''}
+        self._remember_mr(mr)
+        return {'mr_iid': mr['iid'], 'mr_url': mr['web_url']}
+
+    def update_mr(self,
+                  mr_iid: int,
+                  title: str,
+                  target_branch: str | None = None) -> None:
+        """Update a GitLab merge request."""
+        changes: dict[str, Any] = {'title': title}
+        if target_branch:
+            changes['target_branch'] = target_branch
+        self._request('PUT',
+                      f"merge_requests/{mr_iid}",
+                      data={
+                          **changes, 'remove_source_branch': True
+                      })
+        self._update_cached_mr(mr_iid, changes)
+
+    def get_mr_state(self, mr_iid: int) -> str:
+        """
+        Get GitLab merge request state.
+
+        Returns:
+            State string: 'opened', 'closed', or 'merged'
+        """
+        mr_data = self._request('GET', f"merge_requests/{mr_iid}")
+
+        if not mr_data:
+            raise ValueError(f"Could not get MR !{mr_iid} data")
+
+        state = mr_data.get('state')
+        if not state:
+            raise ValueError(f"Could not determine state for MR !{mr_iid}")
+
+        return str(state)
+
+    def close_mr(self, mr_iid: int) -> None:
+        """Close a GitLab merge request."""
+        self._request('PUT',
+                      f"merge_requests/{mr_iid}",
+                      data={'state_event': 'close'})
+        self._update_cached_mr(mr_iid, None)
+
+    def add_mr_note(self, mr_iid: int, body: str) -> int | None:
+        """Add a note/comment to GitLab merge request."""
+        note = self._request('POST',
+                             f"merge_requests/{mr_iid}/notes",
+                             data={'body': body})
+        return note['id'] if isinstance(note, dict) else None
+
+    def update_mr_note(self, mr_iid: int, note_id: int, body: str) -> None:
+        """Update a note/comment on GitLab merge request."""
+        try:
+            self._request('PUT',
+                          f"merge_requests/{mr_iid}/notes/{note_id}",
+                          data={'body': body})
+        except GitLabApiError as e:
+            if e.status == 404:
+                raise NoteNotFoundError(
+                    f"Note {note_id} not found in MR !{mr_iid}") from e
+            raise
+
+    def get_mr_notes(self, mr_iid: int) -> list[dict[str, Any]]:
+        """Get all notes from GitLab merge request."""
+        try:
+            notes = self._paginate(f"merge_requests/{mr_iid}/notes")
+        except json.JSONDecodeError as e:
+            # An empty list would read as "the MR has no notes"
+            raise HostingError(
+                f"Could not list notes of MR !{mr_iid}: {e}") from e
+
+        # Return simplified structure, excluding system notes
+        return [{
+            'id': note['id'],
+            'body': note['body']
+        } for note in notes if not note.get('system', False)]
+
+    def set_mr_dependencies(self, mr_iid: int,
+                            blocking_mr_iids: list[int]) -> None:
+        """Set GitLab merge request dependencies."""
+        # Note: This feature requires GitLab Premium/Ultimate tier
+        for blocking_mr_iid in blocking_mr_iids:
+            try:
+                self._request(
+                    'POST',
+                    f"merge_requests/{mr_iid}/blocks",
+                    params={'blocking_merge_request_id': blocking_mr_iid})
+            except GitLabApiError as e:
+                if e.status == 404:
+                    raise ValueError(
+                        'GitLab MR dependencies feature is not available on '
+                        'this instance (requires Premium/Ultimate tier)'
+                    ) from e
+                raise
+
+    def _lookup_source_branch(self,
+                              source_branch: str) -> dict[str, Any] | None:
+        """Find the open MR of a source branch with one filtered request."""
+        mrs_data = self._request('GET', 'merge_requests', {
+            'state': 'opened',
+            'source_branch': source_branch,
+        })
+        return mrs_data[0] if mrs_data else None
+
+    def _iter_own_mrs(
+            self,
+            state: str = 'opened',
+            updated_after: str | None = None) -> Iterator[dict[str, Any]]:
+        """Yield the user's MRs, requesting one page at a time."""
+        params = {
+            'state': state,
+            'scope': 'created_by_me',
+            'per_page': MRS_PER_PAGE,
+        }
+        if updated_after:
+            params['updated_after'] = updated_after
+        return self._iter_pages('merge_requests', params)
+
+    def _get_mr_states_chunk(self, chunk: tuple[int, ...]) -> dict[int, str]:
+        """Get the states of up to MAX_IIDS_PER_REQUEST MRs in one request."""
+        params: list[tuple[str, Any]] = [('iids[]', iid) for iid in chunk]
+        params += [('state', 'all'), ('per_page', len(chunk))]
+        mrs_data = self._request('GET', 'merge_requests', params) or []
+        return {
+            int(mr['iid']): str(mr['state'])
+            for mr in mrs_data
+            if mr.get('state')
+        }
+
+    def get_mr_states(self, mr_iids: Iterable[int]) -> dict[int, str]:
+        """Get GitLab MR states with parallel iids[]-filtered list requests."""
+        return merge_chunk_states(
+            fan_out(self._get_mr_states_chunk, iid_chunks(mr_iids),
+                    self.max_workers))
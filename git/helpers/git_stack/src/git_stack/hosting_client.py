@@ -11,14 +11,103 @@ import json
 import re
 import subprocess
 import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar
+from urllib.parse import quote
+
+from git_stack.aio import run_process_blocking
+from git_stack.plumbing import RepoContext, parse_remote_url
+from git_stack.ratelimit import (
+    backoff_delay,
+    get_rate_limiter,
+    glab_throttle_delay,
+)
+from git_stack.timeouts import get_deadline, read_timeouts
+
+_T = TypeVar('_T')
+_R = TypeVar('_R')
+
+# Maximum number of MR IIDs GitLab accepts per iids[] filtered list request
+MAX_IIDS_PER_REQUEST = 100
+
+# Default number of concurrent calls used by fan-out batch implementations
+DEFAULT_FAN_OUT_WORKERS = 4
+
+# Open MRs per page when listing the user's MRs (GitLab's maximum)
+MRS_PER_PAGE = 100
+
+# Above this many unknown branches, listing the user's open MRs is cheaper
+# than one source_branch lookup per branch
+MAX_SOURCE_BRANCH_LOOKUPS = 8
+
+
+class HostingError(Exception):
+    """Raised when a request to the git hosting service fails."""
+
+
+class NoteNotFoundError(HostingError):
+    """Raised when a note to update does not exist (anymore)."""
+
+
+def glab_not_found(output: str) -> bool:
+    """
+    Check whether a failed glab call was answered with HTTP 404.
+
+    Args:
+        output: stderr and stdout of the glab call
+
+    Returns:
+        True if the output reports a 404 status
+    """
+    return re.search(r'\b404 not found\b|\bhttp 404\b',
+                     output.lower()) is not None
+
+
+def fan_out(func: Callable[[_T], _R],
+            items: Iterable[_T],
+            max_workers: int = DEFAULT_FAN_OUT_WORKERS
+            ) -> dict[_T, _R | Exception]:
+    """
+    Call a function for each item concurrently with bounded parallelism.
+
+    Args:
+        func: Function to call with each item
+        items: Items to process (must be hashable)
+        max_workers: Maximum number of concurrent calls
+
+    Returns:
+        Mapping of each item to its result, or to the exception it raised
+    """
+    unique_items = list(dict.fromkeys(items))
+    results: dict[_T, _R | Exception] = {}
+    if not unique_items:
+        return results
+
+    def call(item: _T) -> _R | Exception:
+        try:
+            return func(item)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            return e
+
+    workers = max(1, min(len(unique_items), max_workers))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for item, result in zip(unique_items,
+                                executor.map(call, unique_items)):
+            results[item] = result
+    return results
 
 
 class GitHostingClient(ABC):
     """Abstract base class for git hosting service clients."""
 
+    # Number of calls callers may usefully run against the client at once
+    max_workers = DEFAULT_FAN_OUT_WORKERS
+
     @abstractmethod
     def create_mr(self, source_branch: str, target_branch: str, title: str,
                   description: str) -> dict[str, Any]:
@@ -71,13 +160,16 @@ class GitHostingClient(ABC):
         """
 
     @abstractmethod
-    def add_mr_note(self, mr_iid: int, body: str) -> None:
+    def add_mr_note(self, mr_iid: int, body: str) -> int | None:
         """
         Add a note/comment to merge/pull request.
 
         Args:
             mr_iid: MR/PR ID
             body: Comment body text
+
+        Returns:
+            ID of the new note, or None if the backend can't tell
         """
 
     @abstractmethod
@@ -90,6 +182,9 @@ class GitHostingClient(ABC):
 
         Returns:
             List of notes with 'id' and 'body' fields
+
+        Raises:
+            HostingError: If the notes can't be listed
         """
 
     @abstractmethod
@@ -101,6 +196,9 @@ class GitHostingClient(ABC):
             mr_iid: MR/PR ID
             note_id: Note/comment ID
             body: New comment body text
+
+        Raises:
+            NoteNotFoundError: If the note does not exist
         """
 
     @abstractmethod
@@ -139,19 +237,464 @@ class GitHostingClient(ABC):
             MR info dict with 'mr_iid', 'mr_url', 'state' if found, None otherwise
         """
 
+    # Batch operations. The defaults loop over the single-MR methods; backends
+    # override them with bulk requests or parallel fan-out.
+
+    def get_mr_states(self, mr_iids: Iterable[int]) -> dict[int, str]:
+        """
+        Get the states of many merge/pull requests.
+
+        Args:
+            mr_iids: MR/PR IDs
+
+        Returns:
+            Mapping of MR/PR ID to state. MRs whose state could not be
+            determined are omitted.
+        """
+        states: dict[int, str] = {}
+        for mr_iid in mr_iids:
+            try:
+                states[mr_iid] = self.get_mr_state(mr_iid)
+            except (subprocess.CalledProcessError, HostingError, ValueError):
+                continue
+        return states
+
+    def find_mrs_by_stack_names(
+            self, stack_names: Iterable[str]) -> dict[str, list[dict[str, Any]]]:
+        """
+        Find the MRs belonging to several stacks.
+
+        Args:
+            stack_names: Stack names to search for
+
+        Returns:
+            Mapping of stack name to its MRs (see find_mrs_by_stack_name()).
+            Stacks whose MRs could not be listed are omitted.
+        """
+        mrs: dict[str, list[dict[str, Any]]] = {}
+        for stack_name in stack_names:
+            try:
+                mrs[stack_name] = self.find_mrs_by_stack_name(stack_name)
+            except (subprocess.CalledProcessError, HostingError, ValueError):
+                continue
+        return mrs
+
+    def find_open_mrs_by_source_branches(
+        self, source_branches: Iterable[str]
+    ) -> dict[str, dict[str, Any] | None]:
+        """
+        Find the open MRs of several source branches.
+
+        Args:
+            source_branches: Source branch names to search for
+
+        Returns:
+            Mapping of branch to its MR info dict (see
+            find_mr_by_source_branch()), or None if it has no open MR.
+            Branches whose lookup failed are omitted.
+        """
+        return {
+            branch: self.find_mr_by_source_branch(branch)
+            for branch in dict.fromkeys(source_branches)
+        }
+
+    def list_own_mrs(self,
+                     updated_after: str | None = None) -> list[dict[str, Any]]:
+        """
+        List the MRs the user created, in any state.
+
+        Args:
+            updated_after: Only list MRs updated after this ISO 8601 time
+
+        Returns:
+            MR info dicts (see mr_info_from_api()) with 'updated_at'
+
+        Raises:
+            HostingError: If the backend can't list MRs
+        """
+        raise HostingError(
+            f"{type(self).__name__} does not support listing MRs")
+
+    def close_mrs(self, mr_iids: Iterable[int]) -> dict[int, Exception | None]:
+        """
+        Close many merge/pull requests.
+
+        Args:
+            mr_iids: MR/PR IDs
+
+        Returns:
+            Mapping of MR/PR ID to None on success or the raised exception
+        """
+        results: dict[int, Exception | None] = {}
+        for mr_iid in mr_iids:
+            try:
+                self.close_mr(mr_iid)
+                results[mr_iid] = None
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                results[mr_iid] = e
+        return results
+
+    def update_mrs(
+            self,
+            updates: Iterable[dict[str, Any]]) -> dict[int, Exception | None]:
+        """
+        Update many merge/pull requests.
+
+        Args:
+            updates: Dicts with 'mr_iid', 'title' and optional 'target_branch'
+
+        Returns:
+            Mapping of MR/PR ID to None on success or the raised exception
+        """
+        results: dict[int, Exception | None] = {}
+        for update in updates:
+            try:
+                self.update_mr(update['mr_iid'], update['title'],
+                               update.get('target_branch'))
+                results[update['mr_iid']] = None
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                results[update['mr_iid']] = e
+        return results
+
+    def get_notes_for(
+            self, mr_iids: Iterable[int]) -> dict[int, list[dict[str, Any]]]:
+        """
+        Get the notes/comments of many merge/pull requests.
+
+        Args:
+            mr_iids: MR/PR IDs
+
+        Returns:
+            Mapping of MR/PR ID to its notes (see get_mr_notes()). MRs whose
+            notes could not be fetched are omitted.
+        """
+        notes: dict[int, list[dict[str, Any]]] = {}
+        for mr_iid in mr_iids:
+            try:
+                notes[mr_iid] = self.get_mr_notes(mr_iid)
+            except (subprocess.CalledProcessError, HostingError, ValueError):
+                continue
+        return notes
+
+    def set_dependencies_for(
+        self, dependencies: dict[int, list[int]]
+    ) -> dict[int, Exception | None]:
+        """
+        Set dependencies (blocking MRs) for many merge/pull requests.
+
+        Args:
+            dependencies: Mapping of MR/PR ID to the IDs blocking it
+
+        Returns:
+            Mapping of MR/PR ID to None on success or the raised exception.
+            A ValueError means the feature is not available.
+        """
+        results: dict[int, Exception | None] = {}
+        for mr_iid, blocking_mr_iids in dependencies.items():
+            try:
+                self.set_mr_dependencies(mr_iid, blocking_mr_iids)
+                results[mr_iid] = None
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                results[mr_iid] = e
+        return results
+
+
+def group_mrs_by_stack_name(
+        mrs_data: Iterable[dict[str, Any]],
+        stack_names: Iterable[str]) -> dict[str, list[dict[str, Any]]]:
+    """
+    Group raw MR list entries by the stack their source branch belongs to.
+
+    Args:
+        mrs_data: MRs as returned by the hosting API
+        stack_names: Stack names to group by
+
+    Returns:
+        Mapping of every stack name to the MR info dicts of its MRs
+    """
+    grouped: dict[str, list[dict[str, Any]]] = {
+        stack_name: [] for stack_name in stack_names
+    }
+    for mr in mrs_data:
+        source_branch = mr.get('source_branch', '')
+        # Branch format: user/stack-uuid@stackname@position
+        for stack_name, mrs in grouped.items():
+            if f'@{stack_name}@' in source_branch:
+                mrs.append({
+                    'mr_iid': mr['iid'],
+                    'source_branch': source_branch,
+                    'target_branch': mr.get('target_branch', ''),
+                    'state': mr.get('state', 'opened'),
+                    'title': mr.get('title', ''),
+                })
+    return grouped
+
+
+def mr_info_from_api(mr: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convert a raw MR list entry to the MR info dict the clients return.
+
+    Args:
+        mr: MR as returned by the hosting API
+
+    Returns:
+        MR info dict with 'mr_iid', 'mr_url', 'state', 'source_branch',
+        'target_branch' and 'title'
+    """
+    return {
+        'mr_iid': mr['iid'],
+        'mr_url': mr.get('web_url', ''),
+        'state': mr.get('state', 'opened'),
+        'source_branch': mr.get('source_branch', ''),
+        'target_branch': mr.get('target_branch', ''),
+        'title': mr.get('title', ''),
+    }
+
+
+def _errors_only(
+        results: dict[int, Any | Exception]) -> dict[int, Exception | None]:
+    """Reduce fan_out() results of write calls to their exceptions."""
+    return {
+        key: value if isinstance(value, Exception) else None
+        for key, value in results.items()
+    }
+
+
+def iid_chunks(mr_iids: Iterable[int]) -> list[tuple[int, ...]]:
+    """Split MR IDs into chunks that fit one iids[] filtered list request."""
+    iids = list(dict.fromkeys(mr_iids))
+    return [
+        tuple(iids[start:start + MAX_IIDS_PER_REQUEST])
+        for start in range(0, len(iids), MAX_IIDS_PER_REQUEST)
+    ]
+
+
+def merge_chunk_states(
+        results: dict[tuple[int, ...], dict[int, str] | Exception]
+) -> dict[int, str]:
+    """Merge fan_out() results of per-chunk state lookups, skipping failures."""
+    states: dict[int, str] = {}
+    for chunk_states in results.values():
+        if not isinstance(chunk_states, Exception):
+            states.update(chunk_states)
+    return states
+
+
+class ConcurrentHostingClient(GitHostingClient):
+    """
+    Hosting client whose batch operations fan out single-MR calls in parallel.
+
+    Suitable for backends where every call is an independent round trip
+    (a glab process or an HTTP request) with no bulk endpoint available.
+
+    MR discovery is filtered on the server: known branches are looked up by
+    source_branch, and stacks are found in a listing of the user's own open
+    MRs (scope=created_by_me) that stops paginating once every wanted branch
+    is resolved. Results are cached for the lifetime of the client, which is
+    one command; creating, updating or closing an MR updates the cache.
+    """
+
+    max_source_branch_lookups = MAX_SOURCE_BRANCH_LOOKUPS
+
+    def __init__(self) -> None:
+        # Raw open MR (or None) per source branch looked up so far
+        self._open_mrs: dict[str, dict[str, Any] | None] = {}
+        # Whether _open_mrs holds every open MR of the user
+        self._own_mrs_listed = False
+        self._discovery_lock = threading.Lock()
+
+    @abstractmethod
+    def _lookup_source_branch(self,
+                              source_branch: str) -> dict[str, Any] | None:
+        """
+        Find the raw open MR of a source branch with one filtered request.
+
+        Raises on failure, unlike find_mr_by_source_branch().
+        """
+
+    @abstractmethod
+    def _iter_own_mrs(
+            self,
+            state: str = 'opened',
+            updated_after: str | None = None) -> Iterator[dict[str, Any]]:
+        """
+        Yield the user's raw MRs, fetching pages as they are used.
+
+        Args:
+            state: MR state to filter on ('opened', 'all', ...)
+            updated_after: Only MRs updated after this ISO 8601 time
+        """
+
+    def _remember_mr(self, mr: dict[str, Any]) -> None:
+        """Cache an MR that was just created."""
+        with self._discovery_lock:
+            self._open_mrs[mr['source_branch']] = mr
+
+    def _update_cached_mr(self, mr_iid: int,
+                          changes: dict[str, Any] | None) -> None:
+        """
+        Apply a write to a cached MR.
+
+        Args:
+            mr_iid: MR that was changed
+            changes: Fields that changed, or None if the MR was closed
+        """
+        with self._discovery_lock:
+            for branch, mr in self._open_mrs.items():
+                if mr is not None and mr['iid'] == mr_iid:
+                    self._open_mrs[branch] = (None if changes is None else {
+                        **mr,
+                        **changes
+                    })
+
+    def _scan_own_open_mrs(self, wanted: set[str] | None) -> None:
+        """
+        List the user's open MRs into the cache.
+
+        Args:
+            wanted: Branches to resolve; listing stops once all are found.
+                None lists every open MR of the user.
+        """
+        pending = set(wanted) if wanted is not None else None
+        for mr in self._iter_own_mrs():
+            with self._discovery_lock:
+                self._open_mrs[mr['source_branch']] = mr
+            if pending is not None:
+                pending.discard(mr['source_branch'])
+                if not pending:
+                    return
+        with self._discovery_lock:
+            for branch in wanted or ():
+                self._open_mrs.setdefault(branch, None)
+            self._own_mrs_listed = True
+
+    def find_open_mrs_by_source_branches(
+        self, source_branches: Iterable[str]
+    ) -> dict[str, dict[str, Any] | None]:
+        """Find open MRs by source branch with server-side filtering."""
+        branches = list(dict.fromkeys(source_branches))
+        with self._discovery_lock:
+            unknown = [b for b in branches if b not in self._open_mrs]
+            listed = self._own_mrs_listed
+        if unknown and listed:
+            # Stack branches are the user's own; none of these has an MR
+            with self._discovery_lock:
+                for branch in unknown:
+                    self._open_mrs.setdefault(branch, None)
+        elif len(unknown) > self.max_source_branch_lookups:
+            try:
+                self._scan_own_open_mrs(set(unknown))
+            except (subprocess.CalledProcessError, HostingError, ValueError):
+                pass
+        elif unknown:
+            results = fan_out(self._lookup_source_branch, unknown,
+                              self.max_workers)
+            with self._discovery_lock:
+                for branch, mr in results.items():
+                    if not isinstance(mr, Exception):
+                        self._open_mrs[branch] = mr
+
+        with self._discovery_lock:
+            return {
+                branch: (None if self._open_mrs[branch] is None else
+                         mr_info_from_api(self._open_mrs[branch]))
+                for branch in branches
+                if branch in self._open_mrs
+            }
+
+    def find_mr_by_source_branch(self,
+                                 source_branch: str) -> dict[str, Any] | None:
+        """Find an open MR by its source branch name."""
+        return self.find_open_mrs_by_source_branches([source_branch
+                                                     ]).get(source_branch)
+
+    def find_mrs_by_stack_names(
+            self, stack_names: Iterable[str]) -> dict[str, list[dict[str, Any]]]:
+        """Find the MRs of several stacks among the user's open MRs."""
+        if not self._own_mrs_listed:
+            try:
+                self._scan_own_open_mrs(None)
+            except (subprocess.CalledProcessError, HostingError, ValueError):
+                return {}
+        with self._discovery_lock:
+            own_mrs = [mr for mr in self._open_mrs.values() if mr is not None]
+        return group_mrs_by_stack_name(own_mrs, stack_names)
+
+    def find_mrs_by_stack_name(self, stack_name: str) -> list[dict[str, Any]]:
+        """Find all MRs of a stack among the user's open MRs."""
+        return self.find_mrs_by_stack_names([stack_name]).get(stack_name, [])
+
+    def list_own_mrs(self,
+                     updated_after: str | None = None) -> list[dict[str, Any]]:
+        """List the user's MRs with one scoped, paginated listing."""
+        return [{
+            **mr_info_from_api(mr), 'updated_at': mr.get('updated_at', '')
+        } for mr in self._iter_own_mrs('all', updated_after)]
+
+    def close_mrs(self, mr_iids: Iterable[int]) -> dict[int, Exception | None]:
+        """Close MRs with parallel calls."""
+        return _errors_only(fan_out(self.close_mr, mr_iids, self.max_workers))
+
+    def update_mrs(
+            self,
+            updates: Iterable[dict[str, Any]]) -> dict[int, Exception | None]:
+        """Update MRs with parallel calls."""
+        by_iid = {update['mr_iid']: update for update in updates}
+        return _errors_only(
+            fan_out(
+                lambda iid: self.update_mr(iid, by_iid[iid]['title'],
+                                           by_iid[iid].get('target_branch')),
+                by_iid, self.max_workers))
+
+    def get_notes_for(
+            self, mr_iids: Iterable[int]) -> dict[int, list[dict[str, Any]]]:
+        """Get notes of MRs with parallel calls."""
+        results = fan_out(self.get_mr_notes, mr_iids, self.max_workers)
+        return {
+            iid: notes
+            for iid, notes in results.items()
+            if not isinstance(notes, Exception)
+        }
+
+    def set_dependencies_for(
+        self, dependencies: dict[int, list[int]]
+    ) -> dict[int, Exception | None]:
+        """Set MR dependencies with parallel calls."""
+        return _errors_only(
+            fan_out(
+                lambda iid: self.set_mr_dependencies(iid, dependencies[iid]),
+                dependencies, self.max_workers))
 
-class GitLabClient(GitHostingClient):
+
+class GitLabClient(ConcurrentHostingClient):
     """GitLab client using glab CLI with JSON API for reliable parsing."""
 
-    def __init__(self, dry_run: bool = False):
+    def __init__(self,
+                 dry_run: bool = False,
+                 repo: RepoContext | None = None):
         """
         Initialize GitLab client.
 
         Args:
             dry_run: If True, print commands instead of executing
+            repo: Repository context to find the host, its rate limits and
+                the timeout of glab calls
         """
+        super().__init__()
         self.dry_run = dry_run
 
+        if repo is None:
+            repo = RepoContext()
+        self.timeout = read_timeouts(repo)['api']
+        url = repo.remote_url('origin')
+        try:
+            host = parse_remote_url(url)[0] if url else 'glab'
+        except ValueError:
+            host = 'glab'
+        # Shared by every client of the host in this process
+        self.limiter = get_rate_limiter(host, repo)
+        self.max_workers = self.limiter.max_concurrency
+
     def _run_glab_command(self,
                           args: list[str],
                           check: bool = True,
@@ -174,34 +717,40 @@ class GitLabClient(GitHostingClient):
         last_error: subprocess.CalledProcessError | None = None
 
         for attempt in range(retries):
+            self.limiter.acquire(get_deadline())
             try:
-                result = subprocess.run(
-                    ['glab'] + args,
-                    capture_output=True,
-                    text=True,
-                    check=False,
-                )
+                result = run_process_blocking(['glab'] + args,
+                                              timeout=self.timeout)
             except FileNotFoundError:
+                self.limiter.release()
                 print(
                     'Error: glab CLI not found. Install from: '
                     'https://gitlab.com/gitlab-org/cli',
                     file=sys.stderr,
                 )
                 sys.exit(1)
+            except BaseException:
+                self.limiter.release()
+                raise
 
+            delay = (None if result.returncode == 0 else
+                     glab_throttle_delay(result.stderr + result.stdout))
+            self.limiter.release(throttled=delay is not None)
             if result.returncode == 0:
                 return result.stdout.strip()
 
             # Check if this is a retryable error (network issues, rate limiting)
             error_output = result.stderr.lower() + result.stdout.lower()
-            retryable = any(
-                x in error_output for x in
-                ['timeout', 'connection', 'rate limit', '503', '502', '504'])
+            retryable = delay is not None or any(
+                x in error_output
+                for x in ['timeout', 'connection', '503', '502', '504'])
 
             if retryable and attempt < retries - 1:
-                import time  # pylint: disable=import-outside-toplevel
-
-                time.sleep(2**attempt)  # Exponential backoff
+                if delay is not None:
+                    # Throttling applies to every call to the host
+                    self.limiter.pause(delay or backoff_delay(attempt))
+                else:
+                    time.sleep(backoff_delay(attempt))
                 continue
 
             last_error = subprocess.CalledProcessError(result.returncode,
@@ -270,6 +819,14 @@ class GitLabClient(GitHostingClient):
             raise ValueError(
                 f"Could not parse MR IID/URL from glab output: {output}")
 
+        self._remember_mr({
+            'iid': mr_iid,
+            'web_url': mr_url,
+            'state': 'opened',
+            'source_branch': source_branch,
+            'target_branch': target_branch,
+            'title': title,
+        })
         return {'mr_iid': mr_iid, 'mr_url': mr_url}
 
     def update_mr(self,
@@ -281,9 +838,12 @@ class GitLabClient(GitHostingClient):
             'mr', 'update',
             str(mr_iid), '--title', title, '--remove-source-branch'
         ]
+        changes = {'title': title}
         if target_branch:
             cmd.extend(['--target-branch', target_branch])
+            changes['target_branch'] = target_branch
         self._run_glab_command(cmd)
+        self._update_cached_mr(mr_iid, changes)
 
     def get_mr_state(self, mr_iid: int) -> str:
         """
@@ -306,21 +866,40 @@ class GitLabClient(GitHostingClient):
     def close_mr(self, mr_iid: int) -> None:
         """Close a GitLab merge request."""
         self._run_glab_command(['mr', 'close', str(mr_iid)])
+        self._update_cached_mr(mr_iid, None)
 
-    def add_mr_note(self, mr_iid: int, body: str) -> None:
+    def add_mr_note(self, mr_iid: int, body: str) -> int | None:
         """Add a note/comment to GitLab merge request."""
-        self._run_glab_command(['mr', 'note', str(mr_iid), '--message', body])
-
-    def update_mr_note(self, mr_iid: int, note_id: int, body: str) -> None:
-        """Update a note/comment on GitLab merge request."""
-        self._run_glab_command([
+        # Use the API rather than 'glab mr note' to learn the new note's ID
+        output = self._run_glab_command([
             'api',
             '-X',
-            'PUT',
-            f"projects/:id/merge_requests/{mr_iid}/notes/{note_id}",
+            'POST',
+            f"projects/:id/merge_requests/{mr_iid}/notes",
             '-f',
             f"body={body}",
         ])
+        try:
+            return int(json.loads(output)['id'])
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+
+    def update_mr_note(self, mr_iid: int, note_id: int, body: str) -> None:
+        """Update a note/comment on GitLab merge request."""
+        try:
+            self._run_glab_command([
+                'api',
+                '-X',
+                'PUT',
+                f"projects/:id/merge_requests/{mr_iid}/notes/{note_id}",
+                '-f',
+                f"body={body}",
+            ])
+        except subprocess.CalledProcessError as e:
+            if glab_not_found(f"{e.stderr}{e.stdout}"):
+                raise NoteNotFoundError(
+                    f"Note {note_id} not found in MR !{mr_iid}") from e
+            raise
 
     def get_mr_notes(self, mr_iid: int) -> list[dict[str, Any]]:
         """Get all notes from GitLab merge request using JSON API."""
@@ -341,8 +920,10 @@ class GitLabClient(GitHostingClient):
                 'id': note['id'],
                 'body': note['body']
             } for note in notes if not note.get('system', False)]
-        except (json.JSONDecodeError, subprocess.CalledProcessError):
-            return []
+        except (json.JSONDecodeError, subprocess.CalledProcessError) as e:
+            # An empty list would read as "the MR has no notes"
+            raise HostingError(
+                f"Could not list notes of MR !{mr_iid}: {e}") from e
 
     def set_mr_dependencies(self, mr_iid: int,
                             blocking_mr_iids: list[int]) -> None:
@@ -373,64 +954,61 @@ class GitLabClient(GitHostingClient):
                 # Re-raise other errors
                 raise
 
-    def find_mrs_by_stack_name(self, stack_name: str) -> list[dict[str, Any]]:
-        """Find all MRs belonging to a stack by searching branch names."""
-        try:
-            # List all open MRs and filter by branch name pattern
-            output = self._run_glab_command([
-                'api',
-                'projects/:id/merge_requests',
-                '-X',
-                'GET',
-                '--paginate',
-                '-f',
-                'state=opened',
-            ])
-            mrs_data: list[dict[str, Any]] = json.loads(output)
-
-            # Filter MRs whose source branch contains the stack name
-            # Branch format: user/stack-uuid@stackname@position
-            result = []
-            for mr in mrs_data:
-                source_branch = mr.get('source_branch', '')
-                if f'@{stack_name}@' in source_branch:
-                    result.append({
-                        'mr_iid': mr['iid'],
-                        'source_branch': source_branch,
-                        'target_branch': mr.get('target_branch', ''),
-                        'state': mr.get('state', 'opened'),
-                        'title': mr.get('title', ''),
-                    })
-            return result
-        except (subprocess.CalledProcessError, json.JSONDecodeError):
-            return []
-
-    def find_mr_by_source_branch(self,
-                                 source_branch: str) -> dict[str, Any] | None:
-        """Find an open MR by its source branch name."""
-        try:
+    def _lookup_source_branch(self,
+                              source_branch: str) -> dict[str, Any] | None:
+        """Find the open MR of a source branch with one filtered request."""
+        output = self._run_glab_command([
+            'api',
+            'projects/:id/merge_requests',
+            '-X',
+            'GET',
+            '-f',
+            'state=opened',
+            '-f',
+            f'source_branch={source_branch}',
+        ])
+        mrs_data: list[dict[str, Any]] = json.loads(output) if output else []
+        return mrs_data[0] if mrs_data else None
+
+    def _iter_own_mrs(
+            self,
+            state: str = 'opened',
+            updated_after: str | None = None) -> Iterator[dict[str, Any]]:
+        """Yield the user's MRs, requesting one page at a time."""
+        query = f"state={state}&scope=created_by_me&per_page={MRS_PER_PAGE}"
+        if updated_after:
+            query += f"&updated_after={quote(updated_after, safe='')}"
+        page = 1
+        while True:
+            # Paged by hand: 'glab api --paginate' always fetches every page
             output = self._run_glab_command([
-                'api',
-                'projects/:id/merge_requests',
-                '-X',
-                'GET',
-                '-f',
-                'state=opened',
-                '-f',
-                f'source_branch={source_branch}',
+                'api', f"projects/:id/merge_requests?{query}&page={page}"
             ])
-            mrs_data: list[dict[str, Any]] = json.loads(output)
+            mrs_data: list[dict[str, Any]] = (json.loads(output)
+                                              if output else [])
+            yield from mrs_data
+            if len(mrs_data) < MRS_PER_PAGE:
+                return
+            page += 1
+
+    def _get_mr_states_chunk(self, chunk: tuple[int, ...]) -> dict[int, str]:
+        """Get the states of up to MAX_IIDS_PER_REQUEST MRs in one request."""
+        query = '&'.join([f"iids[]={iid}" for iid in chunk] +
+                         ['state=all', f"per_page={len(chunk)}"])
+        output = self._run_glab_command(
+            ['api', f"projects/:id/merge_requests?{query}"])
+        mrs_data: list[dict[str, Any]] = json.loads(output) if output else []
+        return {
+            int(mr['iid']): str(mr['state'])
+            for mr in mrs_data
+            if mr.get('state')
+        }
 
-            if mrs_data:
-                mr = mrs_data[0]
-                return {
-                    'mr_iid': mr['iid'],
-                    'mr_url': mr.get('web_url', ''),
-                    'state': mr.get('state', 'opened'),
-                }
-            return None
-        except (subprocess.CalledProcessError, json.JSONDecodeError):
-            return None
+    def get_mr_states(self, mr_iids: Iterable[int]) -> dict[int, str]:
+        """Get GitLab MR states with parallel iids[]-filtered list requests."""
+        return merge_chunk_states(
+            fan_out(self._get_mr_states_chunk, iid_chunks(mr_iids),
+                    self.max_workers))
 
 
 class MockGitHostingClient(GitHostingClient):
@@ -450,6 +1028,9 @@ class MockGitHostingClient(GitHostingClient):
         self.next_iid = 1
         self.next_note_id = 1
 
+        # Serializes id allocation and file writes from concurrent callers
+        self._lock = threading.RLock()
+
         # Load or initialize database
         if self.database_file.exists():
             with open(self.database_file) as f:
@@ -462,29 +1043,32 @@ class MockGitHostingClient(GitHostingClient):
 
     def _save_database(self) -> None:
         """Save MR database to file."""
-        self.database_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.database_file, 'w') as f:
-            json.dump(
-                {
-                    'mrs': self.mrs,
-                    'next_iid': self.next_iid,
-                    'next_note_id': self.next_note_id,
-                },
-                f,
-                indent=2,
-            )
+        with self._lock:
+            self.database_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.database_file, 'w') as f:
+                json.dump(
+                    {
+                        'mrs': self.mrs,
+                        'next_iid': self.next_iid,
+                        'next_note_id': self.next_note_id,
+                    },
+                    f,
+                    indent=2,
+                )
 
     def _save_operations(self) -> None:
         """Save operations log to file."""
-        self.operations_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.operations_file, 'w') as f:
-            json.dump(self.operations, f, indent=2)
+        with self._lock:
+            self.operations_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.operations_file, 'w') as f:
+                json.dump(self.operations, f, indent=2)
 
     def create_mr(self, source_branch: str, target_branch: str, title: str,
                   description: str) -> dict[str, Any]:
         """Create a mock merge request."""
-        mr_iid = self.next_iid
-        self.next_iid += 1
+        with self._lock:
+            mr_iid = self.next_iid
+            self.next_iid += 1
 
         # Store MR in database
         self.mrs[str(mr_iid)] = {
@@ -588,14 +1172,15 @@ class MockGitHostingClient(GitHostingClient):
         self._save_database()
         self._save_operations()
 
-    def add_mr_note(self, mr_iid: int, body: str) -> None:
+    def add_mr_note(self, mr_iid: int, body: str) -> int | None:
         """Add a note/comment to mock merge request."""
         mr_key = str(mr_iid)
         if mr_key not in self.mrs:
             raise ValueError(f"MR !{mr_iid} not found")
 
-        note_id = self.next_note_id
-        self.next_note_id += 1
+        with self._lock:
+            note_id = self.next_note_id
+            self.next_note_id += 1
 
         # Ensure notes list exists
         if 'notes' not in self.mrs[mr_key]:
@@ -614,6 +1199,7 @@ class MockGitHostingClient(GitHostingClient):
 
         self._save_database()
         self._save_operations()
+        return note_id
 
     def update_mr_note(self, mr_iid: int, note_id: int, body: str) -> None:
         """Update a note/comment on mock merge request."""
@@ -634,7 +1220,8 @@ class MockGitHostingClient(GitHostingClient):
                 break
 
         if not note_found:
-            raise ValueError(f"Note {note_id} not found in MR !{mr_iid}")
+            raise NoteNotFoundError(
+                f"Note {note_id} not found in MR !{mr_iid}")
 
         # Record operation
         self.operations.append({
@@ -723,6 +1310,32 @@ class MockGitHostingClient(GitHostingClient):
                 }
         return None
 
+    def list_own_mrs(self,
+                     updated_after: str | None = None) -> list[dict[str, Any]]:
+        """
+        List every mock MR.
+
+        The mock keeps no update times, so updated_after is only recorded.
+        """
+        self.operations.append({
+            'operation': 'list_own_mrs',
+            'args': {
+                'updated_after': updated_after
+            },
+        })
+        self._save_operations()
+
+        return [{
+            'mr_iid': int(mr_key),
+            'mr_url':
+            f"https://gitlab.example.com/project/merge_requests/{mr_key}",
+            'state': mr_data.get('state', 'opened'),
+            'source_branch': mr_data.get('source_branch', ''),
+            'target_branch': mr_data.get('target_branch', ''),
+            'title': mr_data.get('title', ''),
+            'updated_at': '',
+        } for mr_key, mr_data in self.mrs.items()]
+
     def set_mr_state(self, mr_iid: int, state: str) -> None:
         """
         Helper method for tests to manually set MR state.
@@ -0,0 +1,247 @@
+"""
+On-disk cache of GitLab REST responses.
+
+GET responses that carry an ETag or Last-Modified header are stored in
+.git/git-stack-http-cache/, one file per request. The next identical request
+sends If-None-Match / If-Modified-Since, and a 304 Not Modified answer is
+served from the stored body. Entries are always revalidated, so the cache
+never returns stale data; it saves transferring and decoding unchanged
+responses.
+
+The cache is bounded in size: once it grows past its limit, the least
+recently used entries are deleted. The limit is configured in MiB with
+``git config git-stack.http-cache-size`` (0 disables the cache), and
+``git-stack --no-cache`` bypasses it for one command.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from git_stack.plumbing import RepoContext
+
+# Name of the cache directory in the git directory
+CACHE_DIR = 'git-stack-http-cache'
+
+# Default size limit in MiB
+DEFAULT_MAX_SIZE = 50
+
+# Response headers not worth keeping with an entry
+SKIPPED_HEADERS = {'set-cookie', 'date', 'connection', 'keep-alive'}
+
+# Whether commands may use the cache (see set_cache_enabled())
+_enabled = True
+
+
+@dataclass
+class CacheEntry:
+    """A stored response and the validators to revalidate it with."""
+
+    body: str
+    headers: dict[str, str] = field(default_factory=dict)
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Headers that make the request conditional on this entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """Size-bounded LRU cache of responses, one file per request key."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory holding the entries (created on first store)
+            max_bytes: Total size above which old entries are evicted
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # Size of the entries on disk, counted on the first store
+        self._total: int | None = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        # Keys contain the API token, so only their hash reaches the disk
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: str) -> CacheEntry | None:
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key: Request key
+
+        Returns:
+            The entry, None if there is none or it is unreadable
+        """
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text())
+            entry = CacheEntry(body=data['body'],
+                               headers=data.get('headers', {}),
+                               etag=data.get('etag'),
+                               last_modified=data.get('last_modified'))
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """
+        Store an entry, evicting least recently used ones if needed.
+
+        Args:
+            key: Request key
+            entry: Response to store
+        """
+        data = json.dumps({
+            'body': entry.body,
+            'headers': entry.headers,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+        }).encode()
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            old_size = path.stat().st_size if path.exists() else 0
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory,
+                                            prefix='.entry.',
+                                            suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+        except OSError:
+            os.unlink(tmp_name)
+            return
+
+        with self._lock:
+            if self._total is None:
+                self._total = self._disk_usage()
+            else:
+                self._total += len(data) - old_size
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _disk_usage(self) -> int:
+        """Sum up the size of all entries."""
+        total = 0
+        for path in self.directory.glob('*.json'):
+            try:
+                total += path.stat().st_size
+            except OSError:
+                continue
+        return total
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is at 3/4."""
+        entries = []
+        for path in self.directory.glob('*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes * 3 // 4:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._total = total
+
+
+def set_cache_enabled(enabled: bool) -> None:
+    """
+    Allow or forbid the HTTP cache for the running command.
+
+    Args:
+        enabled: False to bypass the cache (``--no-cache``)
+    """
+    global _enabled  # pylint: disable=global-statement
+    _enabled = enabled
+
+
+def open_http_cache(repo: RepoContext | None = None) -> HttpCache | None:
+    """
+    Open the repository's HTTP cache.
+
+    Args:
+        repo: Repository context to find the git directory and the size
+            limit in
+
+    Returns:
+        The cache, None if it is disabled
+    """
+    if not _enabled:
+        return None
+    if repo is None:
+        repo = RepoContext()
+
+    max_size = float(DEFAULT_MAX_SIZE)
+    value = repo.get_config('git-stack.http-cache-size')
+    if value:
+        try:
+            max_size = float(value)
+        except ValueError:
+            pass
+    if max_size <= 0:
+        return None
+
+    git_dir = repo.git_dir
+    directory = (Path(git_dir) / CACHE_DIR if git_dir else
+                 Path.home() / '.cache' / 'git-stack' / 'http')
+    return HttpCache(directory, int(max_size * 1024 * 1024))
+
+
+def response_entry(body: str, headers: dict[str, str]) -> CacheEntry | None:
+    """
+    Build a cache entry for a response if it can be revalidated.
+
+    Args:
+        body: Response body
+        headers: Lower-cased response headers
+
+    Returns:
+        The entry, None if the response has neither ETag nor Last-Modified
+        or must not be stored
+    """
+    if 'no-store' in headers.get('cache-control', ''):
+        return None
+    etag = headers.get('etag')
+    last_modified = headers.get('last-modified')
+    if not etag and not last_modified:
+        return None
+    return CacheEntry(body=body,
+                      headers={
+                          key: value
+                          for key, value in headers.items()
+                          if key not in SKIPPED_HEADERS
+                      },
+                      etag=etag,
+                      last_modified=last_modified)
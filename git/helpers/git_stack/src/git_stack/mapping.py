@@ -0,0 +1,601 @@
+"""
+Change-Id to MR mapping storage for git-stack.
+
+The mapping is a flat ``change_id -> mr_info`` table. By default it is
+persisted as a JSON object; an optional SQLite backend stores one row per
+Change-Id and writes only the rows a command changed. MappingStore wraps
+either backend with secondary indexes so per-stack, per-MR and per-branch
+lookups don't have to scan and re-parse every Change-Id.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterator, MutableMapping
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+from git_stack.change_id import (
+    extract_position,
+    extract_stack_name,
+    get_git_username,
+)
+from git_stack.plumbing import RepoContext
+
+# Lock for thread-safe mapping file operations. Other processes are kept out
+# by an advisory lock on the mapping file's lock file (see _file_lock).
+_mapping_lock = threading.Lock()
+
+# Identity of a mapping file version: (inode, mtime in ns, size), or None if
+# the file doesn't exist. Files are only ever replaced, never written in
+# place, so a changed signature means another process saved in between.
+FileSignature = tuple[int, int, int] | None
+
+
+def _signature(stat: os.stat_result) -> FileSignature:
+    """Build a FileSignature from a stat result."""
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _stat_signature(path: Path) -> FileSignature:
+    """Get the current FileSignature of a path."""
+    try:
+        return _signature(path.stat())
+    except FileNotFoundError:
+        return None
+
+
+def _read_mapping(path: Path) -> tuple[dict[str, Any], FileSignature]:
+    """
+    Read a mapping file together with the signature of the version read.
+
+    Args:
+        path: Path to the mapping JSON file
+
+    Returns:
+        Tuple of (mapping, signature); an empty mapping if the file doesn't
+        exist or can't be parsed
+    """
+    try:
+        with open(path) as f:
+            signature = _signature(os.fstat(f.fileno()))
+            try:
+                data: dict[str, Any] = json.load(f)
+            except json.JSONDecodeError:
+                data = {}
+            return data, signature
+    except FileNotFoundError:
+        return {}, None
+    except OSError:
+        return {}, _stat_signature(path)
+
+
+def _write_atomic(path: Path, data: dict[str, Any]) -> FileSignature:
+    """
+    Replace a mapping file atomically.
+
+    The data is written to a temporary file in the same directory, synced
+    and renamed over the target, so readers and interrupted writers never
+    see a partially written mapping.
+
+    Args:
+        path: Path to the mapping JSON file
+        data: Mapping to write
+
+    Returns:
+        Signature of the newly written file
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent,
+                                    prefix=f".{path.name}.",
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+            os.fchmod(f.fileno(), mode)
+            signature = _signature(os.fstat(f.fileno()))
+        os.replace(tmp_name, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(tmp_name)
+        raise
+    return signature
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive advisory lock for a mapping file.
+
+    The lock is taken on a separate ``<name>.lock`` file because the mapping
+    file itself is replaced on every write. Without fcntl (Windows) only the
+    in-process lock applies.
+
+    Args:
+        path: Path to the mapping JSON file
+    """
+    lock_path = path.with_name(f"{path.name}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def load_mapping(path: Path) -> dict[str, Any]:
+    """
+    Load the Change-Id to MR mapping from file (thread-safe).
+
+    Args:
+        path: Path to the mapping JSON file
+
+    Returns:
+        Dictionary containing the mapping, empty dict if file doesn't exist
+    """
+    with _mapping_lock:
+        return _read_mapping(path)[0]
+
+
+def save_mapping(path: Path, data: MutableMapping[str, Any]) -> None:
+    """
+    Save the Change-Id to MR mapping to file (thread- and process-safe).
+
+    Args:
+        path: Path to the mapping JSON file
+        data: Mapping to save
+    """
+    with _mapping_lock, _file_lock(path):
+        _write_atomic(path, dict(data))
+
+
+class MappingBackend(ABC):
+    """Abstract persistence layer for the Change-Id to MR mapping."""
+
+    @abstractmethod
+    def load(self) -> dict[str, dict[str, Any]]:
+        """
+        Read every mapping entry.
+
+        Returns:
+            Dictionary of change_id -> mr_info, empty if nothing is stored
+        """
+
+    @abstractmethod
+    def write(self, entries: dict[str, dict[str, Any]], upserts: set[str],
+              deletes: set[str]) -> dict[str, dict[str, Any]] | None:
+        """
+        Persist the changes made since the last load or write.
+
+        Args:
+            entries: The complete current mapping
+            upserts: Change-Ids that were added or replaced
+            deletes: Change-Ids that were removed
+
+        Returns:
+            The complete stored mapping if changes from other processes were
+            merged in while writing, None otherwise
+        """
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+class JsonMappingBackend(MappingBackend):
+    """
+    Mapping stored as a single JSON file, replaced atomically on every save.
+
+    Several processes may share the file, e.g. pushes from different
+    worktrees of one repository. Saves hold an advisory lock on the file; if
+    another process replaced it since it was loaded, the file is re-read and
+    only this process's changes are applied on top, so neither side's
+    entries are lost. The lock is not held between load and save, so long
+    running commands don't serialize each other.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize JsonMappingBackend.
+
+        Args:
+            path: Path to the mapping JSON file
+        """
+        self.path = path
+        self._signature: FileSignature = None
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        with _mapping_lock:
+            data, self._signature = _read_mapping(self.path)
+        return data
+
+    def write(self, entries: dict[str, dict[str, Any]], upserts: set[str],
+              deletes: set[str]) -> dict[str, dict[str, Any]] | None:
+        with _mapping_lock, _file_lock(self.path):
+            if _stat_signature(self.path) == self._signature:
+                self._signature = _write_atomic(self.path, dict(entries))
+                return None
+
+            # Someone else saved since we loaded: merge our delta only
+            data = _read_mapping(self.path)[0]
+            for change_id in deletes:
+                data.pop(change_id, None)
+            for change_id in upserts:
+                data[change_id] = entries[change_id]
+            self._signature = _write_atomic(self.path, data)
+            return data
+
+
+class SqliteMappingBackend(MappingBackend):
+    """
+    Mapping stored as one row per Change-Id in a SQLite database.
+
+    The database runs in WAL mode and every write is a single transaction
+    that touches only the changed rows. On first use, the entries of the
+    JSON mapping file (if any) are imported once; the JSON file is left in
+    place as a backup but is not read again.
+    """
+
+    def __init__(self, path: Path, json_path: Path | None = None):
+        """
+        Initialize SqliteMappingBackend.
+
+        Args:
+            path: Path to the SQLite database
+            json_path: Path to a JSON mapping file to migrate on first use
+        """
+        self.path = path
+        self.json_path = json_path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, creating and migrating it on first use."""
+        if self._conn is not None:
+            return self._conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path,
+                               timeout=30,
+                               isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS mappings ('
+                     'change_id TEXT PRIMARY KEY, mr_info TEXT NOT NULL)')
+        conn.execute('CREATE TABLE IF NOT EXISTS meta ('
+                     'key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            migrated = conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if migrated is None:
+                entries = load_mapping(
+                    self.json_path) if self.json_path else {}
+                conn.executemany(
+                    'INSERT OR IGNORE INTO mappings VALUES (?, ?)',
+                    [(change_id, json.dumps(mr_info))
+                     for change_id, mr_info in entries.items()])
+                conn.execute(
+                    "INSERT INTO meta VALUES ('json_migrated', ?)",
+                    (str(self.json_path or ''),))
+                if entries:
+                    print(
+                        f"Migrated {len(entries)} mapping entries from "
+                        f"{self.json_path} to {self.path}",
+                        file=sys.stderr,
+                    )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            conn.close()
+            raise
+
+        self._conn = conn
+        return conn
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT change_id, mr_info FROM mappings ORDER BY rowid')
+            return {
+                change_id: json.loads(mr_info)
+                for change_id, mr_info in rows
+            }
+
+    def write(self, entries: dict[str, dict[str, Any]], upserts: set[str],
+              deletes: set[str]) -> dict[str, dict[str, Any]] | None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    'INSERT INTO mappings VALUES (?, ?) '
+                    'ON CONFLICT(change_id) '
+                    'DO UPDATE SET mr_info = excluded.mr_info',
+                    [(change_id, json.dumps(entries[change_id]))
+                     for change_id in upserts])
+                conn.executemany('DELETE FROM mappings WHERE change_id = ?',
+                                 [(change_id,) for change_id in deletes])
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_mapping_backend(json_path: Path,
+                           backend: str | None = None,
+                           repo: RepoContext | None = None) -> MappingBackend:
+    """
+    Create the mapping backend selected by configuration.
+
+    The backend is chosen from the ``backend`` argument, the
+    GIT_STACK_MAPPING_BACKEND environment variable or the
+    ``git-stack.mapping-backend`` git config key, in that order: ``json``
+    (the default) or ``sqlite``. The SQLite database lives next to the JSON
+    file and imports it on first use.
+
+    Args:
+        json_path: Path to the mapping JSON file
+        backend: Explicit backend name, overriding the configuration
+        repo: Repository context to read the git config from
+
+    Returns:
+        The configured MappingBackend
+    """
+    if not backend:
+        backend = os.getenv('GIT_STACK_MAPPING_BACKEND')
+    if not backend:
+        if repo is None:
+            repo = RepoContext()
+        backend = repo.get_config('git-stack.mapping-backend')
+
+    backend = (backend or 'json').lower()
+    if backend == 'sqlite':
+        return SqliteMappingBackend(json_path.with_suffix('.sqlite3'),
+                                    json_path=json_path)
+    if backend != 'json':
+        print(
+            f"Warning: Unknown git-stack mapping backend '{backend}', "
+            'using json',
+            file=sys.stderr,
+        )
+    return JsonMappingBackend(json_path)
+
+
+class MappingStore(MutableMapping[str, dict[str, Any]]):
+    """
+    Indexed Change-Id to MR mapping.
+
+    Behaves like the plain ``change_id -> mr_info`` dict it replaces, and
+    keeps three secondary indexes up to date on every assignment and
+    deletion:
+
+    - stack name -> ``(position, change_id)`` pairs, kept sorted
+    - MR IID -> Change-Id
+    - branch name -> Change-Id (built on first use, since branch names
+      depend on the git username)
+
+    Changed and removed Change-Ids are tracked so save() hands the backend
+    only the rows that need writing. Entries must be replaced as a whole
+    rather than mutated in place, so the indexes and change tracking stay
+    consistent.
+    """
+
+    def __init__(self,
+                 backend: MappingBackend,
+                 entries: dict[str, dict[str, Any]] | None = None,
+                 repo: RepoContext | None = None):
+        """
+        Initialize MappingStore.
+
+        Args:
+            backend: Persistence backend used by save()
+            entries: Initial ``change_id -> mr_info`` entries, treated as
+                already persisted
+            repo: Repository context to read the git username from
+        """
+        self.backend = backend
+        self.repo = repo
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._stacks: dict[str | None, list[tuple[int, str]]] = {}
+        self._by_mr_iid: dict[int, str] = {}
+        self._by_branch: dict[str, str] | None = None
+        self._branch_prefix: str | None = None
+        self._upserts: set[str] = set()
+        self._deletes: set[str] = set()
+
+        for change_id, mr_info in (entries or {}).items():
+            self[change_id] = mr_info
+        self._upserts.clear()
+
+    @classmethod
+    def load(cls,
+             backend: MappingBackend | Path,
+             repo: RepoContext | None = None) -> MappingStore:
+        """
+        Load a mapping into an indexed store.
+
+        Args:
+            backend: Backend to read from, or the path of a JSON mapping file
+            repo: Repository context to read the git username from
+
+        Returns:
+            MappingStore with the stored entries, empty if there are none
+        """
+        if isinstance(backend, Path):
+            backend = JsonMappingBackend(backend)
+        return cls(backend, backend.load(), repo)
+
+    def save(self) -> None:
+        """Persist the entries changed since the last save in one batch."""
+        if not self._upserts and not self._deletes:
+            return
+        merged = self.backend.write(self._entries, self._upserts,
+                                    self._deletes)
+        if merged is not None:
+            # Pick up entries other processes added or removed meanwhile
+            for change_id in set(self._entries) - set(merged):
+                del self[change_id]
+            for change_id, mr_info in merged.items():
+                if self._entries.get(change_id) != mr_info:
+                    self[change_id] = mr_info
+        self._upserts.clear()
+        self._deletes.clear()
+
+    def close(self) -> None:
+        """Release resources held by the backend."""
+        self.backend.close()
+
+    def __getitem__(self, change_id: str) -> dict[str, Any]:
+        return self._entries[change_id]
+
+    def __setitem__(self, change_id: str, mr_info: dict[str, Any]) -> None:
+        if change_id in self._entries:
+            self._unindex(change_id)
+        self._entries[change_id] = mr_info
+        self._index(change_id)
+        self._upserts.add(change_id)
+        self._deletes.discard(change_id)
+
+    def __delitem__(self, change_id: str) -> None:
+        self._unindex(change_id)
+        del self._entries[change_id]
+        self._upserts.discard(change_id)
+        self._deletes.add(change_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, change_id: object) -> bool:
+        return change_id in self._entries
+
+    def _index(self, change_id: str) -> None:
+        """Add an entry to the secondary indexes."""
+        key = (extract_position(change_id) or 0, change_id)
+        bisect.insort(
+            self._stacks.setdefault(extract_stack_name(change_id), []), key)
+
+        mr_iid = self._entries[change_id].get('mr_iid')
+        if mr_iid is not None:
+            self._by_mr_iid[mr_iid] = change_id
+
+        if self._by_branch is not None:
+            self._by_branch[self.branch_name(change_id)] = change_id
+
+    def _unindex(self, change_id: str) -> None:
+        """Remove an entry from the secondary indexes."""
+        stack_name = extract_stack_name(change_id)
+        entries = self._stacks[stack_name]
+        entries.remove((extract_position(change_id) or 0, change_id))
+        if not entries:
+            del self._stacks[stack_name]
+
+        mr_iid = self._entries[change_id].get('mr_iid')
+        if self._by_mr_iid.get(mr_iid) == change_id:
+            del self._by_mr_iid[mr_iid]
+
+        if self._by_branch is not None:
+            self._by_branch.pop(self.branch_name(change_id), None)
+
+    def stack_names(self) -> list[str]:
+        """
+        Get the names of all stacks in the mapping.
+
+        Returns:
+            Sorted list of stack names (Change-Ids without one are skipped)
+        """
+        return sorted(name for name in self._stacks if name is not None)
+
+    def stack(self,
+              stack_name: str | None) -> list[tuple[int, str, dict[str, Any]]]:
+        """
+        Get the entries of one stack, ordered by position.
+
+        Args:
+            stack_name: Stack name, or None for Change-Ids without one
+
+        Returns:
+            List of (position, change_id, mr_info) tuples
+        """
+        return [(position, change_id, self._entries[change_id])
+                for position, change_id in self._stacks.get(stack_name, [])]
+
+    def find_by_mr_iid(self, mr_iid: int) -> str | None:
+        """
+        Find the Change-Id mapped to an MR.
+
+        Args:
+            mr_iid: MR IID
+
+        Returns:
+            Change-Id, or None if the MR is not in the mapping
+        """
+        return self._by_mr_iid.get(mr_iid)
+
+    def branch_name(self, change_id: str) -> str:
+        """
+        Format the branch name for a Change-Id.
+
+        Same as change_id.get_branch_name(), but looks the username up only
+        once per store.
+
+        Args:
+            change_id: The Change-Id
+
+        Returns:
+            Branch name in format: username/stack-<change-id>
+        """
+        if self._branch_prefix is None:
+            self._branch_prefix = f"{get_git_username(self.repo)}/stack-"
+        return f"{self._branch_prefix}{change_id}"
+
+    def find_by_branch(self, branch: str) -> str | None:
+        """
+        Find the Change-Id whose stack branch has the given name.
+
+        Args:
+            branch: Branch name
+
+        Returns:
+            Change-Id, or None if no mapped Change-Id uses this branch
+        """
+        if self._by_branch is None:
+            self._by_branch = {
+                self.branch_name(change_id): change_id
+                for change_id in self._entries
+            }
+        return self._by_branch.get(branch)
@@ -0,0 +1,197 @@
+"""
+Local mirror of the user's MRs.
+
+The mirror keeps the state, title, source and target branch and URL of every
+MR the user created in .git/git-stack-mrs.json. `git-stack sync` refreshes it
+incrementally: only MRs updated since the previous sync are requested
+(updated_after), so a refresh costs one small request no matter how many MRs
+the user has. Read-only commands answer MR state questions from the mirror,
+refreshing it first when it is older than their freshness bound.
+
+The mirror is a cache. It is replaced atomically, and a missing or corrupt
+file just means the next sync lists every MR again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from git_stack.hosting_client import GitHostingClient
+from git_stack.plumbing import RepoContext
+
+# File name of the mirror in the git directory
+MIRROR_FILE = 'git-stack-mrs.json'
+
+# Seconds subtracted from the last sync time when asking for updated MRs, to
+# cover clock skew between this machine and the server
+SYNC_OVERLAP = 60.0
+
+# Default freshness bound of read-only commands, in seconds
+DEFAULT_MAX_AGE = 600.0
+
+# Fields of an MR kept in the mirror
+MIRROR_FIELDS = ('mr_iid', 'mr_url', 'state', 'source_branch',
+                 'target_branch', 'title', 'updated_at')
+
+
+def read_max_age(repo: RepoContext | None = None) -> float:
+    """
+    Read the freshness bound from ``git-stack.mirror-max-age``.
+
+    Args:
+        repo: Repository context to read the git config from
+
+    Returns:
+        Maximum age of the mirror in seconds
+    """
+    if repo is None:
+        repo = RepoContext()
+    value = repo.get_config('git-stack.mirror-max-age')
+    try:
+        return float(value) if value else DEFAULT_MAX_AGE
+    except ValueError:
+        return DEFAULT_MAX_AGE
+
+
+class MrMirror:
+    """The user's MRs as of the last sync, keyed by MR IID."""
+
+    def __init__(self,
+                 path: Path,
+                 mrs: dict[int, dict[str, Any]] | None = None,
+                 synced_at: float | None = None):
+        """
+        Initialize the mirror.
+
+        Args:
+            path: Path of the mirror file
+            mrs: MR info dicts by MR IID
+            synced_at: Unix time the last sync started, None if never synced
+        """
+        self.path = Path(path)
+        self.mrs = mrs or {}
+        self.synced_at = synced_at
+
+    @classmethod
+    def load(cls, path: Path) -> MrMirror:
+        """
+        Load the mirror from a file.
+
+        Args:
+            path: Path of the mirror file
+
+        Returns:
+            The mirror, empty if the file is missing or unreadable
+        """
+        try:
+            data = json.loads(Path(path).read_text())
+            mrs = {int(iid): mr for iid, mr in data['mrs'].items()}
+            synced_at = data.get('synced_at')
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return cls(path)
+        return cls(path, mrs, synced_at)
+
+    def save(self) -> None:
+        """Replace the mirror file atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent,
+                                        prefix=f".{self.path.name}.",
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(
+                    {
+                        'synced_at': self.synced_at,
+                        'mrs': {
+                            str(iid): mr for iid, mr in sorted(self.mrs.items())
+                        },
+                    },
+                    f,
+                    indent=2)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def age(self) -> float | None:
+        """Seconds since the last sync, None if never synced."""
+        if self.synced_at is None:
+            return None
+        return max(0.0, time.time() - self.synced_at)
+
+    def is_fresh(self, max_age: float) -> bool:
+        """Whether the last sync is at most max_age seconds old."""
+        age = self.age()
+        return age is not None and age <= max_age
+
+    def sync(self, client: GitHostingClient, full: bool = False) -> int:
+        """
+        Fetch the MRs updated since the last sync and save the mirror.
+
+        Args:
+            client: Client to list the user's MRs with
+            full: If True, list every MR instead of only the updated ones
+
+        Returns:
+            Number of MRs that were added or changed
+        """
+        started = time.time()
+        updated_after = None
+        if self.synced_at is not None and not full:
+            updated_after = datetime.fromtimestamp(
+                self.synced_at - SYNC_OVERLAP, timezone.utc).isoformat()
+
+        changed = 0
+        mrs = {} if full else dict(self.mrs)
+        for mr in client.list_own_mrs(updated_after):
+            entry = {field: mr.get(field) for field in MIRROR_FIELDS}
+            if self.mrs.get(entry['mr_iid']) != entry:
+                changed += 1
+            mrs[entry['mr_iid']] = entry
+
+        self.mrs = mrs
+        self.synced_at = started
+        self.save()
+        return changed
+
+    def remember(self, mr: dict[str, Any]) -> None:
+        """
+        Add or replace an MR without a sync, e.g. one that was just created.
+
+        Args:
+            mr: MR info dict with the fields in MIRROR_FIELDS
+        """
+        self.mrs[mr['mr_iid']] = {
+            field: mr.get(field) for field in MIRROR_FIELDS
+        }
+
+    def states(self, mr_iids: Iterable[int]) -> dict[int, str]:
+        """
+        Get the mirrored states of MRs.
+
+        Args:
+            mr_iids: MR IIDs
+
+        Returns:
+            Mapping of MR IID to state; MRs not in the mirror are omitted
+        """
+        return {
+            mr_iid: self.mrs[mr_iid]['state']
+            for mr_iid in mr_iids
+            if mr_iid in self.mrs
+        }
+
+    def open_mrs_by_source_branch(self) -> dict[str, dict[str, Any]]:
+        """Get the mirrored open MRs keyed by source branch."""
+        return {
+            mr['source_branch']: mr
+            for mr in self.mrs.values()
+            if mr['state'] == 'opened'
+        }
@@ -0,0 +1,580 @@
+"""
+Long-lived and batched git plumbing helpers for git-stack.
+
+Spawning a git process per lookup dominates the runtime of git-stack on large
+stacks. The helpers in this module keep a single git process around for a
+whole command and feed it many requests at once.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import subprocess
+import threading
+import weakref
+from collections.abc import Iterable
+from dataclasses import dataclass
+from types import TracebackType
+from urllib.parse import urlsplit
+
+from git_stack.aio import (
+    process_watchdog,
+    run_process_blocking,
+    track_process,
+    untrack_process,
+)
+
+
+class GitPlumbingError(Exception):
+    """Raised when a git plumbing coprocess fails or misbehaves."""
+
+
+@dataclass(frozen=True)
+class CommitObject:
+    """A parsed git commit object."""
+
+    sha: str
+    tree: str
+    parents: tuple[str, ...]
+    author: str
+    committer: str
+    message: str
+
+    @property
+    def subject(self) -> str:
+        """
+        The commit subject, formatted like git's ``%s``.
+
+        Returns:
+            First paragraph of the message joined into a single line
+        """
+        paragraph = self.message.lstrip('\n').split('\n\n', 1)[0]
+        return ' '.join(line.strip() for line in paragraph.splitlines())
+
+
+def parse_commit_object(sha: str, raw: bytes) -> CommitObject:
+    """
+    Parse the raw contents of a commit object.
+
+    Args:
+        sha: Object id of the commit
+        raw: Raw object contents as returned by ``git cat-file``
+
+    Returns:
+        Parsed commit object
+    """
+    text = raw.decode('utf-8', errors='replace')
+    header, _, message = text.partition('\n\n')
+
+    tree = ''
+    parents: list[str] = []
+    author = ''
+    committer = ''
+    for line in header.split('\n'):
+        # Continuation lines (e.g. gpgsig) start with a space
+        if line.startswith(' '):
+            continue
+        key, _, value = line.partition(' ')
+        if key == 'tree':
+            tree = value
+        elif key == 'parent':
+            parents.append(value)
+        elif key == 'author':
+            author = value
+        elif key == 'committer':
+            committer = value
+
+    return CommitObject(
+        sha=sha,
+        tree=tree,
+        parents=tuple(parents),
+        author=author,
+        committer=committer,
+        message=message.strip(),
+    )
+
+
+@functools.cache
+def git_version() -> tuple[int, ...]:
+    """
+    Get the version of the installed git.
+
+    Returns:
+        Version as a tuple of integers (e.g. (2, 43, 0)), or (0,) if it
+        can't be determined
+    """
+    try:
+        output = subprocess.run(['git', 'version'],
+                                capture_output=True,
+                                text=True,
+                                check=False).stdout
+    except FileNotFoundError:
+        return (0, )
+    match = re.search(r'(\d+(?:\.\d+)+)', output)
+    if not match:
+        return (0, )
+    return tuple(int(part) for part in match.group(1).split('.'))
+
+
+def _normalize_config_key(key: str) -> str:
+    """Lowercase the section and variable name of a config key."""
+    section, _, rest = key.partition('.')
+    subsection, _, name = rest.rpartition('.')
+    if not subsection:
+        return f"{section.lower()}.{name.lower()}"
+    return f"{section.lower()}.{subsection}.{name.lower()}"
+
+
+def parse_remote_url(url: str) -> tuple[str, str]:
+    """
+    Split a git remote URL into host and project path.
+
+    Supports scp-like ('git@host:group/project.git'), ssh:// and http(s)://
+    remotes, including nested groups.
+
+    Args:
+        url: Git remote URL
+
+    Returns:
+        Tuple of (host, project path)
+
+    Raises:
+        ValueError: If the URL cannot be parsed
+    """
+    url = url.strip()
+    if '://' in url:
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        path = parts.path
+    else:
+        match = re.match(r'^(?:[^@/]+@)?([^:/]+):(.+)$', url)
+        if not match:
+            raise ValueError(f"Unsupported remote URL: {url}")
+        host, path = match.groups()
+
+    path = path.strip('/')
+    if path.endswith('.git'):
+        path = path[:-len('.git')]
+
+    if not host or '/' not in path:
+        raise ValueError(f"Unsupported remote URL: {url}")
+
+    return host, path
+
+
+
+class RepoContext:
+    """
+    Per-command snapshot of the repository's git config and layout.
+
+    The whole config is read with one ``git config --list -z`` and the git
+    directory with one ``git rev-parse`` the first time they are needed, so
+    config lookups, username and remote URL queries don't spawn a process
+    each.
+    """
+
+    def __init__(self, cwd: str | None = None):
+        """
+        Initialize the context. Nothing is read until first use.
+
+        Args:
+            cwd: Repository directory (defaults to the current directory)
+        """
+        self.cwd = cwd
+
+    @functools.cached_property
+    def config(self) -> dict[str, list[str]]:
+        """
+        All git config entries, keyed by normalized name.
+
+        Returns:
+            Mapping of config key to its values, in the order git lists them
+        """
+        try:
+            output = subprocess.run(['git', 'config', '--list', '-z'],
+                                    capture_output=True,
+                                    cwd=self.cwd,
+                                    check=False).stdout
+        except FileNotFoundError:
+            return {}
+
+        config: dict[str, list[str]] = {}
+        for entry in output.decode('utf-8', errors='replace').split('\0'):
+            if not entry:
+                continue
+            key, _, value = entry.partition('\n')
+            config.setdefault(_normalize_config_key(key), []).append(value)
+        return config
+
+    def get_config(self, key: str) -> str | None:
+        """
+        Get the effective value of a config key.
+
+        Args:
+            key: Config key (e.g. 'user.name')
+
+        Returns:
+            Last configured value, like ``git config --get``, or None
+        """
+        values = self.config.get(_normalize_config_key(key))
+        return values[-1] if values else None
+
+    @functools.cached_property
+    def git_dir(self) -> str | None:
+        """
+        Absolute path of the git directory.
+
+        Returns:
+            Path of the git directory, or None outside a repository
+        """
+        try:
+            result = subprocess.run(['git', 'rev-parse', '--absolute-git-dir'],
+                                    capture_output=True,
+                                    text=True,
+                                    cwd=self.cwd,
+                                    check=False)
+        except FileNotFoundError:
+            return None
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    @property
+    def null_sha(self) -> str:
+        """
+        All-zero object id of the repository's object format.
+
+        As an old value it means "the ref must not exist". The format is
+        taken from ``extensions.objectFormat``, which git itself reads to
+        tell SHA-256 repositories from SHA-1 ones.
+
+        Returns:
+            40 zeros, or 64 in a SHA-256 repository
+        """
+        object_format = self.get_config('extensions.objectformat') or 'sha1'
+        return '0' * (64 if object_format.lower() == 'sha256' else 40)
+
+    def remote_url(self, remote: str = 'origin') -> str | None:
+        """
+        Get the URL of a remote like ``git remote get-url``.
+
+        ``url.<base>.insteadOf`` rewrites are applied, using the longest
+        matching prefix.
+
+        Args:
+            remote: Remote name
+
+        Returns:
+            Remote URL, or None if the remote is not configured
+        """
+        url = self.get_config(f"remote.{remote}.url")
+        if url is None:
+            return None
+
+        best = ''
+        replacement = ''
+        for key, values in self.config.items():
+            if not (key.startswith('url.') and key.endswith('.insteadof')):
+                continue
+            for prefix in values:
+                if url.startswith(prefix) and len(prefix) > len(best):
+                    best = prefix
+                    replacement = key[len('url.'):-len('.insteadof')]
+        return replacement + url[len(best):] if best else url
+
+
+def _terminate(proc: subprocess.Popen[bytes]) -> None:
+    """Close a coprocess' stdin and wait for it to exit."""
+    untrack_process(proc)
+    if proc.poll() is not None:
+        return
+    try:
+        if proc.stdin:
+            proc.stdin.close()
+        proc.wait(timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        proc.kill()
+        proc.wait()
+
+
+class GitObjectReader:
+    """
+    Persistent ``git cat-file --batch-command`` coprocess.
+
+    The process is started on first use and serves every object and ref
+    lookup for the lifetime of the reader. Requests are buffered and flushed
+    together, so resolving or reading many objects costs one round trip.
+    The reader is thread-safe. kill_children() kills the coprocess, and a
+    round trip outlasting its timeout or the deadline kills it too.
+    """
+
+    def __init__(self,
+                 cwd: str | None = None,
+                 timeout: float | None = None):
+        """
+        Initialize the reader.
+
+        Args:
+            cwd: Repository directory (defaults to the current directory)
+            timeout: Seconds a round trip may take, None for no timeout
+        """
+        self.cwd = cwd
+        self.timeout = timeout
+        self._proc: subprocess.Popen[bytes] | None = None
+        self._finalizer: weakref.finalize | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> GitObjectReader:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+                 exc: BaseException | None,
+                 traceback: TracebackType | None) -> None:
+        self.close()
+
+    def _ensure_started(self) -> subprocess.Popen[bytes]:
+        """Start the coprocess if it is not running yet."""
+        if self._proc is None or self._proc.poll() is not None:
+            try:
+                self._proc = subprocess.Popen(
+                    ['git', 'cat-file', '--batch-command', '--buffer'],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    cwd=self.cwd,
+                )
+            except FileNotFoundError as e:
+                raise GitPlumbingError('git executable not found') from e
+            track_process(self._proc)
+            self._finalizer = weakref.finalize(self, _terminate, self._proc)
+        return self._proc
+
+    def _request(self, commands: list[str]) -> list[tuple[str, bytes | None]]:
+        """
+        Send a batch of commands and read one response per command.
+
+        Args:
+            commands: cat-file batch commands ('info <rev>' / 'contents <rev>')
+
+        Returns:
+            List of (header line, contents) tuples; contents is None for
+            'info' commands and for missing objects
+
+        Raises:
+            GitPlumbingError: If the coprocess fails or times out
+            DeadlineExceededError: If the command's deadline passes
+        """
+        if not commands:
+            return []
+
+        with self._lock:
+            proc = self._ensure_started()
+            try:
+                with process_watchdog(proc, self.timeout):
+                    responses = self._exchange(proc, commands)
+            except BaseException as e:
+                # The coprocess is dead or out of step with its replies;
+                # the next request starts a new one
+                proc.kill()
+                self._stop()
+                if isinstance(e, subprocess.TimeoutExpired):
+                    raise GitPlumbingError(
+                        f"git cat-file timed out: {e}") from e
+                raise
+
+        return responses
+
+    @staticmethod
+    def _exchange(proc: subprocess.Popen[bytes],
+                  commands: list[str]) -> list[tuple[str, bytes | None]]:
+        """Write a batch of commands to the coprocess and read the replies."""
+        assert proc.stdin is not None and proc.stdout is not None
+        try:
+            payload = ''.join(f"{cmd}\n" for cmd in commands) + 'flush\n'
+            proc.stdin.write(payload.encode())
+            proc.stdin.flush()
+
+            responses: list[tuple[str, bytes | None]] = []
+            for cmd in commands:
+                header = proc.stdout.readline().decode().rstrip('\n')
+                if not header:
+                    raise GitPlumbingError('git cat-file exited unexpectedly')
+
+                parts = header.split(' ')
+                found = len(parts) == 3 and parts[2].isdigit()
+                if cmd.startswith('contents ') and found:
+                    size = int(parts[2])
+                    body = proc.stdout.read(size)
+                    proc.stdout.read(1)  # Trailing newline
+                    responses.append((header, body))
+                else:
+                    responses.append((header, None))
+        except (OSError, ValueError) as e:
+            raise GitPlumbingError(f"git cat-file failed: {e}") from e
+
+        return responses
+
+    def resolve_refs(self, refs: Iterable[str]) -> dict[str, str | None]:
+        """
+        Resolve many refs or revisions to object ids in one round trip.
+
+        Args:
+            refs: Ref names or revision expressions (e.g. 'origin/main')
+
+        Returns:
+            Mapping of each input to its object id, or None if it does not
+            resolve
+        """
+        names = list(dict.fromkeys(refs))
+        responses = self._request([f"info {name}" for name in names])
+
+        result: dict[str, str | None] = {}
+        for name, (header, _) in zip(names, responses):
+            parts = header.split(' ')
+            result[name] = parts[0] if len(parts) == 3 else None
+        return result
+
+    def read_commits(self,
+                     revs: Iterable[str]) -> dict[str, CommitObject | None]:
+        """
+        Read many commit objects in one round trip.
+
+        Args:
+            revs: Commit shas, ref names or revision expressions
+
+        Returns:
+            Mapping of each input to its parsed commit, or None if it does
+            not resolve to a commit
+        """
+        names = list(dict.fromkeys(revs))
+        responses = self._request([f"contents {name}" for name in names])
+
+        result: dict[str, CommitObject | None] = {}
+        for name, (header, body) in zip(names, responses):
+            parts = header.split(' ')
+            if body is None or parts[1] != 'commit':
+                result[name] = None
+            else:
+                result[name] = parse_commit_object(parts[0], body)
+        return result
+
+    def close(self) -> None:
+        """Shut down the coprocess, if it was started."""
+        with self._lock:
+            self._stop()
+
+    def _stop(self) -> None:
+        """Shut down the coprocess; the caller holds the lock."""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._proc = None
+
+
+class RefTransaction:
+    """
+    Atomic batch of ref updates applied by one ``git update-ref --stdin``.
+
+    Updates are queued with create(), update() and delete() and applied
+    together by commit(): either every ref changes or none does. An old
+    value passed to update() or delete() is verified before anything is
+    written, so refs moved by someone else are never clobbered.
+    """
+
+    def __init__(self,
+                 message: str | None = None,
+                 cwd: str | None = None,
+                 timeout: float | None = None):
+        """
+        Initialize an empty transaction.
+
+        Args:
+            message: Reflog message for the updated refs
+            cwd: Repository directory (defaults to the current directory)
+            timeout: Seconds git update-ref may run, None for no timeout
+        """
+        self.message = message
+        self.cwd = cwd
+        self.timeout = timeout
+        self._commands: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def create(self, ref: str, new_sha: str) -> None:
+        """
+        Queue the creation of a ref that must not exist yet.
+
+        Args:
+            ref: Full ref name (e.g. 'refs/heads/main')
+            new_sha: Object id the ref will point at
+        """
+        self._commands.append(f"create {ref} {new_sha}")
+
+    def update(self,
+               ref: str,
+               new_sha: str,
+               old_sha: str | None = None,
+               no_deref: bool = False) -> None:
+        """
+        Queue an update of a ref.
+
+        Args:
+            ref: Full ref name
+            new_sha: Object id the ref will point at
+            old_sha: Expected current value (RepoContext.null_sha: must not
+                exist); None skips the check
+            no_deref: Update a symbolic ref (e.g. a detached HEAD) itself
+                rather than the ref it points to
+        """
+        if no_deref:
+            self._commands.append('option no-deref')
+        command = f"update {ref} {new_sha}"
+        if old_sha is not None:
+            command += f" {old_sha}"
+        self._commands.append(command)
+
+    def delete(self, ref: str, old_sha: str | None = None) -> None:
+        """
+        Queue the deletion of a ref.
+
+        Args:
+            ref: Full ref name
+            old_sha: Expected current value; None skips the check
+        """
+        command = f"delete {ref}"
+        if old_sha is not None:
+            command += f" {old_sha}"
+        self._commands.append(command)
+
+    def commit(self) -> None:
+        """
+        Apply all queued updates atomically.
+
+        Raises:
+            GitPlumbingError: If any update fails or times out; no ref was
+                changed then
+            DeadlineExceededError: If the command's deadline passes
+        """
+        if not self._commands:
+            return
+
+        args = ['git', 'update-ref']
+        if self.message:
+            args += ['-m', self.message]
+        args.append('--stdin')
+
+        try:
+            result = run_process_blocking(
+                args, 'git', ''.join(f"{cmd}\n" for cmd in self._commands),
+                None, self.timeout, self.cwd)
+        except FileNotFoundError as e:
+            raise GitPlumbingError('git executable not found') from e
+        except subprocess.TimeoutExpired as e:
+            raise GitPlumbingError(f"git update-ref timed out: {e}") from e
+
+        if result.returncode != 0:
+            raise GitPlumbingError(
+                f"git update-ref failed: {result.stderr.strip()}")
+        self._commands.clear()
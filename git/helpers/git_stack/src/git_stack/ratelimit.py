@@ -0,0 +1,303 @@
+"""
+Adaptive, rate-limit-aware admission of hosting API calls.
+
+Every hosting call in a process goes through the RateLimiter of its host,
+which combines:
+- a token bucket bounding the request rate (and burst)
+- an AIMD concurrency window: it grows by one slot per window of successful
+  calls and halves when the server throttles
+- a host-wide pause honoring Retry-After and RateLimit-* headers, or the
+  equivalent hints in glab's error output
+
+Calls hold a slot from acquire() to release(). Retries back off with full
+jitter after giving up their slot, so unrelated calls keep going unless the
+server asked everyone to pause.
+
+Limits are configured per host in git config, e.g.::
+
+    git config git-stack.gitlab.example.com.max-concurrency 32
+    git config git-stack.gitlab.example.com.rate 20
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+from git_stack.plumbing import RepoContext
+from git_stack.timeouts import Deadline
+
+# Status codes that mean the server wants fewer requests
+THROTTLE_STATUSES = {429, 503}
+
+# Upper bound for a single backoff delay, in seconds
+MAX_BACKOFF = 60.0
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    """Limits for the calls to one host."""
+
+    # Requests per second refilled into the token bucket
+    rate: float = 10.0
+    # Token bucket capacity
+    burst: int = 20
+    # Concurrency window bounds and starting size
+    min_concurrency: int = 1
+    max_concurrency: int = 16
+    initial_concurrency: int = 4
+
+    @classmethod
+    def from_git_config(cls,
+                        host: str,
+                        repo: RepoContext | None = None) -> RateLimitConfig:
+        """
+        Read a host's limits from ``git-stack.<host>.*`` git config keys.
+
+        Args:
+            host: Host name
+            repo: Repository context to read the git config from
+
+        Returns:
+            Configured limits, with defaults for unset or invalid keys
+        """
+        if repo is None:
+            repo = RepoContext()
+        defaults = cls()
+
+        def read(name: str, default: float) -> float:
+            value = repo.get_config(f"git-stack.{host}.{name}")
+            try:
+                return float(value) if value else default
+            except ValueError:
+                return default
+
+        max_concurrency = max(
+            1, int(read('max-concurrency', defaults.max_concurrency)))
+        return cls(
+            rate=max(0.1, read('rate', defaults.rate)),
+            burst=max(1, int(read('burst', defaults.burst))),
+            max_concurrency=max_concurrency,
+            initial_concurrency=min(
+                max_concurrency,
+                max(1,
+                    int(read('concurrency',
+                             defaults.initial_concurrency)))),
+        )
+
+
+def parse_retry_after(value: str | None,
+                      now: float | None = None) -> float | None:
+    """
+    Parse a Retry-After header given as seconds or as an HTTP date.
+
+    Args:
+        value: Header value
+        now: Current wall-clock time (defaults to time.time())
+
+    Returns:
+        Delay in seconds, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+def throttle_delay(headers: dict[str, str],
+                   now: float | None = None) -> float | None:
+    """
+    Work out how long the server asked us to pause from response headers.
+
+    Args:
+        headers: Lower-cased response headers
+        now: Current wall-clock time (defaults to time.time())
+
+    Returns:
+        Delay in seconds, or None if the headers don't ask for a pause
+    """
+    delay = parse_retry_after(headers.get('retry-after'), now)
+    if delay is not None:
+        return delay
+    if headers.get('ratelimit-remaining', '').strip() == '0':
+        reset = headers.get('ratelimit-reset', '').strip()
+        if reset.isdigit():
+            # GitLab sends the reset as a Unix timestamp
+            return max(0.0, int(reset) - (time.time() if now is None else now))
+    return None
+
+
+_GLAB_RETRY_AFTER = re.compile(r'retry[- ]after:?\s*(\d+(?:\.\d+)?)',
+                               re.IGNORECASE)
+
+# The 429 status as glab reports it, not any 429 in the output (e.g. an IID)
+_GLAB_THROTTLED = re.compile(
+    r'rate limit|too many requests|\bhttp 429\b', re.IGNORECASE)
+
+
+def glab_throttle_delay(output: str) -> float | None:
+    """
+    Find a rate-limit hint in glab's error output.
+
+    Args:
+        output: glab's stdout and stderr
+
+    Returns:
+        Requested delay in seconds, 0.0 if glab reports throttling without a
+        delay, or None if the output is not about rate limiting
+    """
+    match = _GLAB_RETRY_AFTER.search(output)
+    if match:
+        return float(match.group(1))
+    if _GLAB_THROTTLED.search(output):
+        return 0.0
+    return None
+
+
+def backoff_delay(attempt: int,
+                  base: float = 1.0,
+                  cap: float = MAX_BACKOFF) -> float:
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt: Zero-based retry attempt
+        base: Delay scale of the first attempt
+        cap: Maximum delay
+
+    Returns:
+        Random delay in seconds between 0 and min(cap, base * 2**attempt)
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class RateLimiter:
+    """
+    Token bucket plus AIMD concurrency window for one host.
+
+    Thread-safe; every thread calling the host shares one instance (see
+    get_rate_limiter()).
+    """
+
+    def __init__(self, config: RateLimitConfig | None = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            config: Limits to enforce (defaults to RateLimitConfig())
+        """
+        self.config = config or RateLimitConfig()
+        self.window = float(self.config.initial_concurrency)
+        self.in_flight = 0
+        self._tokens = float(self.config.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def max_concurrency(self) -> int:
+        """Upper bound of the concurrency window."""
+        return self.config.max_concurrency
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._tokens = min(float(self.config.burst),
+                           self._tokens + elapsed * self.config.rate)
+        self._refilled_at = now
+
+    def acquire(self, deadline: Deadline | None = None) -> None:
+        """
+        Block until the window, token bucket and any pause allow a call.
+
+        Args:
+            deadline: Deadline capping every wait, None to wait as long as
+                the limits require
+
+        Raises:
+            DeadlineExceededError: If the deadline passes while waiting
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.in_flight >= int(self.window):
+                    wait = None
+                elif self._tokens < 1:
+                    wait = (1 - self._tokens) / self.config.rate
+                else:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    return
+                if deadline is not None:
+                    wait = deadline.cap(wait)
+                self._cond.wait(wait)
+
+    def release(self, throttled: bool = False) -> None:
+        """
+        Finish a call and adapt the concurrency window.
+
+        Args:
+            throttled: Whether the server rejected the call as over its limit
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                # Multiplicative decrease
+                self.window = max(float(self.config.min_concurrency),
+                                  self.window / 2)
+            else:
+                # Additive increase: about one slot per window of successes
+                self.window = min(float(self.config.max_concurrency),
+                                  self.window + 1 / self.window)
+            self._cond.notify_all()
+
+    def pause(self, delay: float) -> None:
+        """
+        Hold back every call to the host for a while.
+
+        Args:
+            delay: Seconds to pause, as requested by the server. A little
+                jitter is added so waiting calls don't all resume at once.
+        """
+        with self._cond:
+            jitter = random.uniform(0, 0.1 + delay / 10)
+            until = time.monotonic() + delay + jitter
+            self._paused_until = max(self._paused_until, until)
+            self._cond.notify_all()
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str,
+                     repo: RepoContext | None = None) -> RateLimiter:
+    """
+    Get the process-wide rate limiter of a host.
+
+    Args:
+        host: Host name
+        repo: Repository context to read the host's limits from on first use
+
+    Returns:
+        The host's shared RateLimiter
+    """
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(
+                RateLimitConfig.from_git_config(host, repo))
+        return _limiters[host]
@@ -0,0 +1,173 @@
+"""
+Dependency-driven task scheduling for git-stack.
+
+Commands like push consist of many small network round trips whose inputs
+depend on each other only locally: an MR's dependency needs that MR and its
+predecessor, not every MR of the stack. TaskGraph runs each task as soon as
+the tasks it depends on have finished, so the wall time approaches the
+critical path instead of the sum of the slowest call of every phase.
+
+Tasks are not started once the command's deadline has passed; see
+git_stack.timeouts.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any
+
+from git_stack.timeouts import Deadline, DeadlineExceededError
+
+# Default number of tasks run concurrently
+DEFAULT_MAX_WORKERS = 4
+
+
+class DependencyFailedError(Exception):
+    """Result of a task that was not run because a dependency failed."""
+
+    def __init__(self, key: Hashable, dependency: Hashable):
+        super().__init__(f"{key!r} not run: dependency {dependency!r} failed")
+        self.key = key
+        self.dependency = dependency
+
+
+@dataclass
+class _Task:
+    """A task and its scheduling state."""
+
+    func: Callable[[], Any]
+    deps: tuple[Hashable, ...]
+    on_done: Callable[[Any], None] | None
+    dependents: list[Hashable] = field(default_factory=list)
+    pending: int = 0
+
+
+class TaskGraph:
+    """
+    Directed acyclic graph of tasks run on a bounded thread pool.
+
+    Tasks run in worker threads. Each task's on_done callback runs in the
+    thread that called run(), one at a time, before any dependent task is
+    started, so callbacks may update shared state (like the mapping) that
+    dependents read.
+
+    A task whose function or callback raises is failed. Its dependents are
+    not run and get a DependencyFailedError as their result. Tasks that
+    become ready after the deadline are failed with a DeadlineExceededError
+    without being run. A graph can be run once.
+    """
+
+    def __init__(self,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 deadline: Deadline | None = None):
+        """
+        Initialize an empty graph.
+
+        Args:
+            max_workers: Maximum number of tasks running at the same time
+            deadline: Deadline after which no more tasks are started
+        """
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self._tasks: dict[Hashable, _Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def add(self,
+            key: Hashable,
+            func: Callable[[], Any],
+            deps: Iterable[Hashable] = (),
+            on_done: Callable[[Any], None] | None = None) -> Hashable:
+        """
+        Add a task to the graph.
+
+        Dependencies must already be in the graph, which keeps it acyclic.
+
+        Args:
+            key: Unique name of the task
+            func: Function run in a worker thread
+            deps: Keys of the tasks that must finish first
+            on_done: Called with the task's result after it succeeded
+
+        Returns:
+            The task's key
+        """
+        if key in self._tasks:
+            raise ValueError(f"Duplicate task {key!r}")
+        deps = tuple(dict.fromkeys(deps))
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {key!r} depends on unknown task "
+                                 f"{dep!r}")
+            self._tasks[dep].dependents.append(key)
+        self._tasks[key] = _Task(func, deps, on_done, pending=len(deps))
+        return key
+
+    def run(self) -> dict[Hashable, Any]:
+        """
+        Run every task, each as soon as its dependencies have finished.
+
+        If run() is interrupted (e.g. by KeyboardInterrupt), tasks that have
+        not started yet are cancelled and running tasks are not waited for.
+
+        Returns:
+            Mapping of task key to its result, or to the exception it (or its
+            on_done callback) raised, or to a DependencyFailedError or
+            DeadlineExceededError
+        """
+        results: dict[Hashable, Any] = {}
+        failed: set[Hashable] = set()
+        running: dict[Future[Any], Hashable] = {}
+
+        executor = ThreadPoolExecutor(max_workers=max(1, self.max_workers))
+        try:
+
+            def finish(key: Hashable) -> None:
+                for dependent in self._tasks[key].dependents:
+                    task = self._tasks[dependent]
+                    task.pending -= 1
+                    if task.pending == 0:
+                        start(dependent)
+
+            def start(key: Hashable) -> None:
+                task = self._tasks[key]
+                failed_dep = next((dep for dep in task.deps if dep in failed),
+                                  None)
+                if failed_dep is not None:
+                    results[key] = DependencyFailedError(key, failed_dep)
+                    failed.add(key)
+                    finish(key)
+                elif self.deadline is not None and self.deadline.expired:
+                    results[key] = DeadlineExceededError(
+                        f"{key!r} not run: deadline exceeded")
+                    failed.add(key)
+                    finish(key)
+                else:
+                    running[executor.submit(task.func)] = key
+
+            for key, task in list(self._tasks.items()):
+                if not task.deps:
+                    start(key)
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    task = self._tasks[key]
+                    try:
+                        results[key] = future.result()
+                        if task.on_done is not None:
+                            task.on_done(results[key])
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        results[key] = e
+                        failed.add(key)
+                    finish(key)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        return results
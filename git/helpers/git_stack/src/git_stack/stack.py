@@ -5,15 +5,28 @@ Main GitStackPush class for managing stacked MRs.
 
 from __future__ import annotations
 
-import json
+import functools
+import hashlib
+import os
 import re
 import subprocess
 import sys
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import tempfile
+from collections.abc import Iterable, Iterator
 from pathlib import Path
+from types import TracebackType
 from typing import Any
 
+from git_stack.aio import (
+    AsyncCore,
+    AsyncHostingClient,
+    process_watchdog,
+    run_process_blocking,
+    run_sync,
+    track_process,
+    untrack_process,
+)
+from git_stack.caching import CachingHostingClient
 from git_stack.change_id import (
     extract_change_id,
     extract_position,
@@ -23,14 +36,43 @@ from git_stack.change_id import (
     get_git_username,
     validate_stack_name,
 )
-from git_stack.hosting_client import GitHostingClient, GitLabClient
-
-# Lock for thread-safe mapping file operations
-_mapping_lock = threading.Lock()
+from git_stack.gitlab_api import GitLabApiClient
+from git_stack.hosting_client import (
+    GitHostingClient,
+    GitLabClient,
+    HostingError,
+    NoteNotFoundError,
+)
+from git_stack.http_cache import open_http_cache
+from git_stack.mapping import MappingStore, create_mapping_backend
+from git_stack.mirror import MIRROR_FILE, MrMirror, read_max_age
+from git_stack.plumbing import (
+    GitObjectReader,
+    GitPlumbingError,
+    RefTransaction,
+    RepoContext,
+    git_version,
+)
+from git_stack.scheduler import DependencyFailedError, TaskGraph
+from git_stack.timeouts import (
+    DeadlineExceededError,
+    get_deadline,
+    read_timeouts,
+)
 
 # Backup ref name for rollback
 BACKUP_REF = 'refs/git-stack/backup'
 
+# Marker identifying the stack links note on an MR
+STACK_NOTE_MARKER = '<!-- git-stack-chain -->'
+
+# NUL-separated commit fields for the single-pass commit loader. With -z, git
+# also terminates every record with a NUL, so the output is a flat sequence of
+# records with COMMIT_LOG_FIELDS fields each. The tree, parents and author are
+# loaded so history can be rewritten with commit-tree without a checkout.
+COMMIT_LOG_FORMAT = '%H%x00%T%x00%P%x00%an%x00%ae%x00%ad%x00%s%x00%B'
+COMMIT_LOG_FIELDS = 8
+
 
 class GitStackError(Exception):
     """Base exception for git-stack errors."""
@@ -44,42 +86,30 @@ class CherryPickError(GitStackError):
     """Raised when cherry-pick fails."""
 
 
-def load_mapping(path: Path) -> dict[str, Any]:
+def _parse_commit_fields(fields: list[str]) -> dict[str, Any]:
     """
-    Load the Change-Id to MR mapping from file (thread-safe).
+    Build a commit dictionary from one record of COMMIT_LOG_FORMAT output.
 
     Args:
-        path: Path to the mapping JSON file
+        fields: The COMMIT_LOG_FIELDS fields of a single commit
 
     Returns:
-        Dictionary containing the mapping, empty dict if file doesn't exist
-    """
-    with _mapping_lock:
-        if not path.exists():
-            return {}
-
-        try:
-            with open(path) as f:
-                data: dict[str, Any] = json.load(f)
-                return data
-        except (OSError, json.JSONDecodeError):
-            return {}
-
-
-def save_mapping(path: Path, data: dict[str, Any]) -> None:
-    """
-    Save the Change-Id to MR mapping to file (thread-safe).
-
-    Args:
-        path: Path to the mapping JSON file
-        data: Dictionary to save
+        Commit dictionary
     """
-    with _mapping_lock:
-        # Create parent directory if it doesn't exist
-        path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(path, 'w') as f:
-            json.dump(data, f, indent=2)
+    (sha, tree, parents, author_name, author_email, author_date, subject,
+     message) = fields
+    message = message.strip()
+    return {
+        'sha': sha.strip(),
+        'change_id': extract_change_id(message),
+        'subject': subject,
+        'message': message,
+        'tree': tree,
+        'parents': parents.split(),
+        'author_name': author_name,
+        'author_email': author_email,
+        'author_date': author_date,
+    }
 
 
 def add_change_id_to_message(message: str, change_id: str) -> str:
@@ -139,7 +169,7 @@ def build_stack_chain_description(chain: list[dict[str,
         Markdown string with stack chain information
     """
     lines = [
-        '<!-- git-stack-chain -->',
+        STACK_NOTE_MARKER,
         '',
         '## Stacked MRs',
         '',
@@ -177,13 +207,15 @@ def build_stack_chain_description(chain: list[dict[str,
 
 
 def build_mr_chain(commits: list[dict[str, Any]],
-                   base_branch: str) -> list[dict[str, Any]]:
+                   base_branch: str,
+                   repo: RepoContext | None = None) -> list[dict[str, Any]]:
     """
     Build MR chain with target branches for each commit.
 
     Args:
         commits: List of commit dicts with 'sha', 'change_id', 'subject'
         base_branch: The base branch name (may include origin/ prefix)
+        repo: Repository context to read the username from
 
     Returns:
         List of commits with added 'target_branch' and 'source_branch' fields
@@ -192,6 +224,8 @@ def build_mr_chain(commits: list[dict[str, Any]],
 
     # Strip origin/ prefix for MR target branches
     target_base_branch = base_branch.replace('origin/', '')
+    if repo is None:
+        repo = RepoContext()
 
     for i, commit in enumerate(commits):
         commit_copy = commit.copy()
@@ -200,14 +234,60 @@ def build_mr_chain(commits: list[dict[str, Any]],
             commit_copy['target_branch'] = target_base_branch
         else:
             prev_change_id = commits[i - 1]['change_id']
-            commit_copy['target_branch'] = get_branch_name(prev_change_id)
+            commit_copy['target_branch'] = get_branch_name(
+                prev_change_id, repo)
 
-        commit_copy['source_branch'] = get_branch_name(commit['change_id'])
+        commit_copy['source_branch'] = get_branch_name(commit['change_id'],
+                                                       repo)
         chain.append(commit_copy)
 
     return chain
 
 
+def _is_unfinished(result: Any) -> bool:
+    """Check whether a task result means the task ran out of time."""
+    if isinstance(result, DeadlineExceededError):
+        return True
+    # Dependents of a task that ran out of time
+    return isinstance(result, DependencyFailedError) and get_deadline().expired
+
+
+def create_hosting_client(dry_run: bool = False,
+                          repo: RepoContext | None = None) -> GitHostingClient:
+    """
+    Create the hosting client selected by configuration.
+
+    The backend is read from the GIT_STACK_CLIENT environment variable, then
+    from ``git config git-stack.client``:
+    - 'glab' (default): GitLabClient, one glab process per call
+    - 'api': GitLabApiClient, native REST calls over pooled connections
+
+    Args:
+        dry_run: If True, the client prints requests instead of sending them
+        repo: Repository context to read the git config from
+
+    Returns:
+        The configured GitHostingClient
+    """
+    backend = os.getenv('GIT_STACK_CLIENT')
+    if not backend:
+        if repo is None:
+            repo = RepoContext()
+        backend = repo.get_config('git-stack.client')
+
+    backend = (backend or 'glab').lower()
+    if backend == 'api':
+        return GitLabApiClient(dry_run=dry_run,
+                               repo=repo,
+                               cache=open_http_cache(repo))
+    if backend != 'glab':
+        print(
+            f"Warning: Unknown git-stack client '{backend}', using glab",
+            file=sys.stderr,
+        )
+    return GitLabClient(dry_run=dry_run, repo=repo)
+
+
 class GitStackPush:
     """Main class for managing stacked MRs."""
 
@@ -217,6 +297,8 @@ class GitStackPush:
         mapping_path: Path | None = None,
         stack_name: str | None = None,
         client: GitHostingClient | None = None,
+        force_sync: bool = False,
+        mirror_max_age: float | None = None,
     ):
         """
         Initialize GitStackPush.
@@ -225,57 +307,172 @@ class GitStackPush:
             dry_run: If True, don't execute any commands
             mapping_path: Path to mapping file (defaults to .git/git-stack-mapping.json)
             stack_name: Optional stack name to use
-            client: GitHostingClient instance (defaults to GitLabClient)
+            client: GitHostingClient instance (defaults to the client selected
+                by create_hosting_client())
+            force_sync: If True, update every MR even if the mapping says its
+                title and target branch are already up to date
+            mirror_max_age: Seconds after which the local MR mirror is
+                refreshed before use (defaults to git-stack.mirror-max-age)
         """
         self.dry_run = dry_run
         self.stack_name_override = stack_name
+        self.force_sync = force_sync
+
+        # Git config, git dir and remotes, read once for the whole command
+        self.repo = RepoContext()
+        self.timeouts = read_timeouts(self.repo)
 
         # Set up mapping path - default to .git/ directory (per-repo)
         if mapping_path is None:
-            import os  # pylint: disable=import-outside-toplevel
-
             env_path = os.getenv('GIT_STACK_MAPPING_FILE')
             if env_path:
                 self.mapping_path = Path(env_path)
             else:
                 # Use .git directory for per-repo mapping
-                try:
-                    git_dir = self._run_git_command(['rev-parse', '--git-dir'])
+                git_dir = self.repo.git_dir
+                if git_dir:
                     self.mapping_path = Path(
                         git_dir) / 'git-stack-mapping.json'
-                except subprocess.CalledProcessError:
+                else:
                     # Fallback to home directory if not in a git repo
                     self.mapping_path = (Path.home() / '.config' /
                                          'git-stack-mapping.json')
         else:
             self.mapping_path = mapping_path
 
-        self.mapping = load_mapping(self.mapping_path)
+        self.mapping = MappingStore.load(
+            create_mapping_backend(self.mapping_path, repo=self.repo),
+            self.repo)
 
-        # Set up client
-        self.client: GitHostingClient
+        # Local mirror of the user's MRs, loaded on first use
+        git_dir = self.repo.git_dir
+        self.mirror_path = (Path(git_dir) / MIRROR_FILE if git_dir else
+                            self.mapping_path.with_name(MIRROR_FILE))
+        self.mirror_max_age = (read_max_age(self.repo)
+                               if mirror_max_age is None else mirror_max_age)
+        self._mirror_synced = False
+        self._mirror_changed = False
+
+        # Set up client; reads are memoized for the lifetime of this object
         if client is None:
-            self.client = GitLabClient(dry_run=dry_run)
-        else:
-            self.client = client
+            client = create_hosting_client(dry_run=dry_run, repo=self.repo)
+        self.client = CachingHostingClient(client)
+
+        # Shared cat-file coprocess for object and ref lookups
+        self.objects = GitObjectReader(timeout=self.timeouts['git'])
+
+        # Async view of the client for concurrent requests, limited per
+        # resource by the core
+        self.core = AsyncCore()
+        self.async_client = AsyncHostingClient(self.client, self.core)
+
+    def __enter__(self) -> GitStackPush:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None,
+                 exc: BaseException | None,
+                 traceback: TracebackType | None) -> None:
+        self.close()
+
+    @functools.cached_property
+    def mirror(self) -> MrMirror:
+        """
+        The local MR mirror, refreshed first if older than mirror_max_age.
+
+        A failed refresh is reported and the mirror is used as it is. In
+        dry-run mode the mirror is never refreshed, since the client doesn't
+        run requests.
+        """
+        mirror = MrMirror.load(self.mirror_path)
+        if not mirror.is_fresh(self.mirror_max_age):
+            self._sync_mirror(mirror)
+        return mirror
+
+    @functools.cached_property
+    def open_mr_index(self) -> dict[str, dict[str, Any]] | None:
+        """
+        The user's open MRs keyed by source branch, synced once per command.
+
+        Unlike the mirror property, this always brings the mirror up to date
+        (one incremental listing), since it decides whether MRs are created.
+        In dry-run mode the mirror is used as it is.
+        None if the user's MRs could not be listed in this command: MRs
+        opened elsewhere since the last sync would be missing from the
+        mirror and created again.
+        """
+        mirror = self._synced_mirror()
+        if mirror.synced_at is None or not (self._mirror_synced or
+                                            self.dry_run):
+            return None
+        return mirror.open_mrs_by_source_branch()
+
+    def _synced_mirror(self) -> MrMirror:
+        """The mirror, brought up to date once per command (not in dry-run)."""
+        mirror = self.mirror
+        if not self._mirror_synced:
+            self._sync_mirror(mirror)
+        return mirror
+
+    def _sync_mirror(self, mirror: MrMirror) -> None:
+        """Refresh the mirror, reporting failures instead of raising."""
+        if self.dry_run:
+            return
+        try:
+            mirror.sync(self.client)
+        except (subprocess.CalledProcessError, HostingError, ValueError,
+                OSError) as e:
+            print(f"Warning: Could not refresh the MR mirror: {e}",
+                  file=sys.stderr)
+            return
+        self._mirror_synced = True
+
+    def close(self) -> None:
+        """Release long-lived resources held for the current command."""
+        self.objects.close()
+        self.mapping.close()
+        self.client.close()
+
+    def _run_git(
+            self,
+            args: list[str],
+            input_text: str | None = None,
+            env: dict[str, str] | None = None
+    ) -> subprocess.CompletedProcess[str]:
+        """
+        Run a git command under the git timeout and return the process.
+
+        Args:
+            args: Git command arguments
+            input_text: Optional text to pass on stdin
+            env: Optional extra environment variables
+
+        Returns:
+            The completed process, whatever its exit status
+        """
+        if env is not None:
+            env = {**os.environ, **env}
+
+        return run_process_blocking(['git'] + args, 'git', input_text, env,
+                                    self.timeouts['git'])
 
-    def _run_git_command(self, args: list[str], check: bool = True) -> str:
+    def _run_git_command(self,
+                         args: list[str],
+                         check: bool = True,
+                         input_text: str | None = None,
+                         env: dict[str, str] | None = None) -> str:
         """
         Run a git command and return output.
 
         Args:
             args: Git command arguments
             check: Whether to raise exception on error
+            input_text: Optional text to pass on stdin
+            env: Optional extra environment variables
 
         Returns:
             Command output as string
         """
-        result = subprocess.run(
-            ['git'] + args,
-            capture_output=True,
-            text=True,
-            check=False,
-        )
+        result = self._run_git(args, input_text, env)
 
         if check and result.returncode != 0:
             error_msg = (result.stderr.strip()
@@ -291,9 +488,7 @@ class GitStackPush:
 
     def _validate_environment(self) -> None:
         """Validate that required tools and environment are available."""
-        try:
-            self._run_git_command(['rev-parse', '--git-dir'])
-        except subprocess.CalledProcessError:
+        if self.repo.git_dir is None:
             print('Error: Not in a git repository', file=sys.stderr)
             sys.exit(1)
 
@@ -311,13 +506,25 @@ class GitStackPush:
                 'Please commit or stash them before proceeding.\n'
                 f"Changes:\n{status}")
 
-    def _create_backup_ref(self) -> None:
-        """Create a backup ref pointing to current HEAD for rollback."""
+    def _create_backup_ref(self, head_sha: str) -> None:
+        """
+        Create a backup ref pointing to current HEAD for rollback.
+
+        Args:
+            head_sha: Commit HEAD currently points at
+        """
         if self.dry_run:
             print('[DRY-RUN] Would create backup ref')
             return
 
-        self._run_git_command(['update-ref', BACKUP_REF, 'HEAD'], check=False)
+        transaction = RefTransaction(message='git-stack: backup',
+                                     timeout=self.timeouts['git'])
+        transaction.update(BACKUP_REF, head_sha)
+        try:
+            transaction.commit()
+        except GitPlumbingError as e:
+            print(f"Warning: Could not create backup ref: {e}",
+                  file=sys.stderr)
 
     def _restore_from_backup(self) -> bool:
         """
@@ -327,18 +534,70 @@ class GitStackPush:
             True if restoration was successful, False otherwise
         """
         try:
-            backup_sha = self._run_git_command(['rev-parse', BACKUP_REF],
-                                               check=False)
+            backup_sha = self.objects.resolve_refs([BACKUP_REF])[BACKUP_REF]
             if backup_sha:
                 self._run_git_command(['reset', '--hard', backup_sha])
                 return True
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, GitPlumbingError):
             pass
         return False
 
-    def _cleanup_backup_ref(self) -> None:
-        """Remove the backup ref after successful operation."""
-        self._run_git_command(['update-ref', '-d', BACKUP_REF], check=False)
+    def _iter_commits(self, rev_args: list[str]) -> Iterator[dict[str, Any]]:
+        """
+        Stream commits from a single ``git log`` call.
+
+        The output is read incrementally and parsed as it arrives, so callers
+        only pay for one process regardless of how many commits are listed.
+
+        Args:
+            rev_args: Revision arguments passed to git log (e.g. a range)
+
+        Yields:
+            Commit dictionaries with 'sha', 'change_id', 'subject', 'message',
+            'tree', 'parents', 'author_name', 'author_email', 'author_date'
+
+        Raises:
+            subprocess.CalledProcessError: If git log fails
+            subprocess.TimeoutExpired: If git log outlasts the git timeout
+            DeadlineExceededError: If the command's deadline passes
+        """
+        cmd = [
+            'git', 'log', '-z', '--date=raw', f"--format={COMMIT_LOG_FORMAT}"
+        ] + rev_args
+
+        # stderr goes to a file: a pipe only read after stdout could fill up
+        # and block git
+        with tempfile.TemporaryFile() as stderr_file, subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                text=True,
+        ) as proc:
+            assert proc.stdout is not None
+            track_process(proc)
+            try:
+                with process_watchdog(proc, self.timeouts['git']):
+                    fields: list[str] = []
+                    pending = ''
+                    for chunk in iter(lambda: proc.stdout.read(65536), ''):
+                        *complete, pending = (pending + chunk).split('\0')
+                        for field in complete:
+                            fields.append(field)
+                            if len(fields) == COMMIT_LOG_FIELDS:
+                                yield _parse_commit_fields(fields)
+                                fields = []
+                    proc.wait()
+                    if proc.returncode != 0:
+                        stderr_file.seek(0)
+                        raise subprocess.CalledProcessError(
+                            proc.returncode, cmd, '',
+                            stderr_file.read().decode(errors='replace'))
+            except GeneratorExit:
+                # The consumer stopped early; don't wait for the rest
+                proc.kill()
+                raise
+            finally:
+                untrack_process(proc)
 
     def _get_commits(self, base_branch: str) -> list[dict[str, Any]]:
         """
@@ -354,9 +613,8 @@ class GitStackPush:
             base_branch = f"origin/{base_branch}"
 
         try:
-            output = self._run_git_command(
-                ['rev-list', '--reverse', f"{base_branch}..HEAD"])
-            commit_shas = output.split('\n') if output else []
+            return list(
+                self._iter_commits(['--reverse', f"{base_branch}..HEAD"]))
         except subprocess.CalledProcessError:
             print(
                 f"Error: Unable to get commits. Is '{base_branch}' a valid branch?",
@@ -364,24 +622,6 @@ class GitStackPush:
             )
             sys.exit(1)
 
-        if not commit_shas or commit_shas == ['']:
-            return []
-
-        commits = []
-        for sha in commit_shas:
-            message = self._run_git_command(['log', '-1', '--format=%B', sha])
-            subject = self._run_git_command(['log', '-1', '--format=%s', sha])
-            change_id = extract_change_id(message)
-
-            commits.append({
-                'sha': sha,
-                'change_id': change_id,
-                'subject': subject,
-                'message': message,
-            })
-
-        return commits
-
     def _get_next_position(self, commits: list[dict[str, Any]]) -> int:
         """
         Get the next available position for new commits.
@@ -403,14 +643,192 @@ class GitStackPush:
                     max_pos = pos
         return max_pos + 1
 
-    # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+    def _rewrite_commits(self, commits: list[dict[str, Any]],
+                         changed_shas: set[str]) -> bool:
+        """
+        Rebuild commits with new messages directly from their trees.
+
+        Commits are recreated with ``git commit-tree`` starting at the first
+        commit in ``changed_shas``; everything before it keeps its sha. The
+        working tree and index are never touched, since every rewritten commit
+        keeps its original tree. Authorship is preserved and the 'sha' and
+        'parents' fields of the commits are updated in place.
+
+        Args:
+            commits: List of commit dictionaries, oldest first
+            changed_shas: Original shas of commits whose message was changed
+
+        Returns:
+            True if any commit was rewritten, False otherwise
+        """
+        new_parent: str | None = None
+
+        for commit in commits:
+            if new_parent is None and commit['sha'] not in changed_shas:
+                continue
+
+            parents = list(commit['parents'])
+            if new_parent is not None:
+                parents[0] = new_parent
+
+            new_sha = self._commit_tree(commit, commit['tree'], parents)
+
+            commit['sha'] = new_sha
+            commit['parents'] = parents
+            new_parent = new_sha
+
+        return new_parent is not None
+
+    def _commit_tree(self, commit: dict[str, Any], tree: str,
+                     parents: list[str]) -> str:
+        """
+        Create a commit object with a commit's message and authorship.
+
+        Args:
+            commit: Commit dictionary providing message and author
+            tree: Tree of the new commit
+            parents: Parents of the new commit
+
+        Returns:
+            Sha of the new commit
+        """
+        args = ['commit-tree', tree]
+        for parent in parents:
+            args.extend(['-p', parent])
+
+        return self._run_git_command(
+            args,
+            input_text=commit['message'] + '\n',
+            env={
+                'GIT_AUTHOR_NAME': commit['author_name'],
+                'GIT_AUTHOR_EMAIL': commit['author_email'],
+                'GIT_AUTHOR_DATE': f"@{commit['author_date']}",
+            },
+        )
+
+    def _replay_tree(self, commit: dict[str, Any], onto: str) -> str | None:
+        """
+        Compute the tree of cherry-picking a commit onto another, in memory.
+
+        Uses ``git merge-tree --write-tree --merge-base`` (git 2.40+). Older
+        git falls back to a 3-way ``git apply`` into a temporary index. The
+        working tree, index and refs are never touched.
+
+        Args:
+            commit: Commit to replay (its first parent is the merge base)
+            onto: Commit to replay onto
+
+        Returns:
+            The resulting tree, or None if the replay conflicts
+
+        Raises:
+            CherryPickError: If git fails for another reason
+        """
+        base = commit['parents'][0]
+
+        if git_version() >= (2, 40):
+            result = self._run_git([
+                'merge-tree', '--write-tree', f"--merge-base={base}", onto,
+                commit['sha']
+            ])
+            # Exit status 1 reports conflicts, anything else an error
+            if result.returncode == 1:
+                return None
+            if result.returncode != 0:
+                raise CherryPickError(
+                    f"Could not replay {commit['sha'][:8]}: "
+                    f"{result.stderr.strip()}")
+            return result.stdout.split('\n', 1)[0].strip()
+
+        with tempfile.TemporaryDirectory(prefix='git-stack-') as tmp_dir:
+            # The patch goes through a file, as it may hold binary data
+            env = {'GIT_INDEX_FILE': f"{tmp_dir}/index"}
+            patch = f"{tmp_dir}/patch"
+            try:
+                self._run_git_command(['read-tree', onto], env=env)
+                self._run_git_command([
+                    'diff', '--binary', f"--output={patch}", base,
+                    commit['sha']
+                ])
+                applied = self._run_git(
+                    ['apply', '--cached', '--3way', patch], env=env)
+                if applied.returncode != 0:
+                    return None
+                return self._run_git_command(['write-tree'], env=env)
+            except subprocess.CalledProcessError as e:
+                raise CherryPickError(
+                    f"Could not replay {commit['sha'][:8]}: {e}") from e
+
+    def _move_head(self, transaction: RefTransaction, new_sha: str,
+                   old_sha: str) -> None:
+        """
+        Queue moving the current branch (or detached HEAD) to a new commit.
+
+        The update is guarded by the expected old value. The rewritten commit
+        has the same tree as the old one, so the index and working tree stay
+        valid without a checkout.
+
+        Args:
+            transaction: Transaction to queue the update in
+            new_sha: Commit to move to
+            old_sha: Commit HEAD is expected to point at
+        """
+        head_ref = self._run_git_command(['symbolic-ref', '-q', 'HEAD'],
+                                         check=False)
+        if head_ref:
+            transaction.update(head_ref, new_sha, old_sha)
+        else:
+            transaction.update('HEAD', new_sha, old_sha, no_deref=True)
+
+    def _delete_local_branches(self, branches: list[str]) -> set[str]:
+        """
+        Delete local branches in one atomic ref transaction.
+
+        Branches that don't exist locally and the checked-out branch are
+        skipped.
+
+        Args:
+            branches: Branch names to delete
+
+        Returns:
+            Names of the branches that were deleted
+        """
+        current_branch = self._run_git_command(
+            ['symbolic-ref', '-q', '--short', 'HEAD'], check=False)
+        try:
+            resolved = self.objects.resolve_refs(
+                f"refs/heads/{branch}" for branch in branches)
+        except GitPlumbingError:
+            return set()
+
+        transaction = RefTransaction(message='git-stack: delete branches',
+                                     timeout=self.timeouts['git'])
+        deleted = set()
+        for branch in branches:
+            sha = resolved.get(f"refs/heads/{branch}")
+            if not sha:
+                continue
+            if branch == current_branch:
+                print(f"  Warning: Not deleting checked out branch {branch}")
+                continue
+            transaction.delete(f"refs/heads/{branch}", sha)
+            deleted.add(branch)
+
+        try:
+            transaction.commit()
+        except GitPlumbingError as e:
+            print(f"  Warning: Could not delete local branches: {e}")
+            return set()
+        return deleted
+
     def _add_change_ids_to_commits(
             self, commits: list[dict[str, Any]]) -> list[dict[str, Any]]:
         """
         Add Change-Ids to commits that don't have them.
 
-        This rewrites git history using cherry-pick. Creates a backup ref
-        before starting and rolls back on failure.
+        This rewrites git history with _rewrite_commits(), without checking
+        anything out. Creates a backup ref before starting and rolls back on
+        failure.
 
         Existing Change-IDs are preserved - only new commits get IDs.
         The position in the Change-ID is historical (when created), not
@@ -425,7 +843,7 @@ class GitStackPush:
 
         Raises:
             DirtyWorkingTreeError: If working tree has uncommitted changes
-            CherryPickError: If cherry-pick fails and rollback is performed
+            CherryPickError: If the rewrite fails and rollback is performed
         """
         commits_needing_ids = [c for c in commits if c['change_id'] is None]
 
@@ -455,81 +873,37 @@ class GitStackPush:
                     pos += 1
             return commits
 
+        original_head = commits[-1]['sha']
+
         # Create backup before rewriting history
-        self._create_backup_ref()
+        self._create_backup_ref(original_head)
 
         print(f"\nAdding Change-Ids to {len(commits_needing_ids)} "
               f"commit(s) with stack name '{stack_name}'...")
 
-        # Save current branch/ref
-        original_ref = self._run_git_command(['symbolic-ref', '-q', 'HEAD'],
-                                             check=False)
-        if not original_ref:
-            original_ref = self._run_git_command(['rev-parse', 'HEAD'])
-
-        # Get the base commit (parent of first commit)
-        base_sha = self._run_git_command(
-            ['rev-parse', f'{commits[0]["sha"]}~1'])
-
         try:
-            # Checkout the base
-            self._run_git_command(['checkout', base_sha], check=False)
-
-            # Cherry-pick each commit, adding Change-Id to new ones
+            changed_shas = set()
             position = next_position
-            for commit in commits:
-                # Cherry-pick the commit
-                result = subprocess.run(
-                    ['git', 'cherry-pick', commit['sha']],
-                    capture_output=True,
-                    text=True,
-                    check=False,
-                )
-
-                if result.returncode != 0:
-                    # Cherry-pick failed - abort and rollback
-                    self._run_git_command(['cherry-pick', '--abort'],
-                                          check=False)
-                    self._restore_from_backup()
-                    raise CherryPickError(
-                        f"Cherry-pick failed for commit {commit['sha'][:8]}: "
-                        f"{commit['subject']}\n"
-                        f"Error: {result.stderr or result.stdout}\n"
-                        'Rolled back to original state.')
-
-                if commit['change_id'] is None:
-                    # New commit - add Change-Id
-                    new_change_id = generate_change_id(stack_name, position)
-                    commit['change_id'] = new_change_id
-                    new_message = add_change_id_to_message(
-                        commit['message'], new_change_id)
-                    self._run_git_command(
-                        ['commit', '--amend', '-m', new_message])
-                    commit['message'] = new_message
-                    position += 1
-
-                    print(f"  {commit['sha'][:8]}: {commit['subject']} -> "
-                          f"Change-Id: {new_change_id}")
-
-                # Update sha after cherry-pick
-                new_sha = self._run_git_command(['rev-parse', 'HEAD'])
-                commit['sha'] = new_sha
-
-            # Return to original branch/ref
-            if original_ref.startswith('refs/heads/'):
-                branch_name = original_ref.replace('refs/heads/', '')
-                self._run_git_command(['checkout', branch_name], check=False)
-                self._run_git_command(['reset', '--hard', commits[-1]['sha']],
-                                      check=False)
-            else:
-                self._run_git_command(['checkout', commits[-1]['sha']],
-                                      check=False)
-
-            # Clean up backup ref on success
-            self._cleanup_backup_ref()
+            for commit in commits_needing_ids:
+                new_change_id = generate_change_id(stack_name, position)
+                commit['change_id'] = new_change_id
+                commit['message'] = add_change_id_to_message(
+                    commit['message'], new_change_id)
+                changed_shas.add(commit['sha'])
+                position += 1
+
+                print(f"  {commit['sha'][:8]}: {commit['subject']} -> "
+                      f"Change-Id: {new_change_id}")
+
+            # Move HEAD and drop the backup ref in one atomic update
+            transaction = RefTransaction(message='git-stack: rewrite history',
+                                         timeout=self.timeouts['git'])
+            if self._rewrite_commits(commits, changed_shas):
+                self._move_head(transaction, commits[-1]['sha'],
+                                original_head)
+            transaction.delete(BACKUP_REF)
+            transaction.commit()
 
-        except CherryPickError:
-            raise
         except Exception as e:  # pylint: disable=broad-exception-caught
             # Unexpected error - try to rollback
             self._restore_from_backup()
@@ -595,6 +969,11 @@ class GitStackPush:
         If the local stack has commits 1-3 but remote has 1-4, this will
         fetch commit 4 and rebase it onto the local commit 3.
 
+        All downstream branches are fetched with one ``git fetch``. Their
+        commits are replayed in memory, so a conflict anywhere in the
+        downstream range is detected before any ref or file changes. Only
+        then is HEAD fast-forwarded to the replayed commits.
+
         Args:
             commits: List of local commits (with Change-IDs)
             base_branch: Base branch name
@@ -621,83 +1000,158 @@ class GitStackPush:
 
         max_local_pos = max(local_positions)
 
-        # Find downstream MRs on remote
-        remote_mrs = self.client.find_mrs_by_stack_name(stack_name)
-        downstream_mrs = []
-        for mr in remote_mrs:
-            # Extract position from branch name
-            branch = mr['source_branch']
-            # Branch format: user/stackname@position
-            if '@' in branch:
-                try:
-                    pos = int(branch.split('@')[-1])
-                    if pos > max_local_pos and mr['state'] == 'opened':
-                        downstream_mrs.append((pos, mr))
-                except ValueError:
-                    continue
-
-        if not downstream_mrs:
+        downstream_branches = self._find_downstream_branches(
+            stack_name, max_local_pos)
+        if not downstream_branches:
             return commits
 
-        # Sort by position
-        downstream_mrs.sort(key=lambda x: x[0])
-
-        print(
-            f"\nFound {len(downstream_mrs)} downstream commit(s) to rebase...")
+        print(f"\nFound {len(downstream_branches)} downstream commit(s) "
+              'to rebase...')
 
         if self.dry_run:
-            for pos, mr in downstream_mrs:
-                print(f"[DRY-RUN] Would rebase: {mr['source_branch']} "
-                      f"(position {pos})")
+            for pos, branch in downstream_branches:
+                print(f"[DRY-RUN] Would rebase: {branch} (position {pos})")
             return commits
 
-        # Fetch and rebase each downstream commit
-        for _pos, mr in downstream_mrs:
-            branch = mr['source_branch']
-            print(f"  Rebasing {branch}...")
+        branches = [branch for _pos, branch in downstream_branches]
 
-            try:
-                # Fetch the branch
-                self._run_git_command(['fetch', 'origin', branch])
-
-                # Cherry-pick the commit onto current HEAD
-                self._run_git_command(['cherry-pick', f'origin/{branch}'],
-                                      check=True)
-
-                # Get the new commit info
-                new_sha = self._run_git_command(['rev-parse', 'HEAD']).strip()
-                message = self._run_git_command(
-                    ['log', '-1', '--format=%B', new_sha]).strip()
-                subject = self._run_git_command(
-                    ['log', '-1', '--format=%s', new_sha]).strip()
-                change_id = extract_change_id(message)
-
-                commits.append({
-                    'sha': new_sha,
-                    'message': message,
-                    'subject': subject,
-                    'change_id': change_id,
-                })
-
-                print(f"    + Rebased to {new_sha[:8]}")
+        # Fetch all downstream branches at once
+        try:
+            self._run_git_command(['fetch', 'origin'] + [
+                f"+refs/heads/{branch}:refs/remotes/origin/{branch}"
+                for branch in branches
+            ])
+            tips = self.objects.resolve_refs(
+                f"refs/remotes/origin/{branch}" for branch in branches)
+            downstream = {
+                commit['sha']: commit
+                for commit in self._iter_commits(['--no-walk=unsorted'] + [
+                    sha for sha in tips.values() if sha
+                ])
+            }
+        except (subprocess.CalledProcessError, GitPlumbingError) as e:
+            raise CherryPickError(
+                f"Could not fetch downstream branches: {e}") from e
+
+        # Replay every downstream commit in memory before touching anything
+        head_before = commits[-1]['sha']
+        new_head = head_before
+        rebased = []
+        for branch in branches:
+            commit = downstream.get(tips[f"refs/remotes/origin/{branch}"] or '')
+            if commit is None or not commit['parents']:
+                raise CherryPickError(
+                    f"Could not read downstream branch {branch}")
 
-            except subprocess.CalledProcessError as e:
-                # Cherry-pick failed - likely a conflict
+            print(f"  Rebasing {branch}...")
+            tree = self._replay_tree(commit, new_head)
+            if tree is None:
                 print(f"\n  Rebase conflict while rebasing {branch}!")
-                print('  Please resolve the conflict and then run:')
-                print('    git cherry-pick --continue')
+                print('  Nothing was changed. Rebase it manually with:')
+                print(f"    git cherry-pick origin/{branch}")
                 print('    git-stack push')
-                print('\n  Or abort with:')
-                print('    git cherry-pick --abort')
                 raise CherryPickError(
                     f"Rebase conflict while rebasing {branch}. "
-                    'Please resolve manually.') from e
+                    'Please resolve manually.')
+
+            onto = new_head
+            new_head = self._commit_tree(commit, tree, [onto])
+            rebased.append({
+                **commit,
+                'sha': new_head,
+                'tree': tree,
+                'parents': [onto],
+            })
+
+        # Fast-forward HEAD (and the working tree) to the replayed commits
+        try:
+            self._run_git_command(['merge', '--ff-only', '--quiet', new_head])
+        except subprocess.CalledProcessError as e:
+            raise CherryPickError(
+                f"Could not fast-forward to the rebased commits: {e}") from e
+
+        for commit in rebased:
+            commits.append(commit)
+            print(f"    + Rebased to {commit['sha'][:8]}")
 
         return commits
 
-    def _create_or_update_branches(self, chain: list[dict[str, Any]]) -> None:
+    def _find_downstream_branches(self, stack_name: str,
+                                  max_local_pos: int) -> list[tuple[int, str]]:
+        """
+        Find the stack's branches on origin past the local commits.
+
+        The user's branches of the stack are listed with one ls-remote, and
+        only those past the local commits are looked up by source branch, so
+        no listing of the project's open MRs is needed.
+
+        Args:
+            stack_name: Name of the stack
+            max_local_pos: Highest position of the local commits
+
+        Returns:
+            Sorted (position, branch) pairs of the downstream branches with
+            an open MR
+        """
+        # Branch format: user/stack-uuid@stackname@position
+        prefix = f"{get_git_username(self.repo)}/stack-"
+        pattern = f"refs/heads/{prefix}*@{stack_name}@*"
+        output = self._run_git_command(
+            ['ls-remote', '--heads', 'origin', pattern], check=False)
+        candidates: dict[str, int] = {}
+        for line in output.splitlines():
+            branch = line.partition('\t')[2].removeprefix('refs/heads/')
+            change_id = branch.removeprefix(prefix)
+            if extract_stack_name(change_id) != stack_name:
+                continue
+            pos = extract_position(change_id)
+            if pos and pos > max_local_pos:
+                candidates[branch] = pos
+        if not candidates:
+            return []
+
+        open_mrs = self.client.find_open_mrs_by_source_branches(candidates)
+        return sorted((pos, branch)
+                      for branch, pos in candidates.items()
+                      if open_mrs.get(branch))
+
+    def _snapshot_remote_branches(self,
+                                  branches: list[str]) -> dict[str, str | None]:
+        """
+        Look up the remote shas of several branches with one ls-remote.
+
+        Args:
+            branches: Branch names to look up on origin
+
+        Returns:
+            Dictionary of branch -> remote sha, None for missing branches
+        """
+        snapshot: dict[str, str | None] = dict.fromkeys(branches)
+        if not branches:
+            return snapshot
+
+        output = self._run_git_command(
+            ['ls-remote', 'origin'] +
+            [f"refs/heads/{branch}" for branch in branches])
+        for line in output.splitlines():
+            sha, _, ref = line.partition('\t')
+            branch = ref.removeprefix('refs/heads/')
+            if branch in snapshot:
+                snapshot[branch] = sha
+        return snapshot
+
+    def _create_or_update_branches(self, chain: list[dict[str,
+                                                          Any]]) -> set[str]:
         """
         Create or update branches for each commit in the chain.
+
+        The remote branches are snapshotted once, and only branches whose
+        remote sha differs from the commit are pushed. Each push is leased
+        against the snapshotted sha, so a branch that someone else moved in
+        the meantime is rejected instead of overwritten.
+
+        Returns:
+            Names of the branches that moved (or would move, in dry-run mode)
         """
         print('\nCreating/updating branches...')
 
@@ -707,301 +1161,574 @@ class GitStackPush:
         except subprocess.CalledProcessError:
             current_branch = None
 
+        branches = [commit['source_branch'] for commit in chain]
+        try:
+            remote = self._snapshot_remote_branches(branches)
+        except subprocess.CalledProcessError:
+            if not self.dry_run:
+                raise
+            remote = dict.fromkeys(branches)
+        try:
+            local = self.objects.resolve_refs(
+                f"refs/heads/{branch}" for branch in branches)
+        except GitPlumbingError:
+            local = {}
+
+        to_push = [
+            commit for commit in chain
+            if remote[commit['source_branch']] != commit['sha']
+        ]
+        moved = {commit['source_branch'] for commit in to_push}
+        to_move_locally = [
+            commit for commit in chain
+            if commit['source_branch'] != current_branch and
+            local.get(f"refs/heads/{commit['source_branch']}") != commit['sha']
+        ]
+        push_cmd = ['push', '--porcelain', 'origin']
+        for commit in to_push:
+            branch = commit['source_branch']
+            push_cmd.append(
+                f"--force-with-lease=refs/heads/{branch}:{remote[branch] or ''}"
+            )
+        push_cmd += [
+            f"{commit['sha']}:refs/heads/{commit['source_branch']}"
+            for commit in to_push
+        ]
+
         if self.dry_run:
-            for commit in chain:
+            for commit in to_move_locally:
                 branch_name = commit['source_branch']
                 print(f"[DRY-RUN] Would create/update branch: "
                       f"{branch_name} at {commit['sha'][:8]}")
-            refspecs = [
-                f"{commit['sha']}:refs/heads/{commit['source_branch']}"
-                for commit in chain
-            ]
-            print(
-                f"[DRY-RUN] Would push: git push -f origin {' '.join(refspecs)}"
-            )
+            if to_push:
+                print(f"[DRY-RUN] Would push: git {' '.join(push_cmd)}")
         else:
-            # Create/update all local branches first
-            for commit in chain:
-                branch_name = commit['source_branch']
-                if current_branch != branch_name:
-                    self._run_git_command(
-                        ['branch', '-f', branch_name, commit['sha']])
-
-            # Batch push all branches
-            refspecs = [
-                f"{commit['sha']}:refs/heads/{commit['source_branch']}"
-                for commit in chain
-            ]
-            push_cmd = ['push', '-f', 'origin'] + refspecs
-            self._run_git_command(push_cmd)
+            # Create/update local branches that point elsewhere, in one go
+            transaction = RefTransaction(message='git-stack: push',
+                                         timeout=self.timeouts['git'])
+            for commit in to_move_locally:
+                ref = f"refs/heads/{commit['source_branch']}"
+                transaction.update(ref, commit['sha'],
+                                   local.get(ref) or self.repo.null_sha)
+            try:
+                transaction.commit()
+            except GitPlumbingError as e:
+                raise GitStackError(
+                    f"Could not update local stack branches: {e}") from e
+
+            # Batch push the branches that moved
+            if to_push:
+                self._run_git_command(push_cmd)
 
-            for commit in chain:
+        for commit in chain:
+            if commit['source_branch'] in moved:
                 print(f"  + {commit['source_branch']} at {commit['sha'][:8]}")
+            else:
+                print(f"  = {commit['source_branch']} already at "
+                      f"{commit['sha'][:8]}")
 
-    # pylint: disable=too-many-locals,too-many-branches
-    def _create_or_update_mrs(self, chain: list[dict[str, Any]]) -> None:
-        """
-        Create or update MRs for each commit in the chain.
+        return moved
 
-        Target branches are always rebuilt from the current commit order:
-        - First commit targets the base branch
-        - Each subsequent commit targets the previous commit's branch
+    def _process_chain(self, chain: list[dict[str, Any]]) -> None:
         """
-        print('\nCreating/updating MRs...')
+        Push the chain's branches and sync its MRs, dependencies and links.
 
-        if self.dry_run:
-            for commit in chain:
-                change_id = commit['change_id']
-                source_branch = commit['source_branch']
-                target_branch = commit['target_branch']
-                existing_mr = self.mapping.get(change_id)
+        The work runs as a per-commit task graph instead of phase by phase:
+        - Each MR is created/updated once the branches are pushed
+        - The dependency of MR i is set once MRs i and i-1 exist, unless
+          neither branch moved and both MRs were already up to date
+        - The stack links notes are synced once every MR URL is known
 
-                if existing_mr:
-                    print(
-                        f"[DRY-RUN] Would update MR !{existing_mr['mr_iid']}")
-                else:
-                    print('[DRY-RUN] Would create new MR')
-                print(f"           Title: {commit['subject']}")
-                print(
-                    f"           Source: {source_branch} -> Target: {target_branch}"
-                )
-            return
+        A slow call for one MR therefore only holds up the tasks that need
+        its result. Each phase's report is printed once everything finished.
+
+        The mapping keeps every MR that was processed, also when the deadline
+        passes or the command is interrupted, so a re-run only does what is
+        left.
+
+        Raises:
+            GitStackError: If the branches could not be updated
+            subprocess.CalledProcessError: If the branches could not be pushed
+            DeadlineExceededError: If the deadline passed before every task
+                finished
+        """
+        mr_errors: dict[str, str] = {}
+        unavailable: list[ValueError] = []
+        # Filled in by report_branches() before any dependency task starts
+        moved: set[str] = set()
+        # MRs whose title and target branch were current before this push
+        up_to_date = {
+            commit['change_id']
+            for commit in chain
+            if commit['change_id'] in self.mapping and
+            not self._mr_needs_update(self.mapping[commit['change_id']],
+                                      commit)
+        }
+
+        # MRs of commits missing from the mapping, found in one listing
+        remote_mrs = self._find_remote_mrs([
+            commit['source_branch']
+            for commit in chain
+            if commit['change_id'] not in self.mapping
+        ])
 
         def process_mr(
-            commit: dict[str, Any],
-        ) -> tuple[str, int, str, str, str, str | None]:
-            change_id = commit['change_id']
-            source_branch = commit['source_branch']
-            target_branch = commit['target_branch']
-            existing_mr = self.mapping.get(change_id)
+            commit: dict[str, Any]
+        ) -> tuple[str, int, str, str, str, str] | None:
+            # Failures are reported, but don't stop the stack links
+            try:
+                return self._process_mr(
+                    commit, remote_mrs.get(commit['source_branch']))
+            except DeadlineExceededError:
+                raise
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                mr_errors[commit['change_id']] = str(e)
+                return None
 
-            if existing_mr:
-                mr_iid = existing_mr['mr_iid']
-                title = truncate_mr_title(commit['subject'])
-                # Always pass target_branch to ensure it's updated if stack changed
-                self.client.update_mr(mr_iid, title, target_branch)
-                return ('update', mr_iid, existing_mr['mr_url'],
-                        commit['subject'], target_branch, None)
-
-            # Check if an MR already exists on GitLab for this source branch.
-            # This handles cases where the local mapping is out of sync.
-            remote_mr = self.client.find_mr_by_source_branch(source_branch)
-            if remote_mr:
-                mr_iid = remote_mr['mr_iid']
-                mr_url = remote_mr['mr_url']
-                title = truncate_mr_title(commit['subject'])
-                self.client.update_mr(mr_iid, title, target_branch)
-                # Return 'adopt' to indicate we're adopting an existing remote MR.
-                return ('adopt', mr_iid, mr_url, commit['subject'],
-                        target_branch, change_id)
+        def set_dependency(
+                commit: dict[str, Any],
+                prev_commit: dict[str, Any]) -> tuple[int, int] | None:
+            mr_info = self.mapping.get(commit['change_id'])
+            prev_mr_info = self.mapping.get(prev_commit['change_id'])
+            if not mr_info or not prev_mr_info:
+                return None
+            pair = (commit, prev_commit)
+            if (not moved & {c['source_branch'] for c in pair} and
+                    up_to_date >= {c['change_id'] for c in pair}):
+                # Set by the push that last changed either MR
+                return None
+            if unavailable:
+                # Feature not available on this instance - don't ask again
+                raise unavailable[0]
+            try:
+                self.client.set_mr_dependencies(mr_info['mr_iid'],
+                                                [prev_mr_info['mr_iid']])
+            except ValueError as e:
+                unavailable.append(e)
+                raise
+            return mr_info['mr_iid'], prev_mr_info['mr_iid']
+
+        def report_branches(branches: set[str]) -> None:
+            moved.update(branches)
+            print(f"  {len(moved)} of {len(chain)} branch(es) moved")
+
+        graph = TaskGraph(max_workers=self.client.max_workers,
+                          deadline=get_deadline())
+        graph.add('branches',
+                  lambda: self._create_or_update_branches(chain),
+                  on_done=report_branches)
+        for i, commit in enumerate(chain):
+            graph.add(('mr', i),
+                      functools.partial(process_mr, commit), ['branches'],
+                      functools.partial(self._record_mr_result, commit))
+            if i > 0:
+                graph.add(('dependency', i),
+                          functools.partial(set_dependency, commit,
+                                            chain[i - 1]),
+                          [('mr', i), ('mr', i - 1)])
+        graph.add('mrs',
+                  lambda: None, [('mr', i) for i in range(len(chain))],
+                  lambda _: self._save_mrs())
+        graph.add('links', lambda: self._sync_stack_links(chain), ['mrs'],
+                  self._record_stack_links)
 
-            title = truncate_mr_title(commit['subject'])
-            # Remove Change-Id line from description (it should only be in commit)
-            description = '\n'.join(
-                line for line in commit['message'].split('\n')
-                if not line.strip().startswith('Change-Id:')).rstrip()
-            result = self.client.create_mr(
-                source_branch=source_branch,
-                target_branch=target_branch,
-                title=title,
-                description=description,
-            )
-            return (
-                'create',
-                result['mr_iid'],
-                result['mr_url'],
-                commit['subject'],
-                target_branch,
-                change_id,
-            )
+        try:
+            results = graph.run()
+        except BaseException:
+            # Keep the MRs recorded so far
+            self._save_mrs()
+            raise
+        if isinstance(results['branches'], Exception):
+            raise results['branches']
+
+        self._report_mrs(chain,
+                         [results[('mr', i)] for i in range(len(chain))],
+                         mr_errors)
+        self._report_dependencies(chain, results)
+        self._report_stack_links(results['links'])
+        self.mapping.save()
+
+        unfinished = self._report_unfinished(chain, results)
+        if unfinished:
+            raise DeadlineExceededError(
+                f"{unfinished} operation(s) did not finish before the "
+                'deadline; run the command again to finish them')
+
+    def _find_remote_mrs(
+            self, branches: list[str]) -> dict[str, dict[str, Any] | None]:
+        """
+        Find the open MRs of source branches that are not in the mapping.
 
-        # Process all MRs in parallel
-        results: list[tuple[str, int, str, str, str, str | None]] = []
-        errors: list[tuple[str, str]] = []
+        All branches are matched against the open MR index, so they cost one
+        incremental listing together. If the user's MRs can't be listed, the
+        branches are looked up by source branch instead.
 
-        with ThreadPoolExecutor(max_workers=min(len(chain), 4)) as executor:
-            futures = {
-                executor.submit(process_mr, commit): commit
-                for commit in chain
-            }
+        Args:
+            branches: Source branches
 
-            for future in as_completed(futures):
-                commit = futures[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    errors.append((commit['subject'], str(e)))
-
-        # Update mapping for all new/adopted MRs (thread-safe)
-        mapping_changed = False
-        for action, mr_iid, mr_url, _subject, _target, change_id in results:
-            if action in ('create', 'adopt') and change_id:
-                self.mapping[change_id] = {
-                    'mr_iid': mr_iid,
-                    'mr_url': mr_url,
-                    'project_id': self._get_project_id(),
-                }
-                mapping_changed = True
+        Returns:
+            Mapping of branch to MR info, None for branches without an open
+            MR; branches whose lookup failed are omitted
+        """
+        if not branches:
+            return {}
+        index = self.open_mr_index
+        if index is None:
+            return self.client.find_open_mrs_by_source_branches(branches)
+        return {branch: index.get(branch) for branch in branches}
+
+    def _process_mr(
+        self,
+        commit: dict[str, Any],
+        remote_mr: dict[str, Any] | None = None
+    ) -> tuple[str, int, str, str, str, str]:
+        """
+        Create or update the MR of a commit.
+
+        Target branches are always rebuilt from the current commit order:
+        - First commit targets the base branch
+        - Each subsequent commit targets the previous commit's branch
+
+        The mapping remembers the title, target branch and sha last pushed
+        for each MR. Existing MRs are only updated when their title or target
+        changed, unless force_sync is set. The same holds for an open MR of
+        the commit's branch that is missing from the mapping, which is
+        adopted instead of creating a new one.
+
+        Args:
+            commit: Chain entry of the commit
+            remote_mr: Open MR of the commit's source branch if the mapping
+                has none (see _find_remote_mrs())
+
+        Returns:
+            Tuple of (action, MR IID, MR URL, subject, target branch,
+            Change-Id), where action is 'create', 'adopt', 'update' or
+            'unchanged'
+        """
+        change_id = commit['change_id']
+        source_branch = commit['source_branch']
+        target_branch = commit['target_branch']
+        existing_mr = self.mapping.get(change_id)
+
+        if existing_mr:
+            mr_iid = existing_mr['mr_iid']
+            if not self._mr_needs_update(existing_mr, commit):
+                return ('unchanged', mr_iid, existing_mr['mr_url'],
+                        commit['subject'], target_branch, change_id)
+            title = truncate_mr_title(commit['subject'])
+            self.client.update_mr(mr_iid, title, target_branch)
+            return ('update', mr_iid, existing_mr['mr_url'], commit['subject'],
+                    target_branch, change_id)
+
+        # An MR may already exist on GitLab for this source branch if the
+        # local mapping is out of sync
+        if remote_mr:
+            mr_iid = remote_mr['mr_iid']
+            mr_url = remote_mr['mr_url']
+            if self._mr_needs_update(remote_mr, commit):
+                title = truncate_mr_title(commit['subject'])
+                self.client.update_mr(mr_iid, title, target_branch)
+            # Return 'adopt' to indicate we're adopting an existing remote MR.
+            return ('adopt', mr_iid, mr_url, commit['subject'], target_branch,
+                    change_id)
+
+        title = truncate_mr_title(commit['subject'])
+        # Remove Change-Id line from description (it should only be in commit)
+        description = '\n'.join(
+            line for line in commit['message'].split('\n')
+            if not line.strip().startswith('Change-Id:')).rstrip()
+        result = self.client.create_mr(
+            source_branch=source_branch,
+            target_branch=target_branch,
+            title=title,
+            description=description,
+        )
+        return (
+            'create',
+            result['mr_iid'],
+            result['mr_url'],
+            commit['subject'],
+            target_branch,
+            change_id,
+        )
 
-        if mapping_changed:
-            save_mapping(self.mapping_path, self.mapping)
+    def _record_mr_result(
+            self, commit: dict[str, Any],
+            result: tuple[str, int, str, str, str, str] | None) -> None:
+        """
+        Record what was pushed so the next push can skip no-op updates.
 
-        # Print results with target branch info
-        for action, mr_iid, mr_url, subject, target_branch, _ in results:
+        Args:
+            commit: Chain entry of the commit
+            result: Result of _process_mr(), None if it failed
+        """
+        if result is None:
+            return
+        action, mr_iid, mr_url, subject, target_branch, change_id = result
+        existing_mr = self.mapping.get(change_id, {})
+        mr_info = {
+            **existing_mr,
+            'mr_iid': mr_iid,
+            'mr_url': mr_url,
+            'title': truncate_mr_title(subject),
+            'target_branch': target_branch,
+            'sha': commit['sha'],
+        }
+        if action in ('create', 'adopt'):
+            mr_info['project_id'] = self._get_project_id()
+            # The mirror was synced before the MR was created or adopted
+            self.mirror.remember({
+                'mr_iid': mr_iid,
+                'mr_url': mr_url,
+                'state': 'opened',
+                'source_branch': commit['source_branch'],
+                'target_branch': target_branch,
+                'title': mr_info['title'],
+            })
+            self._mirror_changed = True
+        if mr_info != existing_mr:
+            self.mapping[change_id] = mr_info
+
+    def _save_mrs(self) -> None:
+        """Save the mapping, and the mirror if MRs were added to it."""
+        self.mapping.save()
+        if self._mirror_changed and not self.dry_run:
+            self.mirror.save()
+            self._mirror_changed = False
+
+    @staticmethod
+    def _report_mrs(
+            chain: list[dict[str, Any]],
+            mr_results: list[tuple[str, int, str, str, str, str] | None],
+            mr_errors: dict[str, str]) -> None:
+        """Print the outcome of every MR create/update."""
+        print('\nCreating/updating MRs...')
+
+        for result in mr_results:
+            if result is None or isinstance(result, Exception):
+                continue
+            action, mr_iid, mr_url, subject, target_branch, _ = result
             if action == 'create':
                 print(f"  + Created MR !{mr_iid}: {subject}")
             elif action == 'adopt':
                 print(f"  * Adopted existing MR !{mr_iid}: {subject}")
+            elif action == 'unchanged':
+                print(f"  = MR !{mr_iid} is up to date: {subject}")
             else:
                 print(f"  ~ Updated MR !{mr_iid}: {subject}")
             print(f"    {mr_url}")
             print(f"    Target: {target_branch}")
 
-        for subject, error in errors:
-            print(f"  ! Failed to process MR for {subject}: {error}")
-
-    def _set_mr_dependencies(self, chain: list[dict[str, Any]]) -> None:
-        """Set MR dependencies so each MR depends on the previous one."""
-        print('\nSetting MR dependencies...')
-
-        if self.dry_run:
-            for i, commit in enumerate(chain):
-                if i == 0:
-                    continue
-                change_id = commit['change_id']
-                if change_id not in self.mapping:
-                    continue
-                prev_change_id = chain[i - 1]['change_id']
-                if prev_change_id not in self.mapping:
-                    continue
-                mr_iid = self.mapping[change_id]['mr_iid']
-                prev_mr_iid = self.mapping[prev_change_id]['mr_iid']
-                print(
-                    f"[DRY-RUN] Would set MR !{mr_iid} to depend on !{prev_mr_iid}"
-                )
-            return
+        for commit in chain:
+            if commit['change_id'] in mr_errors:
+                print(f"  ! Failed to process MR for {commit['subject']}: "
+                      f"{mr_errors[commit['change_id']]}")
 
-        def set_dependency(
-                i: int, commit: dict[str,
-                                     Any]) -> tuple[str, int, int, str] | None:
-            if i == 0:
-                return None
+    def _mr_needs_update(self, mr_info: dict[str, Any],
+                         commit: dict[str, Any]) -> bool:
+        """
+        Check whether an existing MR's title or target branch is out of date.
 
-            change_id = commit['change_id']
-            if change_id not in self.mapping:
-                return None
+        Args:
+            mr_info: Mapping entry of the MR
+            commit: Chain entry of the MR's commit
 
-            prev_change_id = chain[i - 1]['change_id']
-            if prev_change_id not in self.mapping:
-                return None
+        Returns:
+            True if the MR must be updated (always True with force_sync)
+        """
+        return (self.force_sync or
+                mr_info.get('title') != truncate_mr_title(commit['subject']) or
+                mr_info.get('target_branch') != commit['target_branch'])
 
-            mr_iid = self.mapping[change_id]['mr_iid']
-            prev_mr_iid = self.mapping[prev_change_id]['mr_iid']
+    def _report_dependencies(self, chain: list[dict[str, Any]],
+                             results: dict[Any, Any]) -> None:
+        """Print the outcome of making each MR depend on the previous one."""
+        print('\nSetting MR dependencies...')
 
-            try:
-                self.client.set_mr_dependencies(mr_iid, [prev_mr_iid])
-                return ('success', mr_iid, prev_mr_iid, '')
-            except ValueError as e:
-                return ('not_available', 0, 0, str(e))
-            except Exception as e:  # pylint: disable=broad-exception-caught
-                return ('error', mr_iid, prev_mr_iid, str(e))
+        for i in range(1, len(chain)):
+            result = results.get(('dependency', i))
+            if result is None or _is_unfinished(result):
+                continue
+            if isinstance(result, tuple):
+                print(f"  + Set MR !{result[0]} to depend on !{result[1]}")
+            elif isinstance(result, ValueError):
+                # Feature not available on this instance - report once
+                print(f"  ! Skipping MR dependencies: {result}")
+                break
+            else:
+                mr_iid = self.mapping[chain[i]['change_id']]['mr_iid']
+                prev_mr_iid = self.mapping[chain[i - 1]['change_id']]['mr_iid']
+                print(f"  ! Failed to set dependency for "
+                      f"MR !{mr_iid} on !{prev_mr_iid}: {result}")
 
-        feature_not_available = False
-        with ThreadPoolExecutor(max_workers=min(len(chain), 4)) as executor:
-            futures = {
-                executor.submit(set_dependency, i, commit): (i, commit)
-                for i, commit in enumerate(chain)
-            }
+    def _sync_stack_links(self, chain: list[dict[str, Any]]) -> dict[str, Any]:
+        """
+        Update MR comments with stack chain links.
 
-            for future in as_completed(futures):
-                result = future.result()
-                if result is None:
-                    continue
-
-                status, mr_iid, prev_mr_iid, error = result
-                if status == 'success':
-                    print(f"  + Set MR !{mr_iid} to depend on !{prev_mr_iid}")
-                elif status == 'not_available':
-                    if not feature_not_available:
-                        feature_not_available = True
-                        print(f"  ! Skipping MR dependencies: {error}")
-                    break
-                else:
-                    print(f"  ! Failed to set dependency for "
-                          f"MR !{mr_iid} on !{prev_mr_iid}: {error}")
+        The mapping remembers the ID of each MR's stack links note and a hash
+        of its content. Notes whose content is unchanged are skipped, and
+        known notes are updated directly. An MR's notes are only listed when
+        its note ID is unknown or the known note no longer exists.
 
-    def _update_mr_stack_links(self, chain: list[dict[str, Any]]) -> None:
-        """Update MR comments with stack chain links."""
-        print('\nUpdating MR stack links...')
+        The mapping is only read; _record_stack_links() stores the result.
 
-        if self.dry_run:
-            for commit in chain:
-                change_id = commit['change_id']
-                if change_id not in self.mapping:
-                    continue
-                mr_iid = self.mapping[change_id]['mr_iid']
-                print(
-                    f"[DRY-RUN] Would update stack links comment for MR !{mr_iid}"
-                )
-            return
+        Args:
+            chain: The MR chain
 
-        def update_stack_link(
-                i: int, commit: dict[str, Any]) -> tuple[str, int, str] | None:
-            change_id = commit['change_id']
-            if change_id not in self.mapping:
-                return None
+        Returns:
+            Dict with the 'hashes' of all notes, the MR IIDs of the notes
+            that are 'up_to_date', and the per-Change-Id 'results' of
+            (status, MR IID, error, note ID) for the notes that were synced
+        """
+        descriptions = {
+            commit['change_id']: build_stack_chain_description(
+                chain, i, self.mapping)
+            for i, commit in enumerate(chain)
+            if commit['change_id'] in self.mapping
+        }
+        hashes = {
+            change_id: hashlib.sha256(description.encode()).hexdigest()
+            for change_id, description in descriptions.items()
+        }
+        outdated = [
+            change_id for change_id in descriptions
+            if self.force_sync or not self.mapping[change_id].get(
+                'stack_note_id') or self.mapping[change_id].get(
+                    'stack_note_hash') != hashes[change_id]
+        ]
+        links: dict[str, Any] = {
+            'hashes': hashes,
+            'up_to_date': [
+                self.mapping[change_id]['mr_iid']
+                for change_id in descriptions
+                if change_id not in outdated
+            ],
+            'results': {},
+        }
+        if not outdated:
+            return links
+
+        client = self.async_client
+        all_notes: dict[int, list[dict[str, Any]]] = {}
+
+        async def find_stack_note(mr_iid: int) -> int | None:
+            notes = all_notes.get(mr_iid)
+            if notes is None:
+                notes = await client.get_mr_notes(mr_iid)
+            for note in notes:
+                if STACK_NOTE_MARKER in note['body']:
+                    return int(note['id'])
+            return None
 
+        async def update_stack_link(
+                change_id: str) -> tuple[str, int, str, int | None]:
             mr_iid = self.mapping[change_id]['mr_iid']
-            stack_description = build_stack_chain_description(
-                chain, i, self.mapping)
+            description = descriptions[change_id]
+            note_id = self.mapping[change_id].get('stack_note_id')
 
             try:
-                existing_notes = self.client.get_mr_notes(mr_iid)
-                stack_note_id = None
-                for note in existing_notes:
-                    if '<!-- git-stack-chain -->' in note['body']:
-                        stack_note_id = note['id']
-                        break
-
-                if stack_note_id:
-                    self.client.update_mr_note(mr_iid, stack_note_id,
-                                               stack_description)
+                if note_id:
+                    try:
+                        await client.update_mr_note(mr_iid, note_id,
+                                                    description)
+                        return ('success', mr_iid, '', note_id)
+                    except NoteNotFoundError:
+                        # The note was deleted; recover by listing notes
+                        note_id = None
+
+                note_id = await find_stack_note(mr_iid)
+                if note_id:
+                    await client.update_mr_note(mr_iid, note_id, description)
                 else:
-                    self.client.add_mr_note(mr_iid, stack_description)
+                    note_id = await client.add_mr_note(mr_iid, description)
 
-                return ('success', mr_iid, '')
+                return ('success', mr_iid, '', note_id)
             except Exception as e:  # pylint: disable=broad-exception-caught
-                return ('error', mr_iid, str(e))
+                return ('error', mr_iid, str(e), None)
+
+        async def sync_notes() -> dict[str, Any]:
+            # Fetch the notes of MRs without a known stack note in one batch
+            all_notes.update(await client.get_notes_for([
+                self.mapping[change_id]['mr_iid']
+                for change_id in outdated
+                if not self.mapping[change_id].get('stack_note_id')
+            ]))
+            return await self.core.map(update_stack_link, outdated)
+
+        links['results'] = run_sync(sync_notes())
+        return links
+
+    def _record_stack_links(self, links: dict[str, Any]) -> None:
+        """Store the note IDs and hashes of the synced stack links notes."""
+        for change_id, (status, _, _, note_id) in links['results'].items():
+            if status == 'success':
+                # Without a note ID the next push looks the note up again
+                self.mapping[change_id] = {
+                    **self.mapping[change_id],
+                    'stack_note_id': note_id,
+                    'stack_note_hash':
+                        links['hashes'][change_id] if note_id else None,
+                }
 
-        with ThreadPoolExecutor(max_workers=min(len(chain), 4)) as executor:
-            futures = {
-                executor.submit(update_stack_link, i, commit): (i, commit)
-                for i, commit in enumerate(chain)
-            }
+    @staticmethod
+    def _report_stack_links(links: dict[str, Any] | Exception) -> None:
+        """Print the outcome of syncing the stack links notes."""
+        print('\nUpdating MR stack links...')
 
-            for future in as_completed(futures):
-                result = future.result()
-                if result is None:
-                    continue
+        if _is_unfinished(links):
+            return
+        if isinstance(links, Exception):
+            print(f"  ! Failed to update stack links: {links}")
+            return
 
-                status, mr_iid, error = result
-                if status == 'success':
-                    print(f"  + Updated stack links comment for MR !{mr_iid}")
-                else:
-                    print(
-                        f"  ! Failed to update stack links for MR !{mr_iid}: {error}"
-                    )
+        for mr_iid in links['up_to_date']:
+            print(f"  = Stack links comment for MR !{mr_iid} is up to date")
+        for status, mr_iid, error, _ in links['results'].values():
+            if status == 'success':
+                print(f"  + Updated stack links comment for MR !{mr_iid}")
+            else:
+                print(
+                    f"  ! Failed to update stack links for MR !{mr_iid}: {error}"
+                )
+
+    @staticmethod
+    def _report_unfinished(chain: list[dict[str, Any]],
+                           results: dict[Any, Any]) -> int:
+        """
+        Print the tasks of a push that did not finish before the deadline.
+
+        Args:
+            chain: The MR chain
+            results: Results of the push's task graph
+
+        Returns:
+            Number of unfinished operations
+        """
+        unfinished = []
+        for key, result in results.items():
+            if key == 'mrs' or not _is_unfinished(result):
+                continue
+            if key == 'links':
+                unfinished.append('update stack links comments')
+            elif key[0] == 'mr':
+                unfinished.append(
+                    f"create/update MR for {chain[key[1]]['subject']}")
+            elif key[0] == 'dependency':
+                unfinished.append(
+                    f"set dependency of {chain[key[1]]['subject']}")
+        if unfinished:
+            print('\nDeadline exceeded, not finished:')
+            for operation in unfinished:
+                print(f"  ! {operation}")
+        return len(unfinished)
 
     def _get_project_id(self) -> str:
         """Get the GitLab project ID from git remote."""
-        try:
-            remote_url = self._run_git_command(['remote', 'get-url', 'origin'])
+        remote_url = self.repo.remote_url('origin')
+        if remote_url:
             match = re.search(r'[:/]([^/]+/[^/]+?)(?:\.git)?$', remote_url)
             if match:
                 return match.group(1)
-        except subprocess.CalledProcessError:
-            pass
         return 'unknown'
 
     # pylint: disable=too-many-locals,too-many-branches,too-many-statements
@@ -1036,7 +1763,7 @@ class GitStackPush:
             print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
 
-        chain = build_mr_chain(commits, base_branch)
+        chain = build_mr_chain(commits, base_branch, self.repo)
 
         if self.dry_run:
             print('\n' + '=' * 60)
@@ -1057,50 +1784,43 @@ class GitStackPush:
             print('\n' + '=' * 60)
             return {'commits': commits, 'chain': chain}
 
-        self._create_or_update_branches(chain)
-        self._create_or_update_mrs(chain)
-        self._set_mr_dependencies(chain)
-        self._update_mr_stack_links(chain)
+        self._process_chain(chain)
 
         print('\n+ Stack processing complete!')
         return None
 
     def clean(self) -> None:
-        """Remove stale branches and entries from mapping file."""
+        """
+        Remove stale branches and entries from mapping file.
+
+        Local stack branches are read from one for-each-ref snapshot and
+        open MRs are looked up in one batch. MR states come from the local
+        MR mirror, refreshed with one incremental listing (used as it is in
+        dry-run mode), with a bulk request for MRs it doesn't know. Stale
+        branches are deleted with one push and one local ref transaction.
+        """
+        local_branches = self._snapshot_stack_branches()
+
         # First, clean up stale local branches not in the mapping
-        stale_branches = self._find_stale_branches()
+        stale_branches = self._find_stale_branches(local_branches)
 
         if stale_branches:
             print(f"\nFound {len(stale_branches)} stale branch(es)...")
-            deleted_local = 0
-            deleted_remote = 0
-
-            for branch in stale_branches:
-                if self.dry_run:
+            if self.dry_run:
+                for branch in stale_branches:
                     print(f"  [DRY-RUN] Would delete branch {branch}")
-                else:
-                    # Delete local branch
-                    try:
-                        self._run_git_command(['branch', '-D', branch],
-                                              check=False)
-                        deleted_local += 1
-                    except subprocess.CalledProcessError:
-                        pass
-
-                    # Delete remote branch
-                    try:
-                        self._run_git_command(
-                            ['push', 'origin', '--delete', branch],
-                            check=False)
-                        deleted_remote += 1
-                    except subprocess.CalledProcessError:
-                        pass
-
-                    print(f"  Deleted branch {branch}")
-
-            if not self.dry_run and (deleted_local > 0 or deleted_remote > 0):
-                print(f"\n+ Deleted {deleted_local} local and "
-                      f"{deleted_remote} remote stale branch(es)")
+            else:
+                deleted_remote = self._delete_remote_branches(
+                    list(stale_branches), stale_branches)
+                deleted_local = self._delete_local_branches(
+                    list(stale_branches))
+                for branch in stale_branches:
+                    if branch in deleted_local or branch in deleted_remote:
+                        print(f"  Deleted branch {branch}")
+
+                if deleted_local or deleted_remote:
+                    print(f"\n+ Deleted {len(deleted_local)} local and "
+                          f"{len(deleted_remote)} remote stale branch(es)")
         else:
             print('\nNo stale branches found')
 
@@ -1115,19 +1835,22 @@ class GitStackPush:
         orphaned_count = 0
         to_remove = []
 
+        branch_names = {
+            change_id: self.mapping.branch_name(change_id)
+            for change_id in self.mapping
+        }
+
+        # Look up the states of all MRs whose branch still exists at once
+        states = self._get_mr_states(
+            mr_info['mr_iid'] for change_id, mr_info in self.mapping.items()
+            if branch_names[change_id] in local_branches)
+
         for change_id, mr_info in self.mapping.items():
             mr_iid = mr_info['mr_iid']
-            branch_name = get_branch_name(change_id)
+            branch_name = branch_names[change_id]
 
             # Check if branch exists locally
-            try:
-                self._run_git_command(['rev-parse', '--verify', branch_name],
-                                      check=True)
-                branch_exists = True
-            except subprocess.CalledProcessError:
-                branch_exists = False
-
-            if not branch_exists:
+            if branch_name not in local_branches:
                 print(
                     f"  MR !{mr_iid} branch '{branch_name}' not found locally, "
                     'removing from mapping')
@@ -1135,20 +1858,14 @@ class GitStackPush:
                 orphaned_count += 1
                 continue
 
-            try:
-                state = self.client.get_mr_state(mr_iid)
-
-                if state in ['closed', 'merged']:
-                    print(f"  MR !{mr_iid} is {state}, removing from mapping")
-                    to_remove.append(change_id)
-                    closed_count += 1
-                elif state:
-                    print(f"  MR !{mr_iid} is {state}, keeping in mapping")
-                else:
-                    print(
-                        f"  Warning: Could not determine state for MR !{mr_iid}, "
-                        'keeping in mapping')
-            except (subprocess.CalledProcessError, ValueError):
+            state = states.get(mr_iid)
+            if state in ['closed', 'merged']:
+                print(f"  MR !{mr_iid} is {state}, removing from mapping")
+                to_remove.append(change_id)
+                closed_count += 1
+            elif state:
+                print(f"  MR !{mr_iid} is {state}, keeping in mapping")
+            else:
                 print(
                     f"  Warning: Could not check MR !{mr_iid}, keeping in mapping"
                 )
@@ -1158,7 +1875,7 @@ class GitStackPush:
 
         total_removed = closed_count + orphaned_count
         if total_removed > 0:
-            save_mapping(self.mapping_path, self.mapping)
+            self.mapping.save()
             parts = []
             if closed_count > 0:
                 parts.append(f"{closed_count} closed/merged")
@@ -1168,85 +1885,250 @@ class GitStackPush:
         else:
             print('\n+ No closed or orphaned MRs found')
 
-    def _find_stale_branches(self) -> list[str]:
+    def _get_mr_states(self, mr_iids: Iterable[int]) -> dict[int, str]:
         """
-        Find local stack branches that are not in the mapping and have no open MR.
+        Get MR states from the synced mirror, fetching the ones it lacks.
+
+        If the mirror could not be refreshed, every state is fetched: an MR
+        merged or closed since the last sync would otherwise still look
+        open. In dry-run mode the mirror is used as it is.
+
+        Args:
+            mr_iids: MR IIDs
 
         Returns:
-            List of stale branch names safe to delete
+            Mapping of MR IID to state; unknown MRs are omitted
+        """
+        mr_iids = list(mr_iids)
+        mirror = self._synced_mirror()
+        if not self._mirror_synced and not self.dry_run:
+            return self.client.get_mr_states(mr_iids)
+        states = mirror.states(mr_iids)
+        missing = [mr_iid for mr_iid in mr_iids if mr_iid not in states]
+        if missing:
+            states.update(self.client.get_mr_states(missing))
+        return states
+
+    def sync(self, full: bool = False) -> None:
+        """
+        Refresh the local MR mirror.
+
+        Args:
+            full: If True, list every MR instead of only those updated since
+                the last sync
+        """
+        mirror = MrMirror.load(self.mirror_path)
+        incremental = mirror.synced_at is not None and not full
+        changed = mirror.sync(self.client, full)
+
+        open_count = sum(mr['state'] == 'opened' for mr in mirror.mrs.values())
+        kind = 'updated' if incremental else 'all'
+        print(f"+ Synced {kind} MRs: {changed} changed, {len(mirror.mrs)} "
+              f"known ({open_count} open)")
+
+    def adopt(self) -> None:
+        """
+        Rebuild the mapping from the user's open MRs.
+
+        Recovers a lost or stale mapping, e.g. in a new clone or worktree.
+        The user's MRs are listed once (see sync()) and matched against the
+        local and remote stack branches, read with one for-each-ref and one
+        ls-remote. Adopted entries record each MR's current title and target
+        branch, so the next push only updates the MRs that changed.
+
+        Raises:
+            GitStackError: If the user's MRs could not be listed
+        """
+        index = self.open_mr_index
+        if index is None:
+            raise GitStackError(
+                "Could not list your MRs; run 'git-stack sync' to retry")
+
+        # Remote shas win: they are what the MRs show
+        prefix = f"{get_git_username(self.repo)}/stack-"
+        branches = self._snapshot_stack_branches()
+        output = self._run_git_command(
+            ['ls-remote', '--heads', 'origin', f"refs/heads/{prefix}*"],
+            check=False)
+        for line in output.splitlines():
+            sha, _, ref = line.partition('\t')
+            branches[ref.removeprefix('refs/heads/')] = sha
+
+        print(f"Matching {len(index)} open MR(s) against {len(branches)} "
+              'stack branch(es)...')
+
+        project_id = self._get_project_id()
+        adopted = refreshed = unchanged = 0
+        for branch, sha in sorted(branches.items()):
+            remote_mr = index.get(branch)
+            change_id = branch.removeprefix(prefix)
+            if remote_mr is None or not extract_stack_name(change_id):
+                continue
+
+            existing_mr = self.mapping.get(change_id, {})
+            same_mr = existing_mr.get('mr_iid') == remote_mr['mr_iid']
+            mr_info = {
+                # Keep the stack links note of the same MR
+                **(existing_mr if same_mr else {}),
+                'mr_iid': remote_mr['mr_iid'],
+                'mr_url': remote_mr['mr_url'],
+                'title': remote_mr['title'],
+                'target_branch': remote_mr['target_branch'],
+                'sha': sha,
+                'project_id': project_id,
+            }
+            if mr_info == existing_mr:
+                unchanged += 1
+                continue
+
+            if self.dry_run:
+                print(f"  [DRY-RUN] Would adopt MR !{remote_mr['mr_iid']} for "
+                      f"{change_id}")
+            elif same_mr:
+                print(f"  ~ Refreshed MR !{remote_mr['mr_iid']}: "
+                      f"{remote_mr['title']}")
+            else:
+                print(f"  + Adopted MR !{remote_mr['mr_iid']}: "
+                      f"{remote_mr['title']}")
+            if same_mr:
+                refreshed += 1
+            else:
+                adopted += 1
+            if not self.dry_run:
+                self.mapping[change_id] = mr_info
+
+        if (adopted or refreshed) and not self.dry_run:
+            self.mapping.save()
+        print(f"\n+ Adopted {adopted} MR(s), refreshed {refreshed}, "
+              f"{unchanged} already up to date")
+
+    def _snapshot_stack_branches(self) -> dict[str, str]:
         """
-        user_name = get_git_username()
-        prefix = f"{user_name}/stack-"
+        Read all local stack branches of the current user with one for-each-ref.
 
-        # Get all local branches matching the stack pattern
+        Returns:
+            Dictionary of branch name -> sha
+        """
+        user_name = get_git_username(self.repo)
         try:
             output = self._run_git_command([
-                'branch', '--list', f'{prefix}*', '--format=%(refname:short)'
+                'for-each-ref', '--format=%(objectname) %(refname:short)',
+                f"refs/heads/{user_name}/stack-*"
             ])
         except subprocess.CalledProcessError:
-            return []
+            return {}
 
-        if not output:
-            return []
+        branches = {}
+        for line in output.splitlines():
+            sha, _, branch = line.partition(' ')
+            branches[branch] = sha
+        return branches
 
-        local_branches = set(output.strip().split('\n'))
+    def _find_stale_branches(
+            self, local_branches: dict[str, str]) -> dict[str, str | None]:
+        """
+        Find local stack branches that are not in the mapping and have no open MR.
 
-        # Get branches that are in the mapping
-        mapped_branches = {
-            get_branch_name(change_id)
-            for change_id in self.mapping
-        }
+        Args:
+            local_branches: Snapshot of the local stack branches
 
+        Returns:
+            Dictionary of the stale branch names safe to delete, sorted, to
+            their sha on origin (None if they don't exist there)
+        """
         # Find candidate stale branches (in local but not in mapping)
-        candidates = local_branches - mapped_branches
+        candidates = [
+            branch for branch in local_branches
+            if self.mapping.find_by_branch(branch) is None
+        ]
 
         if not candidates:
-            return []
+            return {}
+
+        try:
+            remote = self._snapshot_remote_branches(candidates)
+        except subprocess.CalledProcessError:
+            print('  Warning: Could not list remote branches, '
+                  'skipping stale branch cleanup')
+            return {}
 
         # Filter out branches that have open MRs on remote
         # This prevents accidentally orphaning MRs not in our mapping
-        stale = []
-        for branch in candidates:
-            if self._branch_has_open_mr(branch):
+        open_mr_branches = self._find_branches_with_open_mrs(remote)
+        stale = {}
+        for branch in sorted(candidates):
+            if branch in open_mr_branches:
                 print(f"  Skipping {branch} - has open MR on remote")
             else:
-                stale.append(branch)
+                stale[branch] = remote[branch]
 
-        return sorted(stale)
+        return stale
 
-    def _branch_has_open_mr(self, branch: str) -> bool:
+    def _find_branches_with_open_mrs(
+            self, remote: dict[str, str | None]) -> set[str]:
         """
-        Check if a branch has an open MR on the remote.
+        Find which branches may have an open MR on the remote.
+
+        Branches that don't exist on the remote can't have an MR. The
+        remaining branches are looked up by source branch in one batch. If a
+        lookup fails, the branch is conservatively assumed to have an MR.
 
         Args:
-            branch: Branch name to check
+            remote: Dictionary of branch -> remote sha, None for missing
+                branches
 
         Returns:
-            True if there's an open MR for this branch
+            Names of the branches that have (or might have) an open MR
         """
+        existing = [branch for branch, sha in remote.items() if sha]
         try:
-            # Use glab to check for open MRs with this source branch
-            output = self._run_git_command(['ls-remote', 'origin', branch],
-                                           check=False)
-            # If branch doesn't exist on remote, no MR possible
-            if not output:
-                return False
-
-            # Check via GitLab API if there's an open MR
-            # Extract stack name from branch to search
-            if '@' in branch:
-                parts = branch.split('@')
-                if len(parts) >= 2:
-                    stack_name = parts[1]
-                    mrs = self.client.find_mrs_by_stack_name(stack_name)
-                    for mr in mrs:
-                        if mr['source_branch'] == branch and mr[
-                                'state'] == 'opened':
-                            return True
-            return False
-        except (subprocess.CalledProcessError, ValueError):
-            # If we can't check, be conservative and assume there might be an MR
-            return True
+            open_mrs = self.client.find_open_mrs_by_source_branches(existing)
+        except (subprocess.CalledProcessError, HostingError, ValueError):
+            open_mrs = {}
+
+        # Branches whose lookup failed are omitted and kept
+        return {
+            branch for branch in existing
+            if branch not in open_mrs or open_mrs[branch] is not None
+        }
+
+    def _delete_remote_branches(
+            self,
+            branches: list[str],
+            remote: dict[str, str | None] | None = None) -> set[str]:
+        """
+        Delete branches on origin with one push.
+
+        A push that names a missing ref is rejected as a whole, so branches
+        that don't exist on origin are left out.
+
+        Args:
+            branches: Branch names to delete
+            remote: Snapshot of the remote branches, taken if not given
+
+        Returns:
+            Names of the branches that were deleted on the remote
+        """
+        if remote is None:
+            try:
+                remote = self._snapshot_remote_branches(branches)
+            except subprocess.CalledProcessError:
+                return set()
+        existing = [branch for branch in branches if remote.get(branch)]
+        if not existing:
+            return set()
+
+        # Refs are deleted independently, so parse which ones succeeded
+        output = self._run_git_command(
+            ['push', '--porcelain', 'origin', '--delete'] + existing,
+            check=False)
+        deleted = set()
+        for line in output.splitlines():
+            flag, _, rest = line.partition('\t')
+            ref = rest.partition('\t')[0].partition(':')[2]
+            if flag == '-' and ref.startswith('refs/heads/'):
+                deleted.add(ref.removeprefix('refs/heads/'))
+        return deleted
 
     def reindex(self, base_branch: str) -> None:
         """Remove all Change-Ids, close old MRs, and create new Change-Ids."""
@@ -1261,28 +2143,36 @@ class GitStackPush:
         print(f"\nFound {len(commits)} commit(s) to reindex")
 
         # Close existing MRs
+        to_close = {
+            commit['change_id']: self.mapping[commit['change_id']]['mr_iid']
+            for commit in commits
+            if commit['change_id'] and commit['change_id'] in self.mapping
+        }
+
         closed_count = 0
-        for commit in commits:
-            if commit['change_id']:
-                existing_mr = self.mapping.get(commit['change_id'])
-                if existing_mr:
-                    mr_iid = existing_mr['mr_iid']
-
-                    if self.dry_run:
-                        print(f"[DRY-RUN] Would close MR !{mr_iid} for "
-                              f"Change-Id {commit['change_id']}")
-                    else:
-                        try:
-                            self.client.close_mr(mr_iid)
-                            print(f"  Closed MR !{mr_iid} for "
-                                  f"Change-Id {commit['change_id']}")
-                            del self.mapping[commit['change_id']]
-                            closed_count += 1
-                        except (subprocess.CalledProcessError, ValueError):
-                            print(f"  Warning: Could not close MR !{mr_iid}")
+        if self.dry_run:
+            for change_id, mr_iid in to_close.items():
+                print(f"[DRY-RUN] Would close MR !{mr_iid} for "
+                      f"Change-Id {change_id} and delete branch "
+                      f"{self.mapping.branch_name(change_id)}")
+        else:
+            results = run_sync(self.async_client.close_mrs(to_close.values()))
+            closed_branches = []
+            for change_id, mr_iid in to_close.items():
+                if results.get(mr_iid) is None:
+                    print(f"  Closed MR !{mr_iid} for Change-Id {change_id}")
+                    closed_branches.append(self.mapping.branch_name(change_id))
+                    del self.mapping[change_id]
+                    closed_count += 1
+                else:
+                    print(f"  Warning: Could not close MR !{mr_iid}")
+
+            # The branches of closed MRs are not reused by the new Change-Ids
+            if closed_branches:
+                self._delete_branches(closed_branches)
 
         if closed_count > 0 and not self.dry_run:
-            save_mapping(self.mapping_path, self.mapping)
+            self.mapping.save()
             print(f"\n+ Closed {closed_count} MR(s)")
 
         # Remove Change-Ids from all commits
@@ -1315,25 +2205,26 @@ class GitStackPush:
             print('No stacks found (mapping file is empty)')
             return
 
-        stacks: dict[str, list[dict[str, Any]]] = {}
-        for change_id, mr_info in self.mapping.items():
-            stack_name = extract_stack_name(change_id) or 'unknown'
-
-            if stack_name not in stacks:
-                stacks[stack_name] = []
+        stacks = {
+            stack_name: self.mapping.stack(stack_name)
+            for stack_name in self.mapping.stack_names()
+        }
+        unnamed = self.mapping.stack(None)
+        if unnamed:
+            stacks['unknown'] = sorted(stacks.get('unknown', []) + unnamed,
+                                       key=lambda x: x[0])
 
-            position = extract_position(change_id) or 0
+        states = self.mirror.states(mr_info['mr_iid']
+                                    for _, mr_info in self.mapping.items())
 
-            stacks[stack_name].append({
+        for stack_name in sorted(stacks.keys()):
+            items = [{
                 'change_id': change_id,
                 'position': position,
                 'mr_iid': mr_info['mr_iid'],
                 'mr_url': mr_info['mr_url'],
-                'branch': get_branch_name(change_id),
-            })
-
-        for stack_name in sorted(stacks.keys()):
-            items = sorted(stacks[stack_name], key=lambda x: x['position'])
+                'branch': self.mapping.branch_name(change_id),
+            } for position, change_id, mr_info in stacks[stack_name]]
 
             print(f"\nStack: {stack_name}")
             print(f"   Commits: {len(items)}")
@@ -1345,9 +2236,9 @@ class GitStackPush:
 
             print('\n   MRs in stack:')
             for item in items:
-                print(
-                    f"     {item['position']}. !{item['mr_iid']} - {item['branch']}"
-                )
+                state = states.get(item['mr_iid'])
+                print(f"     {item['position']}. !{item['mr_iid']} - "
+                      f"{item['branch']}" + (f" ({state})" if state else ''))
 
         print(f"\n+ Found {len(stacks)} stack(s)")
 
@@ -1357,30 +2248,16 @@ class GitStackPush:
             print('No stacks found (mapping file is empty)')
             return
 
-        stack_items: list[dict[str, Any]] = []
-        for change_id, _ in self.mapping.items():
-            current_stack_name = extract_stack_name(change_id)
-            if current_stack_name == stack_name:
-                position = extract_position(change_id) or 0
-                stack_items.append({
-                    'change_id': change_id,
-                    'position': position,
-                    'branch': get_branch_name(change_id),
-                })
+        stack_items = [{
+            'change_id': change_id,
+            'position': position,
+            'branch': self.mapping.branch_name(change_id),
+        } for position, change_id, _ in self.mapping.stack(stack_name)]
 
         if not stack_items:
-            print(f"Error: Stack '{stack_name}' not found")
-            print('\nAvailable stacks:')
-            available_stacks: set[str] = set()
-            for cid in self.mapping:
-                sn = extract_stack_name(cid)
-                if sn:
-                    available_stacks.add(sn)
-            for sn in sorted(available_stacks):
-                print(f"  - {sn}")
+            self._print_stack_not_found(stack_name)
             return
 
-        stack_items.sort(key=lambda x: x['position'])
         last_item = stack_items[-1]
 
         print(f"\nChecking out latest branch from stack '{stack_name}'...")
@@ -1411,65 +2288,44 @@ class GitStackPush:
             print('No stacks found (mapping file is empty)')
             return
 
-        stack_items: list[dict[str, Any]] = []
-        for change_id, mr_info in self.mapping.items():
-            current_stack_name = extract_stack_name(change_id)
-            if current_stack_name == stack_name:
-                position = extract_position(change_id) or 0
-                stack_items.append({
-                    'change_id': change_id,
-                    'position': position,
-                    'branch': get_branch_name(change_id),
-                    'mr_iid': mr_info['mr_iid'],
-                })
+        stack_items = [{
+            'change_id': change_id,
+            'position': position,
+            'branch': self.mapping.branch_name(change_id),
+            'mr_iid': mr_info['mr_iid'],
+        } for position, change_id, mr_info in self.mapping.stack(stack_name)]
 
         if not stack_items:
-            print(f"Error: Stack '{stack_name}' not found")
-            print('\nAvailable stacks:')
-            available_stacks: set[str] = set()
-            for cid in self.mapping:
-                sn = extract_stack_name(cid)
-                if sn:
-                    available_stacks.add(sn)
-            for sn in sorted(available_stacks):
-                print(f"  - {sn}")
+            self._print_stack_not_found(stack_name)
             return
 
-        stack_items.sort(key=lambda x: x['position'])
-
         print(
             f"\nRemoving stack '{stack_name}' ({len(stack_items)} commits)...")
 
         # Close MRs
         closed_count = 0
-        for item in stack_items:
-            if self.dry_run:
+        if self.dry_run:
+            for item in stack_items:
                 print(f"[DRY-RUN] Would close MR !{item['mr_iid']}")
-            else:
-                try:
-                    self.client.close_mr(item['mr_iid'])
+        else:
+            results = run_sync(
+                self.async_client.close_mrs(item['mr_iid']
+                                            for item in stack_items))
+            for item in stack_items:
+                if results.get(item['mr_iid']) is None:
                     print(f"  Closed MR !{item['mr_iid']}")
                     closed_count += 1
-                except (subprocess.CalledProcessError, ValueError):
+                else:
                     print(f"  Warning: Could not close MR !{item['mr_iid']}")
 
         # Delete branches
         deleted_count = 0
-        for item in stack_items:
-            if self.dry_run:
+        if self.dry_run:
+            for item in stack_items:
                 print(f"[DRY-RUN] Would delete branch {item['branch']}")
-            else:
-                try:
-                    self._run_git_command(['branch', '-D', item['branch']],
-                                          check=False)
-                    self._run_git_command(
-                        ['push', 'origin', '--delete', item['branch']],
-                        check=False)
-                    print(f"  Deleted branch {item['branch']}")
-                    deleted_count += 1
-                except subprocess.CalledProcessError:
-                    print(
-                        f"  Warning: Could not delete branch {item['branch']}")
+        else:
+            deleted_count = self._delete_branches(
+                [item['branch'] for item in stack_items])
 
         # Remove from mapping
         if not self.dry_run:
@@ -1477,7 +2333,7 @@ class GitStackPush:
                 if item['change_id'] in self.mapping:
                     del self.mapping[item['change_id']]
 
-            save_mapping(self.mapping_path, self.mapping)
+            self.mapping.save()
             print(f"\n+ Removed stack '{stack_name}'")
             print(f"  Closed {closed_count} MR(s)")
             print(f"  Deleted {deleted_count} branch(es)")
@@ -1486,24 +2342,48 @@ class GitStackPush:
                 f"\n[DRY-RUN] Would remove {len(stack_items)} items from mapping"
             )
 
+    def _delete_branches(self, branches: list[str]) -> int:
+        """
+        Delete branches on origin with one push and locally in one transaction.
+
+        Args:
+            branches: Branch names to delete
+
+        Returns:
+            Number of branches deleted locally, remotely or both
+        """
+        deleted_remote = self._delete_remote_branches(branches)
+        deleted_local = self._delete_local_branches(branches)
+        deleted_count = 0
+        for branch in branches:
+            if branch in deleted_remote or branch in deleted_local:
+                print(f"  Deleted branch {branch}")
+                deleted_count += 1
+            else:
+                print(f"  Warning: Could not delete branch {branch}")
+        return deleted_count
+
+    def _print_stack_not_found(self, stack_name: str) -> None:
+        """Report an unknown stack name and list the available stacks."""
+        print(f"Error: Stack '{stack_name}' not found")
+        print('\nAvailable stacks:')
+        for sn in self.mapping.stack_names():
+            print(f"  - {sn}")
+
     def show(self) -> None:
         """Show information about the current commit's stack."""
         try:
-            current_sha = self._run_git_command(['rev-parse', 'HEAD']).strip()
-        except subprocess.CalledProcessError:
-            print('Error: Could not get current commit', file=sys.stderr)
-            return
+            head = self.objects.read_commits(['HEAD'])['HEAD']
+        except GitPlumbingError:
+            head = None
 
-        try:
-            commit_message = self._run_git_command(
-                ['log', '-1', '--format=%B', current_sha])
-            commit_subject = self._run_git_command(
-                ['log', '-1', '--format=%s', current_sha])
-        except subprocess.CalledProcessError:
-            print('Error: Could not get commit message', file=sys.stderr)
+        if head is None:
+            print('Error: Could not get current commit', file=sys.stderr)
             return
 
-        change_id = extract_change_id(commit_message)
+        current_sha = head.sha
+        commit_subject = head.subject
+        change_id = extract_change_id(head.message)
 
         if not change_id:
             print('\nCurrent commit has no Change-ID')
@@ -1530,26 +2410,24 @@ class GitStackPush:
             print('\nMerge Request')
             print(f"   MR: !{mr_info['mr_iid']}")
             print(f"   URL: {mr_info['mr_url']}")
-            print(f"   Branch: {get_branch_name(change_id)}")
+            state = self.mirror.states([mr_info['mr_iid']]).get(
+                mr_info['mr_iid'])
+            if state:
+                print(f"   State: {state}")
+            print(f"   Branch: {self.mapping.branch_name(change_id)}")
         else:
             print('\nNo MR found for this commit')
             print("   Run 'git-stack push' to create an MR")
 
         if stack_name and self.mapping:
-            stack_commits = []
-            for cid, mr_info in self.mapping.items():
-                sn = extract_stack_name(cid)
-                if sn == stack_name:
-                    pos = extract_position(cid) or 0
-                    stack_commits.append({
-                        'change_id': cid,
-                        'position': pos,
-                        'mr_iid': mr_info['mr_iid'],
-                        'is_current': cid == change_id,
-                    })
+            stack_commits = [{
+                'change_id': cid,
+                'position': pos,
+                'mr_iid': mr_info['mr_iid'],
+                'is_current': cid == change_id,
+            } for pos, cid, mr_info in self.mapping.stack(stack_name)]
 
             if len(stack_commits) > 1:
-                stack_commits.sort(key=lambda x: x['position'])
                 print(f"\nOther commits in '{stack_name}' stack:")
                 for sc in stack_commits:
                     if not sc['is_current']:
@@ -1575,41 +2453,49 @@ class GitStackPush:
         print(f"   Commits: {len(commits)}")
         print()
 
+        # Resolve all remote-tracking branches in one batch
+        remote_refs = {
+            commit['change_id']:
+            f"origin/{self.mapping.branch_name(commit['change_id'])}"
+            for commit in commits if commit['change_id'] in self.mapping
+        }
+        try:
+            remote_shas = self.objects.resolve_refs(remote_refs.values())
+        except GitPlumbingError:
+            remote_shas = {}
+        states = self.mirror.states(self.mapping[change_id]['mr_iid']
+                                    for change_id in remote_refs)
+
         for i, commit in enumerate(commits, 1):
             change_id = commit['change_id']
-            branch_name = get_branch_name(change_id)
 
             if change_id not in self.mapping:
                 status_icon = 'x'
                 status_text = 'No MR'
                 detail_text = None
             else:
-                try:
-                    remote_sha = self._run_git_command(
-                        ['rev-parse', f"origin/{branch_name}"],
-                        check=False).strip()
-
-                    if not remote_sha:
-                        status_icon = '!'
-                        status_text = 'Not pushed'
-                        detail_text = None
-                    elif remote_sha == commit['sha']:
-                        status_icon = '+'
-                        status_text = 'Up-to-date'
-                        detail_text = None
-                    else:
-                        status_icon = '!'
-                        status_text = 'Out of sync'
-                        detail_text = (
-                            f"Local: {commit['sha'][:8]}, Remote: {remote_sha[:8]}"
-                        )
-                except subprocess.CalledProcessError:
+                remote_sha = remote_shas.get(remote_refs[change_id])
+
+                if not remote_sha:
                     status_icon = '!'
                     status_text = 'Not pushed'
                     detail_text = None
+                elif remote_sha == commit['sha']:
+                    status_icon = '+'
+                    status_text = 'Up-to-date'
+                    detail_text = None
+                else:
+                    status_icon = '!'
+                    status_text = 'Out of sync'
+                    detail_text = (
+                        f"Local: {commit['sha'][:8]}, Remote: {remote_sha[:8]}")
 
-            mr_text = (f"!{self.mapping[change_id]['mr_iid']}"
-                       if change_id in self.mapping else 'no MR')
+            mr_text = 'no MR'
+            if change_id in self.mapping:
+                mr_iid = self.mapping[change_id]['mr_iid']
+                mr_text = f"!{mr_iid}"
+                if mr_iid in states:
+                    mr_text += f" ({states[mr_iid]})"
             print(f"  {status_icon} {i}. {commit['subject'][:60]}")
             print(
                 f"      SHA: {commit['sha'][:8]}  MR: {mr_text}  Status: {status_text}"
@@ -0,0 +1,126 @@
+"""
+Per-call timeouts and command deadlines.
+
+Every git and glab process and every REST request gets a timeout for its
+resource ('git' or 'api'), capped by the command's deadline if one was set
+(``git-stack --deadline SECONDS ...``). A call that would start after the
+deadline raises DeadlineExceededError instead, so a command stops within
+about the deadline even with calls in flight on many threads.
+
+Timeouts are configured in git config, e.g.::
+
+    git config git-stack.api-timeout 120
+    git config git-stack.git-timeout 0   # no timeout
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # plumbing runs its git processes through aio, which imports this module
+    from git_stack.plumbing import RepoContext
+
+# Default timeout in seconds per resource; None means no timeout
+DEFAULT_TIMEOUTS: dict[str, float | None] = {'git': 600.0, 'api': 60.0}
+
+
+class DeadlineExceededError(Exception):
+    """Raised when an operation can't finish before the command's deadline."""
+
+
+class Deadline:
+    """Point in time by which a command must finish."""
+
+    def __init__(self, seconds: float | None = None):
+        """
+        Initialize the deadline.
+
+        Args:
+            seconds: Time from now until the deadline, None for no deadline
+        """
+        self.seconds = seconds
+        self.expires_at = (None if seconds is None else time.monotonic() +
+                           seconds)
+
+    def remaining(self) -> float | None:
+        """Seconds left until the deadline (None without a deadline)."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() == 0.0
+
+    def cap(self, timeout: float | None) -> float | None:
+        """
+        Cap a call's timeout by the time left until the deadline.
+
+        Args:
+            timeout: The call's own timeout, None for no timeout
+
+        Returns:
+            The smaller of timeout and the remaining time, None if neither
+            applies
+
+        Raises:
+            DeadlineExceededError: If the deadline has already passed
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if remaining == 0.0:
+            raise DeadlineExceededError(
+                f"Deadline of {self.seconds:g}s exceeded")
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+# Deadline of the running command, shared by all of its threads
+_deadline = Deadline()
+
+
+def set_deadline(seconds: float | None) -> Deadline:
+    """
+    Set the deadline of the running command.
+
+    Args:
+        seconds: Time from now until the deadline, None to remove it
+
+    Returns:
+        The new deadline
+    """
+    global _deadline  # pylint: disable=global-statement
+    _deadline = Deadline(seconds)
+    return _deadline
+
+
+def get_deadline() -> Deadline:
+    """Get the deadline of the running command."""
+    return _deadline
+
+
+def read_timeouts(repo: RepoContext) -> dict[str, float | None]:
+    """
+    Read the per-resource timeouts from ``git-stack.<resource>-timeout``.
+
+    Args:
+        repo: Repository context to read the git config from
+
+    Returns:
+        Timeout in seconds per resource, None for no timeout. A value of 0
+        disables the timeout; invalid values fall back to the default.
+    """
+    timeouts = dict(DEFAULT_TIMEOUTS)
+    for resource in timeouts:
+        value = repo.get_config(f"git-stack.{resource}-timeout")
+        if not value:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        timeouts[resource] = seconds if seconds > 0 else None
+    return timeouts
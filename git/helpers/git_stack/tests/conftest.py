@@ -145,13 +145,18 @@ class GitStackTestFixture:
 
     def create_stack_instance(self,
                               dry_run: bool = False,
-                              stack_name: str | None = None) -> GitStackPush:
+                              stack_name: str | None = None,
+                              force_sync: bool = False,
+                              mirror_max_age: float | None = None
+                              ) -> GitStackPush:
         """Create a GitStackPush instance for testing."""
         return GitStackPush(
             dry_run=dry_run,
             mapping_path=self.mapping_file,
             stack_name=stack_name,
             client=self.mock_client,
+            force_sync=force_sync,
+            mirror_max_age=mirror_max_age,
         )
 
     def read_operations(self) -> list[dict[str, Any]]:
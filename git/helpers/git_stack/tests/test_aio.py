@@ -0,0 +1,146 @@
+"""Tests for the asyncio execution core."""
+
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from git_stack.aio import (
+    AsyncCore,
+    AsyncHostingClient,
+    kill_children,
+    run_process_blocking,
+    run_sync,
+)
+from git_stack.hosting_client import MockGitHostingClient
+from git_stack.timeouts import DeadlineExceededError, set_deadline
+
+SLEEP = [sys.executable, '-c', 'import time; time.sleep(5)']
+
+
+class TestAsyncCore:
+    """Test process spawning, limits and the sync bridge."""
+
+    def test_limits_concurrent_processes(self) -> None:
+        """Test that a resource semaphore bounds the running processes."""
+        core = AsyncCore({'sleep': 2})
+        argv = [sys.executable, '-c', 'import time; time.sleep(0.2)']
+
+        async def run_all() -> float:
+            start = time.monotonic()
+            await asyncio.gather(
+                *(core.run_process(argv, 'sleep') for _ in range(4)))
+            return time.monotonic() - start
+
+        # Two batches of two processes
+        assert run_sync(run_all()) >= 0.4
+
+    def test_cancel_kills_process(self, tmp_path: Path) -> None:
+        """Test that cancelling a run kills the child process."""
+        core = AsyncCore()
+        marker = tmp_path / 'finished'
+        argv = [
+            sys.executable, '-c', 'import sys, time; time.sleep(1); '
+            'open(sys.argv[1], "w").close()',
+            str(marker)
+        ]
+
+        async def cancel() -> None:
+            task = asyncio.create_task(core.run_process(argv))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        run_sync(cancel())
+        time.sleep(1.5)
+        assert not marker.exists()
+
+    def test_run_git_and_bridge(self) -> None:
+        """Test git commands and processes spawned from blocking calls."""
+        core = AsyncCore()
+
+        def blocking() -> str:
+            return run_process_blocking(['git', 'version'], 'git').stdout
+
+        async def run_all() -> tuple[str, str]:
+            return await asyncio.gather(core.run_git(['version']),
+                                        core.call('api', blocking))
+
+        direct, bridged = run_sync(run_all())
+        assert direct.startswith('git version')
+        assert bridged.startswith('git version')
+        with pytest.raises(subprocess.CalledProcessError):
+            run_sync(core.run_git(['no-such-command']))
+
+
+class TestTimeouts:
+    """Test per-call timeouts, deadlines and killing children."""
+
+    def test_timeout_kills_process(self) -> None:
+        """Test that both process paths kill a process that hangs."""
+        start = time.monotonic()
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_process_blocking(SLEEP, timeout=0.2)
+        with pytest.raises(subprocess.TimeoutExpired):
+            run_sync(AsyncCore().run_process(SLEEP, timeout=0.2))
+        assert time.monotonic() - start < 2
+
+    def test_deadline_caps_timeouts(self) -> None:
+        """Test that the deadline cuts calls short and stops new ones."""
+        set_deadline(0.2)
+        try:
+            start = time.monotonic()
+            with pytest.raises(DeadlineExceededError):
+                run_process_blocking(SLEEP, timeout=60)
+            assert time.monotonic() - start < 2
+            with pytest.raises(DeadlineExceededError):
+                run_process_blocking(['git', 'version'])
+        finally:
+            set_deadline(None)
+
+    def test_kill_children(self) -> None:
+        """Test that processes running in worker threads can be killed."""
+        results: list[subprocess.CompletedProcess[str]] = []
+        thread = threading.Thread(
+            target=lambda: results.append(run_process_blocking(SLEEP)))
+        thread.start()
+
+        start = time.monotonic()
+        while not kill_children():
+            assert time.monotonic() - start < 5
+            time.sleep(0.01)
+        thread.join(timeout=5)
+
+        assert results[0].returncode != 0
+        assert time.monotonic() - start < 2
+
+
+class TestAsyncHostingClient:
+    """Test the async variant of the hosting client."""
+
+    def test_batch_calls(self, tmp_path: Path) -> None:
+        """Test concurrent batch calls with per-item results."""
+        client = MockGitHostingClient(tmp_path / 'operations.json',
+                                      tmp_path / 'mock_mr_db.json')
+        async_client = AsyncHostingClient(client, AsyncCore())
+        iids = [
+            run_sync(
+                async_client.create_mr(f"user/stack-{i}@feat@{i}", 'main',
+                                       f"MR {i}", ''))['mr_iid']
+            for i in range(1, 4)
+        ]
+
+        results = run_sync(async_client.close_mrs(iids + [42]))
+
+        assert all(results[iid] is None for iid in iids)
+        assert isinstance(results[42], Exception)
+        assert client.get_mr_states(iids) == dict.fromkeys(iids, 'closed')
+        notes = run_sync(async_client.get_notes_for(iids))
+        assert notes == dict.fromkeys(iids, [])
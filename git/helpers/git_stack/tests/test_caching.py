@@ -0,0 +1,133 @@
+"""Tests for per-command memoization of hosting reads."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from git_stack.caching import CachingHostingClient
+from git_stack.hosting_client import (
+    GitLabClient,
+    HostingError,
+    MockGitHostingClient,
+)
+
+
+class SlowMockClient(MockGitHostingClient):
+    """Mock client whose state lookups block until released."""
+
+    def __init__(self, tmp_path: Path):
+        super().__init__(tmp_path / 'operations.json', tmp_path / 'mrs.json')
+        self.release = threading.Event()
+        self.calls = 0
+        self.fail = False
+
+    def get_mr_state(self, mr_iid: int) -> str:
+        self.calls += 1
+        assert self.release.wait(timeout=5)
+        if self.fail:
+            raise ValueError('lookup failed')
+        return super().get_mr_state(mr_iid)
+
+
+def create_mr(client: MockGitHostingClient, branch: str) -> int:
+    """Create a mock MR and return its IID."""
+    return client.create_mr(branch, 'main', f"Title of {branch}",
+                            '')['mr_iid']
+
+
+class TestCachingHostingClient:
+    """Test single-flight, memoization and invalidation."""
+
+    def test_reads_are_memoized_until_a_write(self, tmp_path: Path) -> None:
+        """Test that repeated reads are served from the memo."""
+        mock = SlowMockClient(tmp_path)
+        mock.release.set()
+        mr_iid = create_mr(mock, 'user/stack-a@feat@1')
+        client = CachingHostingClient(mock)
+
+        assert client.get_mr_state(mr_iid) == 'opened'
+        assert client.get_mr_states([mr_iid]) == {mr_iid: 'opened'}
+        assert mock.calls == 1
+
+        client.close_mr(mr_iid)
+        assert client.get_mr_state(mr_iid) == 'closed'
+        assert mock.calls == 2
+
+    def test_concurrent_reads_share_one_call(self, tmp_path: Path) -> None:
+        """Test that identical reads in flight are coalesced."""
+        mock = SlowMockClient(tmp_path)
+        mr_iid = create_mr(mock, 'user/stack-a@feat@1')
+        client = CachingHostingClient(mock)
+
+        results: list[str] = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(client.get_mr_state(mr_iid)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        while mock.calls == 0:
+            time.sleep(0.01)
+        mock.release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == ['opened'] * 4
+        assert mock.calls == 1
+
+    def test_failures_are_not_memoized(self, tmp_path: Path) -> None:
+        """Test that a failed read is tried again by the next caller."""
+        mock = SlowMockClient(tmp_path)
+        mock.release.set()
+        mr_iid = create_mr(mock, 'user/stack-a@feat@1')
+        client = CachingHostingClient(mock)
+
+        mock.fail = True
+        with pytest.raises(ValueError):
+            client.get_mr_state(mr_iid)
+        mock.fail = False
+        assert client.get_mr_state(mr_iid) == 'opened'
+        assert mock.calls == 2
+
+    def test_failed_note_listings_are_not_memoized(self) -> None:
+        """Test that a failed note listing is not remembered as no notes."""
+        notes = json.dumps([{'id': 7, 'body': 'Stack links'}])
+        failure = subprocess.CalledProcessError(1, ['glab'], '', 'HTTP 500')
+        client = CachingHostingClient(GitLabClient())
+
+        with patch.object(client.client,
+                          '_run_glab_command',
+                          side_effect=[failure, failure, notes]) as glab:
+            assert client.get_notes_for([1]) == {}
+            with pytest.raises(HostingError):
+                client.get_mr_notes(1)
+            assert client.get_mr_notes(1) == [{'id': 7, 'body': 'Stack links'}]
+            assert client.get_notes_for([1]) == {1: client.get_mr_notes(1)}
+        assert glab.call_count == 3
+
+    def test_listings_are_invalidated_by_updates(self,
+                                                 tmp_path: Path) -> None:
+        """Test that an MR update drops the memoized branch lookups."""
+        mock = SlowMockClient(tmp_path)
+        client = CachingHostingClient(mock)
+
+        assert client.find_open_mrs_by_source_branches(
+            ['user/stack-a@feat@1']) == {
+                'user/stack-a@feat@1': None
+            }
+        mr_iid = create_mr(client, 'user/stack-a@feat@1')
+
+        found = client.find_mr_by_source_branch('user/stack-a@feat@1')
+        assert found is not None and found['mr_iid'] == mr_iid
+        # Callers get copies they may change
+        found['mr_iid'] = 0
+        found = client.find_mr_by_source_branch('user/stack-a@feat@1')
+        assert found is not None and found['mr_iid'] == mr_iid
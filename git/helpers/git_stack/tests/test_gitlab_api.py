@@ -0,0 +1,504 @@
+"""Tests for the native GitLab REST client against a local stand-in server."""
+# pylint: disable=too-few-public-methods
+
+from __future__ import annotations
+
+import hashlib
+import json
+import subprocess
+import threading
+import time
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pytest
+
+from git_stack.gitlab_api import (
+    GitLabApiClient,
+    GitLabApiError,
+    read_glab_token,
+)
+from git_stack.hosting_client import HostingError, NoteNotFoundError
+from git_stack.http_cache import HttpCache
+from git_stack.plumbing import RepoContext, parse_remote_url
+
+PROJECT = 'group/sub/project'
+API_PREFIX = '/api/v4/projects/group%2Fsub%2Fproject'
+
+
+class FakeGitLab:
+    """In-memory stand-in for the parts of the GitLab API git-stack uses."""
+
+    def __init__(self) -> None:
+        self.mrs: dict[int, dict[str, Any]] = {}
+        self.notes: dict[int, list[dict[str, Any]]] = {}
+        self.requests: list[tuple[str, str]] = []
+        # Query of every merge_requests list request
+        self.list_queries: list[dict[str, list[str]]] = []
+        self.connections = 0
+        self.page_size = 100
+        # Number of upcoming requests to reject with 429 Too Many Requests
+        self.throttle = 0
+        # Number of conditional GETs answered with 304 Not Modified
+        self.not_modified = 0
+        # Seconds POST responses are held back after the request is handled
+        self.post_delay = 0.0
+        self.lock = threading.Lock()
+
+    def handle(self, method: str, path: str, query: dict[str, list[str]],
+               body: dict[str, Any]) -> tuple[int, Any, dict[str, str]]:
+        """Dispatch a request and return (status, payload, headers)."""
+        # pylint: disable=too-many-return-statements
+        with self.lock:
+            self.requests.append((method, path))
+            if self.throttle:
+                self.throttle -= 1
+                return 429, {'message': 'Too Many Requests'}, {
+                    'Retry-After': '0'
+                }
+            parts = path.split('/')
+
+            if parts == ['merge_requests'] and method == 'POST':
+                iid = len(self.mrs) + 1
+                self.mrs[iid] = {
+                    'iid': iid,
+                    'state': 'opened',
+                    'author': {
+                        'username': 'user'
+                    },
+                    'web_url': f"https://gitlab.test/{PROJECT}/-/merge_requests/{iid}",
+                    **body,
+                }
+                self.notes[iid] = []
+                return 201, self.mrs[iid], {}
+
+            if parts == ['merge_requests'] and method == 'GET':
+                self.list_queries.append(query)
+                state = query.get('state', ['all'])[0]
+                iids = {int(iid) for iid in query.get('iids[]', [])}
+                own = query.get('scope') == ['created_by_me']
+                mrs = [
+                    mr for mr in self.mrs.values()
+                    if state in ('all', mr['state']) and (
+                        not iids or mr['iid'] in iids) and (
+                            'source_branch' not in query or
+                            mr['source_branch'] == query['source_branch'][0])
+                    and (not own or mr['author']['username'] == 'user')
+                ]
+                return self._page(mrs, query)
+
+            iid = int(parts[1])
+            if iid not in self.mrs:
+                return 404, {'message': '404 Not found'}, {}
+
+            if len(parts) == 2 and method == 'GET':
+                return 200, self.mrs[iid], {}
+            if len(parts) == 2 and method == 'PUT':
+                if body.get('state_event') == 'close':
+                    self.mrs[iid]['state'] = 'closed'
+                self.mrs[iid].update(
+                    {k: v
+                     for k, v in body.items() if k != 'state_event'})
+                return 200, self.mrs[iid], {}
+            if parts[2] == 'notes' and method == 'GET':
+                return self._page(self.notes[iid], query)
+            if parts[2] == 'notes' and method == 'POST':
+                note = {
+                    'id': 100 + sum(len(n) for n in self.notes.values()),
+                    'body': body['body'],
+                    'system': False,
+                }
+                self.notes[iid].append(note)
+                return 201, note, {}
+            if parts[2] == 'notes' and method == 'PUT':
+                for note in self.notes[iid]:
+                    if note['id'] == int(parts[3]):
+                        note['body'] = body['body']
+                        return 200, note, {}
+                return 404, {'message': '404 Not found'}, {}
+            if parts[2] == 'blocks':
+                return 404, {'message': '404 Not found'}, {}
+
+            return 400, {'message': 'unsupported'}, {}
+
+    def _page(self, items: list[dict[str, Any]],
+              query: dict[str, list[str]]) -> tuple[int, Any, dict[str, str]]:
+        """Return one page of a list response with GitLab's paging headers."""
+        page = int(query.get('page', ['1'])[0])
+        start = (page - 1) * self.page_size
+        end = start + self.page_size
+        headers = {'X-Next-Page': str(page + 1) if end < len(items) else ''}
+        return 200, items[start:end], headers
+
+
+def make_handler(gitlab: FakeGitLab) -> type[BaseHTTPRequestHandler]:
+    """Build a keep-alive request handler bound to a FakeGitLab."""
+
+    class Handler(BaseHTTPRequestHandler):
+        """HTTP/1.1 handler forwarding requests to FakeGitLab."""
+
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def setup(self) -> None:
+            super().setup()
+            with gitlab.lock:
+                gitlab.connections += 1
+
+        def log_message(self, *args: Any) -> None:  # pylint: disable=arguments-differ
+            pass
+
+        def _dispatch(self) -> None:
+            url = urlsplit(self.path)
+            assert url.path.startswith(API_PREFIX + '/')
+            assert self.headers['PRIVATE-TOKEN'] == 'secret'
+            path = unquote(url.path[len(API_PREFIX) + 1:])
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            status, payload, headers = gitlab.handle(self.command, path,
+                                                     parse_qs(url.query), body)
+            if self.command == 'POST':
+                time.sleep(gitlab.post_delay)
+            data = json.dumps(payload).encode()
+            if self.command == 'GET' and status == 200:
+                etag = f'"{hashlib.sha1(data).hexdigest()}"'
+                headers = {**headers, 'ETag': etag}
+                if self.headers.get('If-None-Match') == etag:
+                    with gitlab.lock:
+                        gitlab.not_modified += 1
+                    status, data = 304, b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PUT = _dispatch  # noqa: N815
+
+    return Handler
+
+
+@pytest.fixture
+def gitlab_server() -> Generator[tuple[FakeGitLab, GitLabApiClient], None, None]:
+    """Run a FakeGitLab server and a client pointed at it."""
+    gitlab = FakeGitLab()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(gitlab))
+    thread = threading.Thread(target=server.serve_forever,
+                              kwargs={'poll_interval': 0.05},
+                              daemon=True)
+    thread.start()
+
+    client = GitLabApiClient(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/api/v4",
+        project=PROJECT,
+        token='secret',
+    )
+    try:
+        yield gitlab, client
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+
+class TestGitLabApiClient:
+    """Test GitLabApiClient request handling and return shapes."""
+
+    def test_create_update_and_close(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient]) -> None:
+        """Test MR lifecycle calls and their return shapes."""
+        gitlab, client = gitlab_server
+
+        result = client.create_mr('user/stack-a@feat@1', 'main', 'First',
+                                  'Description')
+        assert result == {
+            'mr_iid': 1,
+            'mr_url': f"https://gitlab.test/{PROJECT}/-/merge_requests/1",
+        }
+        assert gitlab.mrs[1]['remove_source_branch'] is True
+
+        client.update_mr(1, 'Renamed', 'develop')
+        assert gitlab.mrs[1]['title'] == 'Renamed'
+        assert gitlab.mrs[1]['target_branch'] == 'develop'
+
+        assert client.get_mr_state(1) == 'opened'
+        client.close_mr(1)
+        assert client.get_mr_state(1) == 'closed'
+
+    def test_connections_are_reused(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient]) -> None:
+        """Test that sequential calls share one keep-alive connection."""
+        gitlab, client = gitlab_server
+
+        for i in range(5):
+            client.create_mr(f"user/stack-{i}@feat@{i}", 'main', f"MR {i}", '')
+        for i in range(1, 6):
+            client.get_mr_state(i)
+
+        assert len(gitlab.requests) == 10
+        assert gitlab.connections == 1
+        assert client.pool.connections_opened == 1
+
+    def test_notes_are_paginated(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient]) -> None:
+        """Test note listing across pages, updates and system-note filtering."""
+        gitlab, client = gitlab_server
+        gitlab.page_size = 2
+
+        client.create_mr('user/stack-a@feat@1', 'main', 'First', '')
+        for i in range(5):
+            client.add_mr_note(1, f"note {i}")
+        gitlab.notes[1].append({'id': 999, 'body': 'system', 'system': True})
+
+        notes = client.get_mr_notes(1)
+        assert [n['body'] for n in notes] == [f"note {i}" for i in range(5)]
+
+        client.update_mr_note(1, notes[0]['id'], 'edited')
+        assert client.get_mr_notes(1)[0]['body'] == 'edited'
+
+    def test_find_mrs(self, gitlab_server: tuple[FakeGitLab,
+                                                 GitLabApiClient]) -> None:
+        """Test stack and source-branch lookups."""
+        _, client = gitlab_server
+
+        client.create_mr('user/stack-a@feat@1', 'main', 'First', '')
+        client.create_mr('user/stack-b@feat@2', 'user/stack-a@feat@1',
+                         'Second', '')
+        client.create_mr('user/stack-c@other@1', 'main', 'Other', '')
+
+        stack_mrs = client.find_mrs_by_stack_name('feat')
+        assert sorted(mr['mr_iid'] for mr in stack_mrs) == [1, 2]
+        assert stack_mrs[0]['source_branch'] == 'user/stack-a@feat@1'
+        assert stack_mrs[0]['state'] == 'opened'
+
+        found = client.find_mr_by_source_branch('user/stack-c@other@1')
+        assert found is not None
+        assert found['mr_iid'] == 3
+        assert client.find_mr_by_source_branch('missing') is None
+
+    def test_discovery_is_filtered_and_cached(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient]) -> None:
+        """Test source_branch lookups, scoped listing and the cache."""
+        gitlab, client = gitlab_server
+        for i in range(1, 6):
+            gitlab.handle('POST', 'merge_requests', {}, {
+                'source_branch': f"user/stack-{i}@feat@{i}",
+                'target_branch': 'main',
+                'title': f"MR {i}",
+            })
+        gitlab.handle(
+            'POST', 'merge_requests', {}, {
+                'source_branch': 'other/stack-6@feat@1',
+                'target_branch': 'main',
+                'title': 'Foreign',
+                'author': {
+                    'username': 'other'
+                },
+            })
+
+        # Few branches: one source_branch lookup each, then cached
+        found = client.find_open_mrs_by_source_branches(
+            ['user/stack-1@feat@1', 'missing'])
+        assert found['user/stack-1@feat@1']['mr_iid'] == 1
+        assert found['missing'] is None
+        assert sorted(q['source_branch'][0] for q in gitlab.list_queries
+                     ) == ['missing', 'user/stack-1@feat@1']
+        assert client.find_mr_by_source_branch('missing') is None
+        assert len(gitlab.list_queries) == 2
+
+        # Many branches: the user's MRs are listed until all are found
+        gitlab.list_queries.clear()
+        gitlab.page_size = 2
+        client.max_source_branch_lookups = 1
+        found = client.find_open_mrs_by_source_branches(
+            ['user/stack-2@feat@2', 'user/stack-3@feat@3'])
+        assert [mr['mr_iid'] for mr in found.values()] == [2, 3]
+        assert len(gitlab.list_queries) == 2
+        assert gitlab.list_queries[0]['scope'] == ['created_by_me']
+
+        # Stacks need the full listing, which excludes other authors
+        gitlab.list_queries.clear()
+        by_stack = client.find_mrs_by_stack_names(['feat'])
+        assert [mr['mr_iid'] for mr in by_stack['feat']] == [1, 2, 3, 4, 5]
+        assert len(gitlab.list_queries) == 3
+        client.close_mr(5)
+        assert client.find_mr_by_source_branch('user/stack-5@feat@5') is None
+        assert len(client.find_mrs_by_stack_name('feat')) == 4
+        assert len(gitlab.list_queries) == 3
+
+    def test_batch_operations(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient]) -> None:
+        """Test bulk state lookup and fanned-out batch writes."""
+        gitlab, client = gitlab_server
+
+        for i in range(1, 5):
+            client.create_mr(f"user/stack-{i}@feat@{i}", 'main', f"MR {i}", '')
+        client.close_mr(2)
+        gitlab.requests.clear()
+
+        states = client.get_mr_states([1, 2, 3, 42])
+        assert states == {1: 'opened', 2: 'closed', 3: 'opened'}
+        assert gitlab.requests == [('GET', 'merge_requests')]
+
+        gitlab.requests.clear()
+        by_stack = client.find_mrs_by_stack_names(['feat', 'other'])
+        assert [mr['mr_iid'] for mr in by_stack['feat']] == [1, 3, 4]
+        assert by_stack['other'] == []
+        assert gitlab.requests == [('GET', 'merge_requests')]
+
+        results = client.close_mrs([1, 3, 42])
+        assert results[1] is None and results[3] is None
+        assert isinstance(results[42], GitLabApiError)
+        assert client.get_mr_states([1, 3]) == {1: 'closed', 3: 'closed'}
+
+        results = client.update_mrs([{'mr_iid': 4, 'title': 'Renamed'}])
+        assert results == {4: None}
+        assert gitlab.mrs[4]['title'] == 'Renamed'
+
+        note_id = client.add_mr_note(4, 'hello')
+        notes = client.get_notes_for([1, 4])
+        assert notes[1] == []
+        assert [(n['id'], n['body']) for n in notes[4]] == [(note_id, 'hello')]
+
+    def test_errors(self, gitlab_server: tuple[FakeGitLab,
+                                               GitLabApiClient]) -> None:
+        """Test error mapping for missing MRs, notes and dependencies."""
+        _, client = gitlab_server
+
+        with pytest.raises(GitLabApiError) as excinfo:
+            client.get_mr_state(42)
+        assert excinfo.value.status == 404
+
+        # A failed note listing is an error, not an MR without notes
+        with pytest.raises(GitLabApiError):
+            client.get_mr_notes(42)
+
+        client.create_mr('user/stack-a@feat@1', 'main', 'First', '')
+        client.create_mr('user/stack-b@feat@2', 'main', 'Second', '')
+        with pytest.raises(NoteNotFoundError):
+            client.update_mr_note(1, 12345, 'Stack links')
+        with pytest.raises(ValueError):
+            client.set_mr_dependencies(2, [1])
+
+    def test_throttling_is_retried(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient]) -> None:
+        """Test that 429 responses shrink the window and are retried."""
+        gitlab, client = gitlab_server
+        client.create_mr('user/stack@feat@1', 'main', 'First', '')
+        window = client.limiter.window
+
+        gitlab.throttle = 2
+        assert client.get_mr_state(1) == 'opened'
+        assert gitlab.requests[-3:] == [('GET', 'merge_requests/1')] * 3
+        assert client.limiter.window < window
+        assert client.limiter.in_flight == 0
+
+    def test_timed_out_post_is_not_resent(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient]) -> None:
+        """Test that a POST that may have been processed is not repeated."""
+        gitlab, client = gitlab_server
+        client.create_mr('user/stack@feat@1', 'main', 'First', '')
+
+        gitlab.post_delay = 0.5
+        client.timeout = 0.1
+        with pytest.raises(GitLabApiError):
+            client.add_mr_note(1, 'Stack links')
+        assert gitlab.requests.count(('POST', 'merge_requests/1/notes')) == 1
+        assert len(gitlab.notes[1]) == 1
+
+    def test_responses_are_revalidated(
+            self, gitlab_server: tuple[FakeGitLab, GitLabApiClient],
+            tmp_path: Path) -> None:
+        """Test that cached GETs are answered with 304 until they change."""
+        gitlab, client = gitlab_server
+        client.cache = HttpCache(tmp_path, 1024 * 1024)
+        client.create_mr('user/stack-a@feat@1', 'main', 'First', '')
+        note_id = client.add_mr_note(1, 'Stack links')
+
+        notes = client.get_mr_notes(1)
+        assert gitlab.not_modified == 0
+        assert client.get_mr_notes(1) == notes
+        assert client.get_mr_state(1) == 'opened'
+        assert gitlab.not_modified == 1
+
+        assert note_id is not None
+        client.update_mr_note(1, note_id, 'Updated links')
+        assert client.get_mr_notes(1)[0]['body'] == 'Updated links'
+        assert gitlab.not_modified == 1
+
+        # Entries survive the client, as between two commands
+        other = GitLabApiClient(base_url=client.pool.scheme + '://' +
+                                client.pool.netloc + '/api/v4',
+                                project=PROJECT,
+                                token='secret',
+                                cache=HttpCache(tmp_path, 1024 * 1024))
+        try:
+            assert other.get_mr_notes(1)[0]['body'] == 'Updated links'
+        finally:
+            other.close()
+        assert gitlab.not_modified == 2
+
+
+class TestConfiguration:
+    """Test remote URL and glab token discovery."""
+
+    def test_parse_remote_url(self) -> None:
+        """Test scp-like, ssh and https remotes."""
+        assert parse_remote_url('git@gitlab.com:group/project.git') == (
+            'gitlab.com', 'group/project')
+        assert parse_remote_url(
+            'ssh://git@gitlab.example.com:2222/a/b/c.git') == (
+                'gitlab.example.com', 'a/b/c')
+        assert parse_remote_url('https://gitlab.com/group/project') == (
+            'gitlab.com', 'group/project')
+
+    def test_project_from_repo_context(
+            self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that the API root and project come from the origin remote."""
+        monkeypatch.setenv('GLAB_CONFIG_DIR', str(tmp_path))
+        subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+        subprocess.run([
+            'git', '-C',
+            str(tmp_path), 'remote', 'add', 'origin',
+            'git@gitlab.example.com:group/sub/project.git'
+        ],
+                       check=True)
+
+        client = GitLabApiClient(token='secret',
+                                 repo=RepoContext(str(tmp_path)))
+        try:
+            assert client.pool.netloc == 'gitlab.example.com'
+            assert client.project == 'group/sub/project'
+        finally:
+            client.close()
+
+        with pytest.raises(HostingError):
+            GitLabApiClient(token='secret',
+                            repo=RepoContext(str(tmp_path / 'missing')))
+
+    def test_read_glab_token(self, tmp_path: Path,
+                             monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test reading the token glab stored for a host."""
+        for env_var in ('GITLAB_TOKEN', 'GITLAB_ACCESS_TOKEN', 'OAUTH_TOKEN'):
+            monkeypatch.delenv(env_var, raising=False)
+
+        config = tmp_path / 'config.yml'
+        config.write_text('git_protocol: ssh\n'
+                          'hosts:\n'
+                          '    gitlab.com:\n'
+                          '        token: public-token\n'
+                          '    gitlab.example.com:\n'
+                          '        api_protocol: https\n'
+                          '        token: example-token\n')
+
+        assert read_glab_token('gitlab.example.com', config) == 'example-token'
+        assert read_glab_token('gitlab.com', config) == 'public-token'
+        assert read_glab_token('unknown.host', config) is None
+
+        monkeypatch.setenv('GITLAB_TOKEN', 'env-token')
+        assert read_glab_token('gitlab.com', config) == 'env-token'
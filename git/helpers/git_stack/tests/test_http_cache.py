@@ -0,0 +1,73 @@
+"""Tests for the on-disk HTTP response cache."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from pathlib import Path
+
+from git_stack.http_cache import (
+    CacheEntry,
+    HttpCache,
+    open_http_cache,
+    response_entry,
+    set_cache_enabled,
+)
+from git_stack.plumbing import RepoContext
+
+
+class TestHttpCache:
+    """Test storage, LRU eviction and configuration of the cache."""
+
+    def test_least_recently_used_entries_are_evicted(self,
+                                                     tmp_path: Path) -> None:
+        """Test that the cache stays within its size limit."""
+        cache = HttpCache(tmp_path, 4096)
+        for i in range(4):
+            cache.put(f"key{i}", CacheEntry(body='x' * 900, etag=f'"{i}"'))
+            # Distinct access times, oldest first
+            os.utime(cache._path(f"key{i}"), (1000 + i, 1000 + i))  # pylint: disable=protected-access
+        # Used recently, so it outlives key1
+        assert cache.get('key0') is not None
+
+        cache.put('key4', CacheEntry(body='x' * 900, etag='"4"'))
+
+        assert cache.get('key1') is None
+        assert cache.get('key0') is not None
+        assert cache.get('key4') is not None
+        assert sum(path.stat().st_size
+                   for path in tmp_path.glob('*.json')) <= 4096
+
+    def test_response_entry(self) -> None:
+        """Test that only revalidatable responses are stored."""
+        entry = response_entry('[]', {'etag': '"a"', 'x-next-page': '2'})
+        assert entry is not None
+        assert entry.conditional_headers() == {'If-None-Match': '"a"'}
+        assert entry.headers['x-next-page'] == '2'
+        assert response_entry('[]', {}) is None
+        assert response_entry('[]', {
+            'etag': '"a"',
+            'cache-control': 'no-store'
+        }) is None
+
+    def test_open_http_cache(self, tmp_path: Path) -> None:
+        """Test the size limit from git config and --no-cache."""
+        subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+        repo = RepoContext(str(tmp_path))
+
+        cache = open_http_cache(repo)
+        assert cache is not None
+        assert cache.directory.parent == Path(tmp_path, '.git')
+
+        set_cache_enabled(False)
+        try:
+            assert open_http_cache(repo) is None
+        finally:
+            set_cache_enabled(True)
+
+        subprocess.run([
+            'git', '-C',
+            str(tmp_path), 'config', 'git-stack.http-cache-size', '0'
+        ],
+                       check=True)
+        assert open_http_cache(RepoContext(str(tmp_path))) is None
@@ -0,0 +1,194 @@
+"""Tests for the indexed Change-Id to MR mapping store."""
+# pylint: disable=too-few-public-methods
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import git_stack
+from git_stack.mapping import (
+    JsonMappingBackend,
+    MappingStore,
+    SqliteMappingBackend,
+    create_mapping_backend,
+    save_mapping,
+)
+
+
+@pytest.fixture(autouse=True)
+def git_stack_user(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Pin the username used for branch names."""
+    monkeypatch.setenv('GIT_STACK_USER', 'tester')
+
+
+def mr(mr_iid: int) -> dict[str, object]:
+    """Build a mapping entry for an MR."""
+    return {'mr_iid': mr_iid, 'mr_url': f"https://gitlab.test/mr/{mr_iid}"}
+
+
+class TestMappingStore:
+    """Test MappingStore indexes and JSON persistence."""
+
+    def test_reads_existing_json(self, tmp_path: Path) -> None:
+        """Test loading a legacy mapping file with both Change-Id formats."""
+        path = tmp_path / 'mapping.json'
+        entries = {
+            'bbbb@feat@2': mr(2),
+            'aaaa@feat@1': mr(1),
+            'cccc@other@1': mr(3),
+            'dddd-legacy-stack-1': mr(4),
+        }
+        path.write_text(json.dumps(entries))
+
+        store = MappingStore.load(path)
+
+        assert dict(store) == entries
+        assert store.stack_names() == ['feat', 'legacy-stack', 'other']
+        assert [cid for _, cid, _ in store.stack('feat')
+               ] == ['aaaa@feat@1', 'bbbb@feat@2']
+        assert store.stack('missing') == []
+        assert MappingStore.load(tmp_path / 'missing.json').stack_names() == []
+
+    def test_indexes_follow_updates(self, tmp_path: Path) -> None:
+        """Test that assignment and deletion keep every index in sync."""
+        store = MappingStore(JsonMappingBackend(tmp_path / 'mapping.json'))
+        store['aaaa@feat@10'] = mr(1)
+        store['bbbb@feat@2'] = mr(2)
+
+        assert [pos for pos, _, _ in store.stack('feat')] == [2, 10]
+        assert store.find_by_mr_iid(2) == 'bbbb@feat@2'
+        assert store.find_by_branch(
+            'tester/stack-aaaa@feat@10') == 'aaaa@feat@10'
+
+        store['bbbb@feat@2'] = mr(5)
+        store['cccc@feat@3'] = mr(3)
+        assert store.find_by_mr_iid(2) is None
+        assert store.find_by_mr_iid(5) == 'bbbb@feat@2'
+        assert store.find_by_branch('tester/stack-cccc@feat@3') == 'cccc@feat@3'
+
+        del store['aaaa@feat@10']
+        del store['bbbb@feat@2']
+        del store['cccc@feat@3']
+        assert store.stack_names() == []
+        assert store.find_by_mr_iid(1) is None
+        assert store.find_by_branch('tester/stack-aaaa@feat@10') is None
+
+    def test_save_round_trip(self, tmp_path: Path) -> None:
+        """Test that saving writes the plain JSON format."""
+        path = tmp_path / 'nested' / 'mapping.json'
+        store = MappingStore(JsonMappingBackend(path), {'aaaa@feat@1': mr(1)})
+        store['bbbb@feat@2'] = mr(2)
+        store.save()
+
+        assert json.loads(path.read_text()) == {
+            'aaaa@feat@1': mr(1),
+            'bbbb@feat@2': mr(2),
+        }
+
+    def test_concurrent_saves_merge(self, tmp_path: Path) -> None:
+        """Test that a save on a stale copy applies only its own changes."""
+        path = tmp_path / 'mapping.json'
+        save_mapping(path, {'aaaa@feat@1': mr(1), 'bbbb@feat@2': mr(2)})
+
+        first = MappingStore.load(JsonMappingBackend(path))
+        second = MappingStore.load(JsonMappingBackend(path))
+
+        first['cccc@other@1'] = mr(3)
+        del first['aaaa@feat@1']
+        first.save()
+
+        second['dddd@third@1'] = mr(4)
+        second['bbbb@feat@2'] = mr(20)
+        second.save()
+
+        assert json.loads(path.read_text()) == {
+            'bbbb@feat@2': mr(20),
+            'cccc@other@1': mr(3),
+            'dddd@third@1': mr(4),
+        }
+        assert 'cccc@other@1' in second and 'aaaa@feat@1' not in second
+        assert not list(tmp_path.glob('.mapping.json.*.tmp'))
+
+    def test_parallel_processes(self, tmp_path: Path) -> None:
+        """Test that saves from parallel processes don't drop entries."""
+        path = tmp_path / 'mapping.json'
+        script = (
+            'import sys\n'
+            'from pathlib import Path\n'
+            'from git_stack.mapping import JsonMappingBackend, MappingStore\n'
+            'i = int(sys.argv[2])\n'
+            'store = MappingStore.load(JsonMappingBackend(Path(sys.argv[1])))\n'
+            'for j in range(5):\n'
+            '    store[f"{i}x{j}@s{i}@{j}"] = {"mr_iid": i * 10 + j}\n'
+            '    store.save()\n')
+        env = {
+            **os.environ, 'PYTHONPATH':
+                str(Path(git_stack.__file__).parent.parent)
+        }
+        procs = [
+            subprocess.Popen([sys.executable, '-c', script,
+                              str(path), str(i)],
+                             env=env) for i in range(6)
+        ]
+        assert all(proc.wait() == 0 for proc in procs)
+
+        assert len(json.loads(path.read_text())) == 30
+
+
+class TestSqliteMappingBackend:
+    """Test the SQLite mapping backend and its JSON migration."""
+
+    def test_migrates_json_once(self, tmp_path: Path) -> None:
+        """Test the one-time import of an existing JSON mapping."""
+        json_path = tmp_path / 'mapping.json'
+        json_path.write_text(
+            json.dumps({
+                'aaaa@feat@1': mr(1),
+                'bbbb@feat@2': mr(2),
+            }))
+        backend = create_mapping_backend(json_path, 'sqlite')
+        assert isinstance(backend, SqliteMappingBackend)
+        assert backend.path == tmp_path / 'mapping.sqlite3'
+
+        store = MappingStore.load(backend)
+        assert list(store) == ['aaaa@feat@1', 'bbbb@feat@2']
+        del store['aaaa@feat@1']
+        store.save()
+        store.close()
+
+        # Later edits to the JSON file are not imported again
+        json_path.write_text(json.dumps({'cccc@feat@3': mr(3)}))
+        store = MappingStore.load(SqliteMappingBackend(backend.path, json_path))
+        assert list(store) == ['bbbb@feat@2']
+        store.close()
+
+    def test_writes_only_changed_rows(self, tmp_path: Path) -> None:
+        """Test that save() upserts and deletes only the touched rows."""
+        backend = SqliteMappingBackend(tmp_path / 'mapping.sqlite3')
+        store = MappingStore.load(backend)
+        for i in range(1, 4):
+            store[f"id{i}@feat@{i}"] = mr(i)
+        store.save()
+
+        statements: list[str] = []
+        assert backend._conn is not None  # pylint: disable=protected-access
+        backend._conn.set_trace_callback(statements.append)  # pylint: disable=protected-access
+
+        store['id2@feat@2'] = mr(20)
+        del store['id3@feat@3']
+        store.save()
+        store.save()
+
+        writes = [s for s in statements if s.startswith(('INSERT', 'DELETE'))]
+        assert len(writes) == 2
+        store.close()
+
+        reloaded = MappingStore.load(SqliteMappingBackend(backend.path))
+        assert dict(reloaded) == {'id1@feat@1': mr(1), 'id2@feat@2': mr(20)}
+        reloaded.close()
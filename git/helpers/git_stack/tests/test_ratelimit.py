@@ -0,0 +1,157 @@
+"""Tests for adaptive, rate-limit-aware admission of hosting calls."""
+
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+import pytest
+
+from git_stack.plumbing import RepoContext
+from git_stack.ratelimit import (
+    RateLimitConfig,
+    RateLimiter,
+    glab_throttle_delay,
+    parse_retry_after,
+    throttle_delay,
+)
+from git_stack.timeouts import Deadline, DeadlineExceededError
+
+
+class TestRateLimiter:
+    """Test the concurrency window, token bucket and pauses."""
+
+    def test_window_halves_and_grows(self) -> None:
+        """Test multiplicative decrease and additive increase."""
+        limiter = RateLimiter(
+            RateLimitConfig(initial_concurrency=8, max_concurrency=10))
+
+        limiter.acquire()
+        limiter.release(throttled=True)
+        assert limiter.window == 4
+
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release()
+        assert 4.9 < limiter.window < 5
+
+        for _ in range(100):
+            limiter.acquire()
+            limiter.release()
+        assert limiter.window == 10
+        assert limiter.in_flight == 0
+
+    def test_window_limits_calls_in_flight(self) -> None:
+        """Test that acquire() blocks while the window is full."""
+        limiter = RateLimiter(RateLimitConfig(initial_concurrency=1))
+        limiter.acquire()
+
+        acquired = threading.Event()
+
+        def second() -> None:
+            limiter.acquire()
+            acquired.set()
+            limiter.release()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not acquired.wait(timeout=0.1)
+        limiter.release()
+        assert acquired.wait(timeout=5)
+        thread.join()
+
+    def test_token_bucket_and_pause(self) -> None:
+        """Test that the rate beyond the burst and pauses delay calls."""
+        limiter = RateLimiter(RateLimitConfig(rate=20, burst=2))
+
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release()
+        # Two calls from the burst, two refilled at 20/s
+        assert 0.08 < time.monotonic() - start < 1
+
+        limiter.pause(0.2)
+        start = time.monotonic()
+        limiter.acquire()
+        limiter.release()
+        assert 0.2 <= time.monotonic() - start < 1
+
+    def test_waits_end_at_the_deadline(self) -> None:
+        """Test that a long pause does not outlast the command's deadline."""
+        limiter = RateLimiter()
+        limiter.pause(3)
+
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            limiter.acquire(Deadline(0.2))
+        assert time.monotonic() - start < 1
+        assert limiter.in_flight == 0
+
+
+class TestThrottleHints:
+    """Test parsing of server rate-limit hints."""
+
+    def test_parse_retry_after(self) -> None:
+        """Test delays given in seconds and as HTTP dates."""
+        assert parse_retry_after('7') == 7
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('soon') is None
+        now = time.time()
+        assert 29 <= parse_retry_after(formatdate(now + 30, usegmt=True),
+                                       now) <= 30
+
+    def test_throttle_delay(self) -> None:
+        """Test Retry-After and RateLimit-* headers."""
+        assert throttle_delay({'retry-after': '3'}) == 3
+        assert throttle_delay({
+            'ratelimit-remaining': '0',
+            'ratelimit-reset': '1010'
+        }, now=1000) == 10
+        assert throttle_delay({
+            'ratelimit-remaining': '5',
+            'ratelimit-reset': '1010'
+        }, now=1000) is None
+        assert throttle_delay({}) is None
+
+    def test_glab_throttle_delay(self) -> None:
+        """Test rate-limit hints in glab error output."""
+        assert glab_throttle_delay('429 Too Many Requests, '
+                                   'Retry-After: 12') == 12
+        assert glab_throttle_delay('HTTP 429 Too Many Requests') == 0
+        assert glab_throttle_delay('404 Not Found') is None
+        assert glab_throttle_delay('glab: 429 (HTTP 429)') == 0
+        # IIDs containing 429 are not throttling
+        assert glab_throttle_delay('GET projects/:id/merge_requests/429: '
+                                   '404 Not Found') is None
+        assert glab_throttle_delay(
+            'glab: merge_requests/1429 (HTTP 404)') is None
+
+
+class TestRateLimitConfig:
+    """Test per-host limits from git config."""
+
+    def test_from_git_config(self, tmp_path: Path) -> None:
+        """Test that host keys override the defaults."""
+        subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+        for key, value in [('max-concurrency', '32'), ('rate', '2.5'),
+                           ('concurrency', '64'), ('burst', 'many')]:
+            subprocess.run([
+                'git', '-C',
+                str(tmp_path), 'config', f"git-stack.gitlab.example.com.{key}",
+                value
+            ],
+                           check=True)
+
+        config = RateLimitConfig.from_git_config(
+            'gitlab.example.com', RepoContext(str(tmp_path)))
+
+        assert config.max_concurrency == 32
+        assert config.rate == 2.5
+        # Clamped to max-concurrency
+        assert config.initial_concurrency == 32
+        # Invalid values fall back to the default
+        assert config.burst == RateLimitConfig().burst
@@ -0,0 +1,96 @@
+"""Tests for the dependency-driven task scheduler."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from git_stack.scheduler import DependencyFailedError, TaskGraph
+from git_stack.timeouts import Deadline, DeadlineExceededError
+
+
+class TestTaskGraph:
+    """Test TaskGraph ordering, overlap and failure handling."""
+
+    def test_runs_ready_tasks_without_phase_barrier(self) -> None:
+        """Test that a task starts while an unrelated slow task still runs."""
+        slow_may_finish = threading.Event()
+        order: list[str] = []
+
+        def slow() -> str:
+            assert slow_may_finish.wait(timeout=5)
+            return 'slow'
+
+        def dependent() -> str:
+            # Runs while 'slow' is still blocked
+            slow_may_finish.set()
+            return 'dependent'
+
+        graph = TaskGraph(max_workers=2)
+        graph.add('slow', slow)
+        graph.add('fast', lambda: 'fast', on_done=order.append)
+        graph.add('dependent', dependent, ['fast'], on_done=order.append)
+        graph.add('last', lambda: 'last', ['slow', 'dependent'],
+                  order.append)
+
+        results = graph.run()
+
+        assert results == {
+            'slow': 'slow',
+            'fast': 'fast',
+            'dependent': 'dependent',
+            'last': 'last',
+        }
+        assert order == ['fast', 'dependent', 'last']
+
+    def test_failure_skips_dependents(self) -> None:
+        """Test that dependents of a failed task are not run."""
+        ran: list[str] = []
+
+        def fail() -> None:
+            raise RuntimeError('boom')
+
+        graph = TaskGraph()
+        graph.add('root', fail)
+        graph.add('child', lambda: ran.append('child'), ['root'])
+        graph.add('grandchild', lambda: ran.append('grandchild'), ['child'])
+        graph.add('other', lambda: ran.append('other'))
+
+        results = graph.run()
+
+        assert ran == ['other']
+        assert isinstance(results['root'], RuntimeError)
+        assert isinstance(results['child'], DependencyFailedError)
+        assert results['grandchild'].dependency == 'child'
+
+    def test_deadline_stops_new_tasks(self) -> None:
+        """Test that tasks ready after the deadline are not started."""
+        ran: list[str] = []
+        deadline = Deadline(0.1)
+
+        def slow() -> None:
+            ran.append('slow')
+            time.sleep(0.2)
+
+        graph = TaskGraph(deadline=deadline)
+        graph.add('slow', slow)
+        graph.add('late', lambda: ran.append('late'), ['slow'])
+        graph.add('after', lambda: ran.append('after'), ['late'])
+
+        results = graph.run()
+
+        assert ran == ['slow']
+        assert results['slow'] is None
+        assert isinstance(results['late'], DeadlineExceededError)
+        assert isinstance(results['after'], DependencyFailedError)
+
+    def test_rejects_unknown_dependencies(self) -> None:
+        """Test that tasks can only depend on tasks added before them."""
+        graph = TaskGraph()
+        graph.add('a', lambda: None)
+        with pytest.raises(ValueError):
+            graph.add('b', lambda: None, ['missing'])
+        with pytest.raises(ValueError):
+            graph.add('a', lambda: None)
@@ -4,9 +4,15 @@
 from __future__ import annotations
 
 import json
+import subprocess
 from io import StringIO
+from pathlib import Path
+from typing import Any
 from unittest.mock import patch
 
+import pytest
+
+from git_stack.aio import kill_children
 from git_stack.change_id import (
     CHANGE_ID_DELIMITER,
     extract_change_id,
@@ -16,6 +22,20 @@ from git_stack.change_id import (
     get_branch_name,
     validate_stack_name,
 )
+from git_stack.hosting_client import HostingError
+from git_stack.plumbing import (
+    GitObjectReader,
+    GitPlumbingError,
+    RefTransaction,
+    RepoContext,
+    git_version,
+)
+from git_stack.stack import CherryPickError
+from git_stack.timeouts import (
+    DeadlineExceededError,
+    get_deadline,
+    set_deadline,
+)
 
 from .conftest import (
     GitStackTestFixture,
@@ -83,6 +103,189 @@ class TestChangeId:
         assert validate_stack_name('with@symbol') is False
 
 
+class TestCommitLoader:
+    """Test the single-pass commit loader."""
+
+    def test_get_commits_parses_fields(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that commits are loaded in order with all fields."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt',
+                      'First commit\n\nBody text\n\nChange-Id: abc12345@feat@1')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        stack = git_stack_fixture.create_stack_instance()
+        commits = stack._get_commits('main')  # pylint: disable=protected-access
+
+        assert [c['subject'] for c in commits] == [
+            'First commit', 'Second commit'
+        ]
+        assert commits[0]['message'] == (
+            'First commit\n\nBody text\n\nChange-Id: abc12345@feat@1')
+        assert commits[0]['change_id'] == 'abc12345@feat@1'
+        assert commits[1]['change_id'] is None
+        assert commits[1]['sha'] == run_git(git_stack_fixture.repo_path,
+                                            ['rev-parse', 'HEAD'])
+
+    def test_iter_commits_early_stop_and_errors(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test stopping the loader early and git log failures."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        for i in range(3):
+            create_commit(git_stack_fixture.repo_path, f"file{i}.txt",
+                          f"Commit {i}")
+
+        # pylint: disable=protected-access
+        stack = git_stack_fixture.create_stack_instance()
+        commits = stack._iter_commits(['main..HEAD'])
+        assert next(commits)['subject'] == 'Commit 2'
+        commits.close()
+        assert len(list(stack._iter_commits(['main..HEAD']))) == 3
+
+        with pytest.raises(subprocess.CalledProcessError) as excinfo:
+            list(stack._iter_commits(['no-such-rev']))
+        assert 'no-such-rev' in excinfo.value.stderr
+
+
+class TestGitObjectReader:
+    """Test the persistent cat-file coprocess."""
+
+    def test_resolve_refs_and_read_commits(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test batched ref resolution and commit reads."""
+        repo = git_stack_fixture.repo_path
+        create_branch(repo, 'feature', 'origin/main')
+        sha = create_commit(repo, 'file1.txt',
+                            'First commit\n\nChange-Id: abc12345@feat@1')
+
+        with GitObjectReader() as reader:
+            refs = reader.resolve_refs(['HEAD', 'origin/main', 'no-such-ref'])
+            assert refs['HEAD'] == sha
+            assert refs['origin/main'] == run_git(repo,
+                                                  ['rev-parse', 'origin/main'])
+            assert refs['no-such-ref'] is None
+
+            commits = reader.read_commits([sha, 'no-such-ref'])
+            commit = commits[sha]
+            assert commit is not None
+            assert commit.subject == 'First commit'
+            assert commit.parents == (refs['origin/main'], )
+            assert extract_change_id(commit.message) == 'abc12345@feat@1'
+            assert commits['no-such-ref'] is None
+
+    def test_killed_with_children_and_restarted(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that kill_children() stops the coprocess until next use."""
+        with GitObjectReader() as reader:
+            sha = reader.resolve_refs(['HEAD'])['HEAD']
+            proc = reader._proc  # pylint: disable=protected-access
+            assert proc is not None
+            assert kill_children() >= 1
+            proc.wait(timeout=5)
+
+            assert reader.resolve_refs(['HEAD'])['HEAD'] == sha
+
+    def test_requests_fail_after_the_deadline(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that the coprocess and update-ref honor the deadline."""
+        sha = run_git(git_stack_fixture.repo_path, ['rev-parse', 'HEAD'])
+        transaction = RefTransaction(message='test')
+        transaction.create('refs/heads/late', sha)
+
+        with GitObjectReader() as reader:
+            set_deadline(0)
+            try:
+                with pytest.raises(DeadlineExceededError):
+                    reader.resolve_refs(['HEAD'])
+                with pytest.raises(DeadlineExceededError):
+                    transaction.commit()
+            finally:
+                set_deadline(None)
+        assert not branch_exists(git_stack_fixture.repo_path, 'late')
+
+
+class TestRefTransaction:
+    """Test atomic ref updates through update-ref --stdin."""
+
+    def test_all_or_nothing(self,
+                            git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that a failed old-value check leaves every ref untouched."""
+        repo = git_stack_fixture.repo_path
+        base = run_git(repo, ['rev-parse', 'HEAD'])
+        sha = create_commit(repo, 'file1.txt', 'First commit')
+
+        transaction = RefTransaction(message='test')
+        transaction.create('refs/heads/one', sha)
+        transaction.update('refs/heads/two', sha, RepoContext().null_sha)
+        transaction.commit()
+        assert run_git(repo, ['rev-parse', 'one', 'two']).split() == [sha, sha]
+
+        transaction.update('refs/heads/one', base, sha)
+        transaction.delete('refs/heads/two', base)  # Stale old value
+        with pytest.raises(GitPlumbingError):
+            transaction.commit()
+        assert run_git(repo, ['rev-parse', 'one', 'two']).split() == [sha, sha]
+
+        transaction = RefTransaction()
+        transaction.delete('refs/heads/one', sha)
+        transaction.delete('refs/heads/two')
+        transaction.commit()
+        assert not branch_exists(repo, 'one')
+        assert not branch_exists(repo, 'two')
+
+
+class TestRepoContext:
+    """Test the per-command git config and remote snapshot."""
+
+    def test_reads_config_once(self, git_stack_fixture: GitStackTestFixture,
+                               monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test config lookups, insteadOf rewrites and the username."""
+        repo = git_stack_fixture.repo_path
+        run_git(repo, ['config', 'user.name', 'Jane Q_Doe'])
+        run_git(repo, ['config', 'Git-Stack.Client', 'api'])
+        run_git(repo, ['config', 'remote.origin.url', 'gl:group/project.git'])
+        run_git(repo, [
+            'config', 'url.git@gitlab.example.com:.insteadOf', 'gl:'
+        ])
+        run_git(repo, ['config', '--add', 'remote.origin.fetch', 'extra'])
+        monkeypatch.delenv('GIT_STACK_USER', raising=False)
+
+        context = RepoContext()
+        with patch('subprocess.run', wraps=subprocess.run) as run:
+            assert context.get_config('git-stack.client') == 'api'
+            assert context.get_config('remote.origin.fetch') == 'extra'
+            assert context.get_config('missing.key') is None
+            assert context.remote_url() == (
+                'git@gitlab.example.com:group/project.git')
+            assert context.remote_url('upstream') is None
+            assert get_branch_name('abc@feat@1', context) == (
+                'jane-q-doe/stack-abc@feat@1')
+            assert context.git_dir == str(repo / '.git')
+            assert context.git_dir == str(repo / '.git')
+        assert run.call_count == 2
+
+    def test_null_sha_follows_object_format(self, tmp_path: Path) -> None:
+        """Test that the null object id is as wide as the repo's ids."""
+        for object_format, width in [('sha1', 40), ('sha256', 64)]:
+            repo = tmp_path / object_format
+            run_git(tmp_path, [
+                'init', '-q', f"--object-format={object_format}",
+                str(repo)
+            ])
+            run_git(repo, ['config', 'user.name', 'Test User'])
+            run_git(repo, ['config', 'user.email', 'test@example.com'])
+            sha = create_commit(repo, 'file1.txt', 'First commit')
+
+            context = RepoContext(str(repo))
+            assert context.null_sha == '0' * width
+            # As an old value it lets a ref be created
+            transaction = RefTransaction(cwd=str(repo))
+            transaction.update('refs/heads/new', sha, context.null_sha)
+            transaction.commit()
+            assert run_git(repo, ['rev-parse', 'new']) == sha
+
+
 class TestPushBasicStack:
     """Test basic push functionality."""
 
@@ -173,13 +376,180 @@ class TestPushWithExistingChangeIds:
         assert cid1_before == cid1_after
         assert cid2_before == cid2_after
 
-        # Should have update operations, not create
+        # Nothing changed, so no MR is created or updated
         operations = git_stack_fixture.read_operations()
+        assert not [
+            op for op in operations
+            if op['operation'] in ('create_mr', 'update_mr')
+        ]
+
+        mapping = git_stack_fixture.read_mapping()
+        assert mapping[cid2_after]['title'] == 'Second commit'
+        assert mapping[cid2_after]['target_branch'] == get_branch_name(
+            cid1_after)
+        assert mapping[cid2_after]['sha'] == run_git(
+            git_stack_fixture.repo_path, ['rev-parse', 'HEAD'])
+
+    def test_force_sync_updates_all(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that --force-sync updates unchanged MRs, amends only theirs."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        git_stack_fixture.reset_mock_client()
+
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature',
+            force_sync=True).push(base_branch='main')
         update_ops = [
-            op for op in operations if op['operation'] == 'update_mr'
+            op for op in git_stack_fixture.read_operations()
+            if op['operation'] == 'update_mr'
         ]
         assert len(update_ops) == 2
 
+        # Retitling the top commit updates only its MR
+        git_stack_fixture.reset_mock_client()
+        run_git(git_stack_fixture.repo_path, [
+            'commit', '--amend', '-m',
+            get_commit_message(git_stack_fixture.repo_path, 'HEAD').replace(
+                'Second commit', 'Second commit, reworded')
+        ])
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        update_ops = [
+            op for op in git_stack_fixture.read_operations()
+            if op['operation'] == 'update_mr'
+        ]
+        assert len(update_ops) == 1
+        assert update_ops[0]['args']['title'] == 'Second commit, reworded'
+
+
+class TestPushChangedBranches:
+    """Test that push only updates branches whose commit changed."""
+
+    def test_only_moved_branches_are_pushed(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test amending the top commit pushes only its branch."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+        first_branch = get_branch_name(
+            extract_change_id(
+                get_commit_message(git_stack_fixture.repo_path, 'HEAD~1')))
+
+        (git_stack_fixture.repo_path / 'file2.txt').write_text('amended\n')
+        run_git(git_stack_fixture.repo_path, ['add', 'file2.txt'])
+        run_git(git_stack_fixture.repo_path,
+                ['commit', '--amend', '--no-edit'])
+
+        stack2 = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            stack2.push(base_branch='main')
+        output = stdout.getvalue()
+
+        assert '1 of 2 branch(es) moved' in output
+        assert f"= {first_branch} already at" in output
+        head = run_git(git_stack_fixture.repo_path, ['rev-parse', 'HEAD'])
+        remote_heads = run_git(git_stack_fixture.bare_repo_path,
+                               ['for-each-ref', '--format=%(objectname)'])
+        assert head in remote_heads.split()
+
+    def test_dependencies_only_set_for_changed_pairs(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that dependencies of unchanged MR pairs are not set again."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        for i, name in enumerate(['First', 'Second', 'Third'], 1):
+            create_commit(git_stack_fixture.repo_path, f"file{i}.txt",
+                          f"{name} commit")
+
+        def dependency_ops() -> list[dict[str, Any]]:
+            return [
+                op for op in git_stack_fixture.read_operations()
+                if op['operation'] == 'set_mr_dependencies'
+            ]
+
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        assert len(dependency_ops()) == 2
+
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        assert len(dependency_ops()) == 2
+
+        (git_stack_fixture.repo_path / 'file3.txt').write_text('amended\n')
+        run_git(git_stack_fixture.repo_path, ['add', 'file3.txt'])
+        run_git(git_stack_fixture.repo_path,
+                ['commit', '--amend', '--no-edit'])
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        # Only the pair of the second and the amended third commit
+        assert len(dependency_ops()) == 3
+
+
+class TestPushDeadline:
+    """Test pushes cut short by the command deadline."""
+
+    def test_rerun_finishes_remaining_work(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that MRs created before the deadline are kept."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+        create_commit(git_stack_fixture.repo_path, 'file3.txt', 'Third commit')
+
+        client = git_stack_fixture.mock_client
+        create_mr = client.create_mr
+
+        def create_mr_then_expire(*args: Any, **kwargs: Any) -> Any:
+            # Like the real clients, refuse to start after the deadline
+            get_deadline().cap(None)
+            result = create_mr(*args, **kwargs)
+            set_deadline(0)
+            return result
+
+        # One task at a time, so the deadline passes after the first MR
+        client.max_workers = 1
+        client.create_mr = create_mr_then_expire  # type: ignore[method-assign]
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        try:
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                with pytest.raises(DeadlineExceededError):
+                    stack.push(base_branch='main')
+        finally:
+            set_deadline(None)
+            client.create_mr = create_mr  # type: ignore[method-assign]
+        output = stdout.getvalue()
+
+        assert 'Deadline exceeded, not finished:' in output
+        assert '! create/update MR for Second commit' in output
+        assert '! create/update MR for Third commit' in output
+        assert '! set dependency of Third commit' in output
+        assert '! update stack links comments' in output
+        assert len(git_stack_fixture.read_mapping()) == 1
+
+        stack2 = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack2.push(base_branch='main')
+
+        create_ops = [
+            op for op in git_stack_fixture.read_operations()
+            if op['operation'] == 'create_mr'
+        ]
+        assert len(create_ops) == 3
+        assert len(git_stack_fixture.read_mapping()) == 3
+
 
 class TestPushAddCommit:
     """Test adding commits to existing stack."""
@@ -210,7 +580,7 @@ class TestPushAddCommit:
             stack_name='test-feature')
         stack2.push(base_branch='main')
 
-        # Should have 2 update and 1 create
+        # Should have 1 create; the existing MRs are unchanged
         operations = git_stack_fixture.read_operations()
         update_ops = [
             op for op in operations if op['operation'] == 'update_mr'
@@ -218,7 +588,7 @@ class TestPushAddCommit:
         create_ops = [
             op for op in operations if op['operation'] == 'create_mr'
         ]
-        assert len(update_ops) == 2
+        assert len(update_ops) == 0
         assert len(create_ops) == 1
 
         # Mapping should have 3 entries
@@ -399,6 +769,197 @@ class TestInsertCommitAtBeginning:
         assert extract_position(new_commit_cid) == 5
 
 
+class TestStackLinks:
+    """Test the cached stack links notes."""
+
+    def test_unchanged_notes_are_skipped(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that notes are neither listed nor rewritten when unchanged."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        mapping = git_stack_fixture.read_mapping()
+        assert all(info['stack_note_id'] for info in mapping.values())
+        assert all(info['stack_note_hash'] for info in mapping.values())
+
+        git_stack_fixture.reset_mock_client()
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+
+        operations = {
+            op['operation'] for op in git_stack_fixture.read_operations()
+        }
+        assert not operations & {
+            'get_mr_notes', 'update_mr_note', 'add_mr_note'
+        }
+
+    def test_changed_notes_use_cached_id(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test direct updates by note ID and recovery from deleted notes."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        mapping = git_stack_fixture.read_mapping()
+        first_cid = extract_change_id(
+            get_commit_message(git_stack_fixture.repo_path, 'HEAD~1'))
+        first_mr = mapping[first_cid]['mr_iid']
+
+        # Delete the first MR's stack note behind git-stack's back
+        database = json.loads(
+            git_stack_fixture.mock_database_file.read_text())
+        database['mrs'][str(first_mr)]['notes'] = []
+        git_stack_fixture.mock_database_file.write_text(json.dumps(database))
+
+        # A third commit changes the stack links of every MR
+        git_stack_fixture.reset_mock_client()
+        create_commit(git_stack_fixture.repo_path, 'file3.txt', 'Third commit')
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+
+        operations = git_stack_fixture.read_operations()
+        listed = [
+            op['args']['mr_iid']
+            for op in operations
+            if op['operation'] == 'get_mr_notes'
+        ]
+        added = [
+            op['args']['mr_iid']
+            for op in operations
+            if op['operation'] == 'add_mr_note'
+        ]
+        updated = [
+            op['args']['mr_iid']
+            for op in operations
+            if op['operation'] == 'update_mr_note'
+        ]
+        # Only the new MR and the MR whose note was deleted list notes
+        assert len(listed) == 2 and first_mr in listed
+        assert len(added) == 2 and first_mr in added
+        assert len(updated) == 1 and first_mr not in updated
+
+    def test_failed_note_update_adds_no_note(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that only a deleted note, not any failure, adds a new one."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+
+        git_stack_fixture.reset_mock_client()
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+        client = git_stack_fixture.mock_client
+        with patch.object(client,
+                          'update_mr_note',
+                          side_effect=HostingError('HTTP 503')), \
+                patch.object(client, 'get_mr_notes',
+                             return_value=[]) as get_mr_notes:
+            git_stack_fixture.create_stack_instance(
+                stack_name='test-feature').push(base_branch='main')
+
+        # The first MR's note was not looked up again after the failure
+        assert all(
+            call.args[0] != 1 for call in get_mr_notes.call_args_list)
+
+        added = [
+            op['args']['mr_iid']
+            for op in git_stack_fixture.read_operations()
+            if op['operation'] == 'add_mr_note'
+        ]
+        # Only the new MR gets a note; the first keeps its single note
+        assert len(added) == 1
+        database = json.loads(
+            git_stack_fixture.mock_database_file.read_text())
+        assert all(
+            len(mr.get('notes', [])) == 1 for mr in database['mrs'].values())
+
+
+class TestHistoryRewrite:
+    """Test the worktree-free history rewrite."""
+
+    def test_rewrite_keeps_prefix_trees_and_authors(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that only commits needing Change-Ids (and later) are rebuilt."""
+        repo = git_stack_fixture.repo_path
+        create_branch(repo, 'feature', 'origin/main')
+        first_sha = create_commit(
+            repo, 'file1.txt', 'First commit\n\nChange-Id: abc12345@feat@1')
+        create_commit(repo, 'file2.txt', 'Second commit')
+        run_git(repo, [
+            'commit', '--amend', '--no-edit',
+            '--author=Other Author <other@example.com>'
+        ])
+        tree_before = run_git(repo, ['rev-parse', 'HEAD^{tree}'])
+
+        stack = git_stack_fixture.create_stack_instance(stack_name='feat')
+        commits = stack._get_commits('main')  # pylint: disable=protected-access
+        stack._add_change_ids_to_commits(commits)  # pylint: disable=protected-access
+
+        assert run_git(repo, ['rev-parse', 'HEAD~1']) == first_sha
+        assert run_git(repo, ['rev-parse', 'HEAD^{tree}']) == tree_before
+        assert run_git(repo, ['log', '-1', '--format=%an <%ae>'
+                              ]) == 'Other Author <other@example.com>'
+        assert get_current_branch(repo) == 'feature'
+        assert run_git(repo, ['status', '--porcelain']) == ''
+        assert extract_change_id(get_commit_message(repo, 'HEAD')) is not None
+        assert not branch_exists(repo, 'refs/git-stack/backup')
+
+    def test_reindex_replaces_change_ids(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that reindex gives every commit a fresh Change-Id."""
+        repo = git_stack_fixture.repo_path
+        create_branch(repo, 'feature', 'origin/main')
+        create_commit(repo, 'file1.txt',
+                      'First commit\n\nChange-Id: abc12345@feat@1')
+        create_commit(repo, 'file2.txt',
+                      'Second commit\n\nChange-Id: def67890@feat@2')
+
+        stack = git_stack_fixture.create_stack_instance(stack_name='feat')
+        stack.reindex(base_branch='main')
+
+        cid1 = extract_change_id(get_commit_message(repo, 'HEAD~1'))
+        cid2 = extract_change_id(get_commit_message(repo, 'HEAD'))
+        assert cid1 not in (None, 'abc12345@feat@1')
+        assert cid2 not in (None, 'def67890@feat@2')
+        assert 'abc12345' not in get_commit_message(repo, 'HEAD~1')
+
+    def test_reindex_deletes_old_branches(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that reindex closes old MRs and deletes their branches."""
+        repo = git_stack_fixture.repo_path
+        create_branch(repo, 'feature', 'origin/main')
+        create_commit(repo, 'file1.txt', 'First commit')
+        create_commit(repo, 'file2.txt', 'Second commit')
+
+        stack = git_stack_fixture.create_stack_instance(stack_name='feat')
+        stack.push(base_branch='main')
+        stack.close()
+        branches = [
+            get_branch_name(cid) for cid in git_stack_fixture.read_mapping()
+        ]
+
+        git_stack_fixture.reset_mock_client()
+        stack2 = git_stack_fixture.create_stack_instance(stack_name='feat')
+        stack2.reindex(base_branch='main')
+
+        operations = git_stack_fixture.read_operations()
+        assert [op['operation'] for op in operations
+               ].count('close_mr') == 2
+        assert git_stack_fixture.read_mapping() == {}
+        for branch in branches:
+            assert not branch_exists(repo, branch)
+        assert run_git(git_stack_fixture.bare_repo_path,
+                       ['branch', '--list', '*/stack-*']) == ''
+
+
 class TestDownstreamRebase:
     """Test rebasing downstream commits from remote."""
 
@@ -472,6 +1033,66 @@ class TestDownstreamRebase:
         file4_path = git_stack_fixture.repo_path / 'file4.txt'
         assert file4_path.exists()
 
+    def test_conflict_changes_nothing(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that a downstream conflict leaves HEAD and files untouched."""
+        repo = git_stack_fixture.repo_path
+        create_branch(repo, 'feature', 'origin/main')
+        create_commit(repo, 'file1.txt', 'First commit')
+        create_commit(repo, 'shared.txt', 'Second commit', 'two\n')
+        create_commit(repo, 'shared.txt', 'Third commit', 'three\n')
+        create_commit(repo, 'file4.txt', 'Fourth commit')
+
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+
+        # Drop commits 3 and 4 locally and rewrite the line they change
+        run_git(repo, ['reset', '--hard', 'HEAD~2'])
+        (repo / 'shared.txt').write_text('conflicting\n')
+        run_git(repo, ['commit', '-a', '--amend', '--no-edit'])
+        head = run_git(repo, ['rev-parse', 'HEAD'])
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        with pytest.raises(SystemExit):
+            stack.push(base_branch='main')
+
+        assert run_git(repo, ['rev-parse', 'HEAD']) == head
+        assert run_git(repo, ['status', '--porcelain']) == ''
+        assert (repo / 'shared.txt').read_text() == 'conflicting\n'
+        assert not (repo / 'file4.txt').exists()
+
+    @pytest.mark.parametrize('version', [
+        pytest.param((2, 50),
+                     marks=pytest.mark.skipif(git_version() < (2, 40),
+                                              reason='needs git 2.40+')),
+        (2, 30),
+    ])
+    def test_replay_tree(self, git_stack_fixture: GitStackTestFixture,
+                         version: tuple[int, int]) -> None:
+        """Test in-memory replays with merge-tree and the git apply fallback."""
+        repo = git_stack_fixture.repo_path
+        create_branch(repo, 'feature', 'origin/main')
+        create_commit(repo, 'shared.txt', 'First commit', 'one\n')
+        create_commit(repo, 'file2.txt', 'Second commit')
+        create_commit(repo, 'shared.txt', 'Third commit', 'three\n')
+
+        stack = git_stack_fixture.create_stack_instance(stack_name='feat')
+        commits = {
+            commit['subject']: commit
+            for commit in stack._get_commits('main')  # pylint: disable=protected-access
+        }
+        with patch('git_stack.stack.git_version', return_value=version):
+            # pylint: disable=protected-access
+            tree = stack._replay_tree(commits['Second commit'], 'main')
+            assert tree is not None
+            assert run_git(repo, ['ls-tree', '--name-only', tree
+                                  ]) == '.gitkeep\nfile2.txt'
+            assert stack._replay_tree(commits['Third commit'], 'main') is None
+            with pytest.raises(CherryPickError):
+                stack._replay_tree(commits['Second commit'], '0' * 40)
+        assert run_git(repo, ['status', '--porcelain']) == ''
+
 
 class TestMergeAndRebase:
     """Test rebasing after MR is merged."""
@@ -595,6 +1216,256 @@ class TestClean:
         mapping_after = git_stack_fixture.read_mapping()
         assert len(mapping_after) == 1
 
+    def test_clean_deletes_stale_branches_in_batch(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that stale branches are deleted locally and on the remote."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+        create_commit(git_stack_fixture.repo_path, 'file3.txt', 'Third commit')
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+        stack.close()
+
+        # Forget the first two MRs and close only the first one
+        mapping = git_stack_fixture.read_mapping()
+        change_ids = sorted(mapping, key=extract_position)
+        branches = [get_branch_name(change_id) for change_id in change_ids]
+        git_stack_fixture.mock_client.set_mr_state(
+            mapping[change_ids[0]]['mr_iid'], 'closed')
+        for change_id in change_ids[:2]:
+            del mapping[change_id]
+        git_stack_fixture.mapping_file.write_text(json.dumps(mapping))
+
+        # A stale branch that was never pushed
+        local_only = get_branch_name(f"abcd{CHANGE_ID_DELIMITER}other"
+                                     f"{CHANGE_ID_DELIMITER}1")
+        run_git(git_stack_fixture.repo_path, ['branch', local_only, 'main'])
+
+        git_stack_fixture.reset_mock_client()
+        stack2 = git_stack_fixture.create_stack_instance()
+        with patch('sys.stdout', new=StringIO()) as output:
+            stack2.clean()
+
+        assert not branch_exists(git_stack_fixture.repo_path, branches[0])
+        assert not branch_exists(git_stack_fixture.repo_path, local_only)
+        assert branch_exists(git_stack_fixture.repo_path, branches[1])
+        assert branch_exists(git_stack_fixture.repo_path, branches[2])
+        assert f"Skipping {branches[1]} - has open MR" in output.getvalue()
+        remote = run_git(git_stack_fixture.bare_repo_path,
+                         ['for-each-ref', '--format=%(refname:short)'])
+        assert branches[0] not in remote.split()
+        assert branches[1] in remote.split()
+        assert len(git_stack_fixture.read_mapping()) == 1
+
+    def test_clean_dry_run_reads_mirror(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that a dry run takes MR states from the mirror as it is."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+
+        mr_iids = [
+            info['mr_iid']
+            for info in git_stack_fixture.read_mapping().values()
+        ]
+        git_stack_fixture.mock_client.set_mr_state(mr_iids[0], 'merged')
+        git_stack_fixture.create_stack_instance().sync()
+        # Not in the mirror until the next sync
+        git_stack_fixture.mock_client.set_mr_state(mr_iids[1], 'merged')
+        git_stack_fixture.reset_mock_client()
+
+        captured = StringIO()
+        with patch('sys.stdout', captured):
+            git_stack_fixture.create_stack_instance(dry_run=True).clean()
+
+        output = captured.getvalue()
+        assert f"MR !{mr_iids[0]} is merged" in output
+        assert f"MR !{mr_iids[1]} is opened" in output
+        operations = [
+            op['operation'] for op in git_stack_fixture.read_operations()
+        ]
+        assert 'list_own_mrs' not in operations
+        assert 'get_mr_state' not in operations
+
+    def test_clean_fetches_states_if_sync_fails(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that clean doesn't trust a mirror it could not refresh."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+        git_stack_fixture.create_stack_instance().sync()
+        mr_iid = next(iter(git_stack_fixture.read_mapping().values()))['mr_iid']
+        # Merged after the last successful sync
+        git_stack_fixture.mock_client.set_mr_state(mr_iid, 'merged')
+
+        captured = StringIO()
+        with patch('sys.stdout', captured), patch(
+                'sys.stderr', new_callable=StringIO), patch.object(
+                    git_stack_fixture.mock_client,
+                    'list_own_mrs',
+                    side_effect=HostingError('HTTP 503')):
+            git_stack_fixture.create_stack_instance().clean()
+
+        assert f"MR !{mr_iid} is merged" in captured.getvalue()
+        assert not git_stack_fixture.read_mapping()
+
+
+class TestSync:
+    """Test the local MR mirror."""
+
+    def test_sync_is_incremental(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that later syncs only ask for recently updated MRs."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+
+        # The first push lists every MR to find MRs of unmapped commits
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+        git_stack_fixture.create_stack_instance().sync()
+        git_stack_fixture.create_stack_instance().sync(full=True)
+
+        updated_after = [
+            op['args']['updated_after']
+            for op in git_stack_fixture.read_operations()
+            if op['operation'] == 'list_own_mrs'
+        ]
+        assert len(updated_after) == 3
+        assert updated_after[0] is None
+        assert updated_after[1] is not None
+        assert updated_after[2] is None
+
+    def test_read_commands_refresh_stale_mirror(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that list syncs only when the mirror exceeds max age."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+        mr_iid = next(iter(git_stack_fixture.read_mapping().values()))['mr_iid']
+        git_stack_fixture.reset_mock_client()
+
+        def list_output(**kwargs: Any) -> str:
+            captured = StringIO()
+            with patch('sys.stdout', captured):
+                git_stack_fixture.create_stack_instance(**kwargs).list()
+            return captured.getvalue()
+
+        git_stack_fixture.mock_client.set_mr_state(mr_iid, 'merged')
+        # The push left its new MR in the mirror, which is fresh enough
+        assert f"!{mr_iid} - test-user/" in list_output()
+        assert '(opened)' in list_output()
+        assert git_stack_fixture.read_operations() == []
+
+        assert '(merged)' in list_output(mirror_max_age=0)
+        operations = [
+            op['operation'] for op in git_stack_fixture.read_operations()
+        ]
+        assert operations == ['list_own_mrs']
+
+
+class TestAdopt:
+    """Test recovering a lost mapping from the user's MRs."""
+
+    def test_adopt_rebuilds_mapping(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that adopt matches open MRs to stack branches in one listing."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+        mapping = git_stack_fixture.read_mapping()
+
+        # Lose the mapping and the mirror, as in a new clone
+        git_stack_fixture.mapping_file.unlink()
+        stack.mirror_path.unlink()
+        git_stack_fixture.reset_mock_client()
+
+        git_stack_fixture.create_stack_instance().adopt()
+
+        adopted = git_stack_fixture.read_mapping()
+        assert {
+            change_id: info['mr_iid'] for change_id, info in adopted.items()
+        } == {change_id: info['mr_iid'] for change_id, info in mapping.items()}
+        operations = [
+            op['operation'] for op in git_stack_fixture.read_operations()
+        ]
+        assert operations == ['list_own_mrs']
+
+    def test_push_adopts_without_updates(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that push finds unmapped MRs in one listing."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+        create_commit(git_stack_fixture.repo_path, 'file2.txt',
+                      'Second commit')
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+
+        git_stack_fixture.mapping_file.unlink()
+        git_stack_fixture.reset_mock_client()
+
+        captured = StringIO()
+        with patch('sys.stdout', captured):
+            git_stack_fixture.create_stack_instance().push(base_branch='main')
+
+        assert captured.getvalue().count('Adopted existing MR') == 2
+        operations = [
+            op['operation'] for op in git_stack_fixture.read_operations()
+        ]
+        assert operations.count('list_own_mrs') == 1
+        assert 'create_mr' not in operations
+        # Title and target are already right
+        assert 'update_mr' not in operations
+
+    def test_push_ignores_stale_mirror(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that push looks MRs up by branch if the sync failed."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        create_commit(git_stack_fixture.repo_path, 'file1.txt', 'First commit')
+
+        # A mirror synced before the MRs were opened, e.g. on another machine
+        stack = git_stack_fixture.create_stack_instance()
+        stack.sync()
+        stale_mirror = stack.mirror_path.read_text()
+        git_stack_fixture.create_stack_instance(
+            stack_name='test-feature').push(base_branch='main')
+        stack.mirror_path.write_text(stale_mirror)
+        git_stack_fixture.mapping_file.unlink()
+
+        git_stack_fixture.reset_mock_client()
+        with patch.object(git_stack_fixture.mock_client,
+                          'list_own_mrs',
+                          side_effect=HostingError('HTTP 503')):
+            git_stack_fixture.create_stack_instance().push(base_branch='main')
+
+        operations = [
+            op['operation'] for op in git_stack_fixture.read_operations()
+        ]
+        assert 'create_mr' not in operations
+        assert len(git_stack_fixture.read_mapping()) == 1
+
 
 class TestList:
     """Test list functionality."""
@@ -712,6 +1583,38 @@ class TestRemove:
         # Branches should be deleted
         for branch in branches:
             assert not branch_exists(git_stack_fixture.repo_path, branch)
+        assert run_git(git_stack_fixture.bare_repo_path,
+                       ['branch', '--list', '*/stack-*']) == ''
+
+    def test_remove_skips_missing_remote_branches(
+            self, git_stack_fixture: GitStackTestFixture) -> None:
+        """Test that one missing remote branch doesn't block the others."""
+        create_branch(git_stack_fixture.repo_path, 'feature', 'origin/main')
+        for i in range(1, 4):
+            create_commit(git_stack_fixture.repo_path, f"file{i}.txt",
+                          f"Commit {i}")
+
+        stack = git_stack_fixture.create_stack_instance(
+            stack_name='test-feature')
+        stack.push(base_branch='main')
+        stack.close()
+
+        branches = [
+            get_branch_name(cid) for cid in git_stack_fixture.read_mapping()
+        ]
+        run_git(git_stack_fixture.repo_path,
+                ['push', 'origin', '--delete', branches[1]])
+        checkout(git_stack_fixture.repo_path, 'main')
+
+        stack2 = git_stack_fixture.create_stack_instance()
+        with patch('sys.stdout', new=StringIO()) as output:
+            stack2.remove('test-feature')
+
+        assert 'Deleted 3 branch(es)' in output.getvalue()
+        assert run_git(git_stack_fixture.bare_repo_path,
+                       ['branch', '--list', '*/stack-*']) == ''
+        for branch in branches:
+            assert not branch_exists(git_stack_fixture.repo_path, branch)
 
 
 class TestDryRun: